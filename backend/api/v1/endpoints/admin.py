@@ -0,0 +1,175 @@
+from flask import Blueprint, jsonify, request
+from config import Config
+from json_database import json_db
+from services.profiling import MAX_SIGNATURE_TTL, SIGNATURE_HEADER, profiles, sign
+import hmac
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Crear blueprint
+admin_bp = Blueprint('admin', __name__)
+
+def _provided_token():
+    """Token enviado como 'Authorization: Bearer <token>' o 'X-Admin-Token: <token>'"""
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        return auth[len('Bearer '):].strip()
+    return request.headers.get('X-Admin-Token', '')
+
+@admin_bp.before_request
+def require_admin_token():
+    """Todas las rutas de administración requieren ADMIN_TOKEN"""
+    if not Config.ADMIN_TOKEN:
+        return jsonify({
+            'success': False,
+            'error': 'Administración deshabilitada: configure ADMIN_TOKEN'
+        }), 503
+    # Comparación en tiempo constante
+    if not hmac.compare_digest(_provided_token().encode('utf-8'), Config.ADMIN_TOKEN.encode('utf-8')):
+        return jsonify({
+            'success': False,
+            'error': 'No autorizado'
+        }), 401
+
+def _change_response(summary, start_time):
+    return jsonify({
+        'success': True,
+        'data': summary,
+        'performance': {
+            'total_time': time.time() - start_time,
+            'patch_time': summary['patch_time'],
+            'snapshot_version': summary['version'],
+            'optimization': 'incremental_index_patch'
+        }
+    })
+
+def _error_response(error, start_time, status):
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'performance': {
+            'total_time': time.time() - start_time
+        }
+    }), status
+
+@admin_bp.route('/productos', methods=['POST'])
+def upsert_productos():
+    """
+    POST /api/v1/admin/productos - Insertar o actualizar productos sin recargar el catálogo
+
+    Body: un producto, una lista o {"productos": [...]}. Si el id existe basta
+    con los campos que cambian: {"id": 15, "Stock": "Sin Stock"}
+    """
+    start_time = time.time()
+
+    try:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict) and 'productos' in payload:
+            payload = payload['productos']
+        products = [payload] if isinstance(payload, dict) else payload
+        if not products or not isinstance(products, list) or not all(isinstance(p, dict) for p in products):
+            raise ValueError('Se esperaba un producto o una lista de productos en JSON')
+
+        summary = json_db.upsert_products(products)
+        return _change_response(summary, start_time)
+
+    except (ValueError, TypeError) as e:
+        return _error_response(e, start_time, 400)
+    except Exception as e:
+        logger.error(f"Error actualizando productos: {e}")
+        return _error_response(e, start_time, 500)
+
+@admin_bp.route('/productos/<int:producto_id>', methods=['PATCH'])
+def patch_producto(producto_id):
+    """
+    PATCH /api/v1/admin/productos/15 - Actualizar campos de un producto
+
+    Body: {"Stock": "Sin Stock", "Precio B": 45.9}
+    """
+    start_time = time.time()
+
+    try:
+        fields = request.get_json(silent=True)
+        if not isinstance(fields, dict) or not fields:
+            raise ValueError('Se esperaban los campos a actualizar en JSON')
+        if json_db.get_by_id(producto_id) is None:
+            return _error_response(f'Producto {producto_id} no encontrado', start_time, 404)
+
+        summary = json_db.upsert_products([{**fields, 'id': producto_id}])
+        return _change_response(summary, start_time)
+
+    except (ValueError, TypeError) as e:
+        return _error_response(e, start_time, 400)
+    except Exception as e:
+        logger.error(f"Error actualizando producto {producto_id}: {e}")
+        return _error_response(e, start_time, 500)
+
+@admin_bp.route('/productos/<int:producto_id>', methods=['DELETE'])
+def delete_producto(producto_id):
+    """DELETE /api/v1/admin/productos/15 - Eliminar un producto del catálogo"""
+    start_time = time.time()
+
+    try:
+        summary = json_db.delete_products([producto_id])
+        if not summary['deleted']:
+            return _error_response(f'Producto {producto_id} no encontrado', start_time, 404)
+        return _change_response(summary, start_time)
+
+    except Exception as e:
+        logger.error(f"Error eliminando producto {producto_id}: {e}")
+        return _error_response(e, start_time, 500)
+
+@admin_bp.route('/profiles', methods=['GET'])
+def list_profiles():
+    """GET /api/v1/admin/profiles - Perfiles de las peticiones más lentas de este proceso"""
+    return jsonify({
+        'success': True,
+        'data': profiles.list(),
+        'meta': profiles.status()
+    })
+
+@admin_bp.route('/profiles/<int:profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    GET /api/v1/admin/profiles/3 - Perfil completo (funciones por tiempo acumulado)
+
+    Con ?formato=texto devuelve solo la salida de pstats.
+    """
+    profile = profiles.get(profile_id)
+    if profile is None:
+        return _error_response(f'Perfil {profile_id} no encontrado', time.time(), 404)
+    if request.args.get('formato') == 'texto':
+        return profile['stats'], 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    return jsonify({'success': True, 'data': profile})
+
+@admin_bp.route('/profiles', methods=['DELETE'])
+def clear_profiles():
+    """DELETE /api/v1/admin/profiles - Vaciar los perfiles guardados"""
+    profiles.clear()
+    return jsonify({'success': True})
+
+@admin_bp.route('/profiles/firma', methods=['GET'])
+def profile_signature():
+    """
+    GET /api/v1/admin/profiles/firma?ruta=/api/v1/productos/buscar/ron&ttl=300
+
+    Cabecera firmada para perfilar esa ruta en cualquier worker mientras dure
+    la firma (ttl en segundos, máximo 1 hora).
+    """
+    start_time = time.time()
+    ruta = request.args.get('ruta', '')
+    ttl = request.args.get('ttl', 300, type=int)
+    if not ruta.startswith('/') or not 0 < ttl <= MAX_SIGNATURE_TTL:
+        return _error_response('Se esperaba ?ruta=/... y ttl entre 1 y 3600 segundos', start_time, 400)
+    expires = int(time.time()) + ttl
+    return jsonify({
+        'success': True,
+        'data': {
+            'header': SIGNATURE_HEADER,
+            'value': sign(ruta, expires),
+            'ruta': ruta,
+            'expires': expires
+        }
+    })
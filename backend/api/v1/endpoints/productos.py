@@ -1,6 +1,45 @@
 from flask import Blueprint, request, jsonify
 import time
-from json_database import json_db
+from json_database import json_db, featured_bucket, LISTING_ORDERS
+from utils.search_index import DEFAULT_TEXT_WEIGHT, DEFAULT_SALES_WEIGHT
+from utils.facets import FACET_FIELDS
+from utils.cursor import CursorExpired, InvalidCursor
+from services import metrics
+from services.response_cache import cached, cached_json, response_cache
+
+def _listing_args(default_order='id'):
+    """Parámetros comunes de listado: limit, offset, orden, precio_min, precio_max, cursor"""
+    orden = request.args.get('orden', default_order)
+    if orden not in LISTING_ORDERS:
+        raise ValueError(f"Orden no válido: {orden}. Opciones: {', '.join(LISTING_ORDERS)}")
+    return {
+        'limit': request.args.get('limit', type=int),
+        'offset': request.args.get('offset', 0, type=int),
+        'order': orden,
+        'precio_min': request.args.get('precio_min', type=float),
+        'precio_max': request.args.get('precio_max', type=float),
+        'cursor': request.args.get('cursor')
+    }
+
+def _bad_request(error, start_time, status=400):
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'performance': {
+            'total_time': time.time() - start_time
+        }
+    }), status
+
+def _cursor_error(error, start_time):
+    """410 si el snapshot del cursor ya no existe (reiniciar la paginación), 400 si es inválido"""
+    return _bad_request(error, start_time, 410 if isinstance(error, CursorExpired) else 400)
+
+def _multi_value_arg(name):
+    """Valores de un parámetro repetible (?tamano=750 ML&tamano=1 LT) o separado por comas"""
+    values = []
+    for raw in request.args.getlist(name):
+        values.extend(value.strip() for value in raw.split(',') if value.strip())
+    return values
 
 # Crear blueprint para productos optimizado con JSON
 productos_json_bp = Blueprint('productos_json', __name__)
@@ -9,27 +48,33 @@ def create_json_productos_endpoints():
     """Crear endpoints ultra-optimizados usando base de datos JSON"""
     
     @productos_json_bp.route('/', methods=['GET'])
+    @cached
     def get_todos_productos():
         """
         GET /api/v2/productos - Obtener todos los productos (ultra-rápido)
+        GET /api/v2/productos?precio_min=30&precio_max=80&orden=precio_asc
         """
         start_time = time.time()
         
         try:
             # Parámetros de consulta
-            limit = request.args.get('limit', type=int)
-            offset = request.args.get('offset', 0, type=int)
             categoria = request.args.get('categoria')
+            por_categoria = bool(categoria and categoria != '*')
+            try:
+                args = _listing_args('ventas' if por_categoria else 'id')
+            except ValueError as e:
+                return _bad_request(e, start_time)
+            limit, offset = args['limit'], args['offset']
             
             # Ejecutar consulta JSON
-            if categoria and categoria != '*':
-                products = json_db.get_by_categoria(categoria, limit, offset)
-                total = json_db.count_by_categoria(categoria)
-            else:
-                products = json_db.get_all(limit, offset)
-                total = json_db.count_total()
-            
-            total_time = time.time() - start_time
+            try:
+                if por_categoria:
+                    page = json_db.list_products('categoria', categoria, **args)
+                else:
+                    page = json_db.list_products(None, None, **args)
+            except InvalidCursor as e:
+                return _cursor_error(e, start_time)
+            products, total = page['products'], page['total']
             
             response = {
                 'success': True,
@@ -38,19 +83,23 @@ def create_json_productos_endpoints():
                     'total': total,
                     'limit': limit,
                     'offset': offset,
-                    'has_more': limit and total > offset + limit,
-                    'categoria': categoria
+                    'has_more': page['next_cursor'] is not None,
+                    'categoria': categoria,
+                    'orden': args['order'],
+                    'precio_min': args['precio_min'],
+                    'precio_max': args['precio_max'],
+                    'next_cursor': page['next_cursor']
                 },
                 'performance': {
-                    'total_time': total_time,
                     'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': page['version'],
                     'source': 'json_database',
                     'cache_hit': True,
                     'optimization': 'in_memory_json'
                 }
             }
             
-            return jsonify(response), 200
+            return cached_json(response, start_time)
             
         except Exception as e:
             return jsonify({
@@ -63,6 +112,7 @@ def create_json_productos_endpoints():
             }), 500
     
     @productos_json_bp.route('/<int:producto_id>', methods=['GET'])
+    @cached
     def get_producto_por_id(producto_id):
         """
         GET /api/v2/productos/123 - Obtener producto por ID (ultra-rápido)
@@ -82,21 +132,19 @@ def create_json_productos_endpoints():
                     }
                 }), 404
             
-            total_time = time.time() - start_time
-            
             response = {
                 'success': True,
                 'data': product,
                 'performance': {
-                    'total_time': total_time,
                     'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': json_db.version,
                     'source': 'json_database',
                     'cache_hit': True,
                     'optimization': 'indexed_lookup'
                 }
             }
             
-            return jsonify(response), 200
+            return cached_json(response, start_time)
             
         except Exception as e:
             return jsonify({
@@ -108,20 +156,26 @@ def create_json_productos_endpoints():
             }), 500
     
     @productos_json_bp.route('/categoria/<categoria>', methods=['GET'])
+    @cached
     def get_productos_por_categoria(categoria):
         """
         GET /api/v2/productos/categoria/CERVEZA - Productos por categoría (ultra-rápido)
+        Acepta orden (ventas por defecto), precio_min y precio_max.
         """
         start_time = time.time()
         
         try:
-            limit = request.args.get('limit', type=int)
-            offset = request.args.get('offset', 0, type=int)
-            
-            products = json_db.get_by_categoria(categoria, limit, offset)
-            total = json_db.count_by_categoria(categoria)
-            
-            total_time = time.time() - start_time
+            try:
+                args = _listing_args('ventas')
+            except ValueError as e:
+                return _bad_request(e, start_time)
+            limit, offset = args['limit'], args['offset']
+            
+            try:
+                page = json_db.list_products('categoria', categoria, **args)
+            except InvalidCursor as e:
+                return _cursor_error(e, start_time)
+            products, total = page['products'], page['total']
             
             response = {
                 'success': True,
@@ -131,18 +185,22 @@ def create_json_productos_endpoints():
                     'total': total,
                     'limit': limit,
                     'offset': offset,
-                    'has_more': limit and total > offset + limit
+                    'has_more': page['next_cursor'] is not None,
+                    'orden': args['order'],
+                    'precio_min': args['precio_min'],
+                    'precio_max': args['precio_max'],
+                    'next_cursor': page['next_cursor']
                 },
                 'performance': {
-                    'total_time': total_time,
                     'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': page['version'],
                     'source': 'json_database',
                     'cache_hit': True,
                     'optimization': 'indexed_category_lookup'
                 }
             }
             
-            return jsonify(response), 200
+            return cached_json(response, start_time)
             
         except Exception as e:
             return jsonify({
@@ -154,20 +212,26 @@ def create_json_productos_endpoints():
             }), 500
     
     @productos_json_bp.route('/subcategoria/<subcategoria>', methods=['GET'])
+    @cached
     def get_productos_por_subcategoria(subcategoria):
         """
         GET /api/v2/productos/subcategoria/Cervezas - Productos por subcategoría
+        Acepta orden (ventas por defecto), precio_min y precio_max.
         """
         start_time = time.time()
         
         try:
-            limit = request.args.get('limit', type=int)
-            offset = request.args.get('offset', 0, type=int)
-            
-            products = json_db.get_by_sub_categoria(subcategoria, limit, offset)
-            total = json_db.count_by_sub_categoria(subcategoria)
-            
-            total_time = time.time() - start_time
+            try:
+                args = _listing_args('ventas')
+            except ValueError as e:
+                return _bad_request(e, start_time)
+            limit, offset = args['limit'], args['offset']
+            
+            try:
+                page = json_db.list_products('subcategoria', subcategoria, **args)
+            except InvalidCursor as e:
+                return _cursor_error(e, start_time)
+            products, total = page['products'], page['total']
             
             response = {
                 'success': True,
@@ -177,18 +241,22 @@ def create_json_productos_endpoints():
                     'total': total,
                     'limit': limit,
                     'offset': offset,
-                    'has_more': limit and total > offset + limit
+                    'has_more': page['next_cursor'] is not None,
+                    'orden': args['order'],
+                    'precio_min': args['precio_min'],
+                    'precio_max': args['precio_max'],
+                    'next_cursor': page['next_cursor']
                 },
                 'performance': {
-                    'total_time': total_time,
                     'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': page['version'],
                     'source': 'json_database',
                     'cache_hit': True,
                     'optimization': 'indexed_subcategory_lookup'
                 }
             }
             
-            return jsonify(response), 200
+            return cached_json(response, start_time)
             
         except Exception as e:
             return jsonify({
@@ -200,6 +268,7 @@ def create_json_productos_endpoints():
             }), 500
     
     @productos_json_bp.route('/sku/<sku>', methods=['GET'])
+    @cached
     def get_producto_por_sku(sku):
         """
         GET /api/v2/productos/sku/123456 - Producto por SKU (ultra-rápido)
@@ -219,21 +288,19 @@ def create_json_productos_endpoints():
                     }
                 }), 404
             
-            total_time = time.time() - start_time
-            
             response = {
                 'success': True,
                 'data': product,
                 'performance': {
-                    'total_time': total_time,
                     'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': json_db.version,
                     'source': 'json_database',
                     'cache_hit': True,
                     'optimization': 'indexed_sku_lookup'
                 }
             }
             
-            return jsonify(response), 200
+            return cached_json(response, start_time)
             
         except Exception as e:
             return jsonify({
@@ -245,37 +312,109 @@ def create_json_productos_endpoints():
             }), 500
     
     @productos_json_bp.route('/buscar/<query>', methods=['GET'])
+    @cached
     def buscar_productos(query):
         """
         GET /api/v2/productos/buscar/pilsen - Búsqueda de productos (ultra-rápido)
+        GET /api/v2/productos/buscar/wisky?modo=fuzzy - Búsqueda tolerante a errores
+        
+        modo: 'exacto' (por defecto), 'fuzzy' (similitud de trigramas) o
+        'auto' (exacto y, si no hay resultados, fuzzy)
+        orden: 'relevancia' (por defecto, BM25 + ventas) o 'id' (orden de catálogo)
+        peso_texto / peso_ventas: pesos de la mezcla de relevancia
+        cursor: meta.next_cursor de la página anterior (sustituye a offset)
         """
         start_time = time.time()
         
         try:
             limit = request.args.get('limit', 20, type=int)
+            offset = request.args.get('offset', 0, type=int)
+            modo = request.args.get('modo', 'exacto')
+            orden = request.args.get('orden', 'relevancia')
+            peso_texto = request.args.get('peso_texto', DEFAULT_TEXT_WEIGHT, type=float)
+            peso_ventas = request.args.get('peso_ventas', DEFAULT_SALES_WEIGHT, type=float)
+            cursor = request.args.get('cursor')
             
-            products = json_db.search_by_name(query, limit)
+            if modo not in ('exacto', 'fuzzy', 'auto') or orden not in ('relevancia', 'id'):
+                return jsonify({
+                    'success': False,
+                    'error': f"Parámetros de búsqueda no válidos: modo={modo}, orden={orden}",
+                    'performance': {
+                        'total_time': time.time() - start_time
+                    }
+                }), 400
             
-            total_time = time.time() - start_time
+            try:
+                page = json_db.search_page(query, modo, orden, limit, offset, cursor, peso_texto, peso_ventas)
+            except InvalidCursor as e:
+                return _cursor_error(e, start_time)
+            products, total = page['products'], page['total']
             
             response = {
                 'success': True,
                 'data': products,
                 'meta': {
                     'query': query,
-                    'total': len(products),
+                    'modo': page['modo'],
+                    'orden': orden,
+                    'total': total,
+                    'limit': limit,
+                    'offset': offset,
+                    'has_more': page['next_cursor'] is not None,
+                    'next_cursor': page['next_cursor']
+                },
+                'performance': {
+                    'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': page['version'],
+                    'source': 'json_database',
+                    'cache_hit': True,
+                    'optimization': page['optimization']
+                }
+            }
+            
+            return cached_json(response, start_time)
+            
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'performance': {
+                    'total_time': time.time() - start_time
+                }
+            }), 500
+    
+    @productos_json_bp.route('/autocomplete', methods=['GET'])
+    @cached
+    def autocomplete_productos():
+        """
+        GET /api/v2/productos/autocomplete?q=john&limit=8 - Sugerencias de typeahead
+        """
+        start_time = time.time()
+        
+        try:
+            query = request.args.get('q', '')
+            limit = request.args.get('limit', 8, type=int)
+            
+            suggestions = json_db.autocomplete(query, limit)
+            
+            response = {
+                'success': True,
+                'data': suggestions,
+                'meta': {
+                    'query': query,
+                    'total': len(suggestions),
                     'limit': limit
                 },
                 'performance': {
-                    'total_time': total_time,
                     'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': json_db.version,
                     'source': 'json_database',
                     'cache_hit': True,
-                    'optimization': 'in_memory_text_search'
+                    'optimization': 'sorted_prefix_array'
                 }
             }
             
-            return jsonify(response), 200
+            return cached_json(response, start_time)
             
         except Exception as e:
             return jsonify({
@@ -286,40 +425,117 @@ def create_json_productos_endpoints():
                 }
             }), 500
     
-    @productos_json_bp.route('/stock/<stock_status>', methods=['GET'])
-    def get_productos_por_stock(stock_status):
+    @productos_json_bp.route('/filtrar', methods=['GET'])
+    @cached
+    def filtrar_productos():
         """
-        GET /api/v2/productos/stock/Con%20Stock - Productos por estado de stock
+        GET /api/v2/productos/filtrar?subcategoria=Whiskies&tamano=750 ML&precio_max=80
+        
+        Filtros combinables (OR dentro de cada filtro, AND entre filtros):
+        categoria, subcategoria, tamano, stock (repetibles o separados por comas),
+        precio_min, precio_max (Precio B) y q (texto). Devuelve la página y los
+        conteos por valor de cada faceta. cursor: meta.next_cursor de la página anterior.
         """
         start_time = time.time()
         
         try:
-            limit = request.args.get('limit', type=int)
+            limit = request.args.get('limit', 20, type=int)
             offset = request.args.get('offset', 0, type=int)
+            precio_min = request.args.get('precio_min', type=float)
+            precio_max = request.args.get('precio_max', type=float)
+            query = request.args.get('q')
+            cursor = request.args.get('cursor')
+            selections = {facet: _multi_value_arg(facet) for facet in FACET_FIELDS}
+            
+            try:
+                result = json_db.filter_products(selections, precio_min, precio_max, query, limit, offset, cursor)
+            except InvalidCursor as e:
+                return _cursor_error(e, start_time)
+            total = result['total']
             
-            products = json_db.get_by_stock(stock_status, limit, offset)
+            response = {
+                'success': True,
+                'data': result['products'],
+                'facets': result['facets'],
+                'meta': {
+                    'total': total,
+                    'limit': limit,
+                    'offset': offset,
+                    'has_more': result['next_cursor'] is not None,
+                    'next_cursor': result['next_cursor'],
+                    'filtros': {
+                        **{facet: values for facet, values in selections.items() if values},
+                        'precio_min': precio_min,
+                        'precio_max': precio_max,
+                        'q': query
+                    }
+                },
+                'performance': {
+                    'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': result['version'],
+                    'source': 'json_database',
+                    'cache_hit': True,
+                    'optimization': 'facet_bitsets'
+                }
+            }
             
-            total_time = time.time() - start_time
+            return cached_json(response, start_time)
+            
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'performance': {
+                    'total_time': time.time() - start_time
+                }
+            }), 500
+    
+    @productos_json_bp.route('/stock/<stock_status>', methods=['GET'])
+    @cached
+    def get_productos_por_stock(stock_status):
+        """
+        GET /api/v2/productos/stock/Con%20Stock - Productos por estado de stock
+        Acepta orden (id por defecto), precio_min y precio_max.
+        """
+        start_time = time.time()
+        
+        try:
+            try:
+                args = _listing_args('id')
+            except ValueError as e:
+                return _bad_request(e, start_time)
+            limit, offset = args['limit'], args['offset']
+            
+            try:
+                page = json_db.list_products('stock', stock_status, **args)
+            except InvalidCursor as e:
+                return _cursor_error(e, start_time)
+            products, total = page['products'], page['total']
             
             response = {
                 'success': True,
                 'data': products,
                 'meta': {
                     'stock_status': stock_status,
-                    'total': len(products),
+                    'total': total,
                     'limit': limit,
-                    'offset': offset
+                    'offset': offset,
+                    'has_more': page['next_cursor'] is not None,
+                    'orden': args['order'],
+                    'precio_min': args['precio_min'],
+                    'precio_max': args['precio_max'],
+                    'next_cursor': page['next_cursor']
                 },
                 'performance': {
-                    'total_time': total_time,
                     'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': page['version'],
                     'source': 'json_database',
                     'cache_hit': True,
                     'optimization': 'indexed_stock_lookup'
                 }
             }
             
-            return jsonify(response), 200
+            return cached_json(response, start_time)
             
         except Exception as e:
             return jsonify({
@@ -331,6 +547,7 @@ def create_json_productos_endpoints():
             }), 500
     
     @productos_json_bp.route('/categorias', methods=['GET'])
+    @cached
     def get_categorias():
         """
         GET /api/v2/productos/categorias - Lista de categorías (ultra-rápido)
@@ -340,8 +557,6 @@ def create_json_productos_endpoints():
         try:
             categories = json_db.get_categories()
             
-            total_time = time.time() - start_time
-            
             response = {
                 'success': True,
                 'data': categories,
@@ -349,15 +564,15 @@ def create_json_productos_endpoints():
                     'total': len(categories)
                 },
                 'performance': {
-                    'total_time': total_time,
                     'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': json_db.version,
                     'source': 'json_database',
                     'cache_hit': True,
-                    'optimization': 'pre_calculated_stats'
+                    'optimization': 'materialized_category_summary'
                 }
             }
             
-            return jsonify(response), 200
+            return cached_json(response, start_time)
             
         except Exception as e:
             return jsonify({
@@ -372,13 +587,17 @@ def create_json_productos_endpoints():
     def get_productos_destacados():
         """
         GET /api/v2/productos/destacados - Productos destacados (ultra-rápido)
+        
+        La selección es fija dentro de cada franja de tiempo (FEATURED_BUCKET_SECONDS),
+        así que se puede cachear hasta que termine la franja.
         """
         start_time = time.time()
         
         try:
             limit = request.args.get('limit', 20, type=int)
             
-            products = json_db.get_featured_products(limit)
+            bucket, expires_in = featured_bucket()
+            products = json_db.get_featured_products(limit, bucket)
             
             total_time = time.time() - start_time
             
@@ -388,18 +607,23 @@ def create_json_productos_endpoints():
                 'meta': {
                     'total': len(products),
                     'type': 'featured',
-                    'limit': limit
+                    'limit': limit,
+                    'bucket': bucket,
+                    'expires_in': expires_in
                 },
                 'performance': {
                     'total_time': total_time,
                     'db_query_time': json_db.stats['last_query_time'],
+                    'snapshot_version': json_db.version,
                     'source': 'json_database',
                     'cache_hit': True,
-                    'optimization': 'random_sampling_from_index'
+                    'optimization': 'sales_weighted_alias_sampling'
                 }
             }
             
-            return jsonify(response), 200
+            if bucket is None:
+                return jsonify(response), 200, {'Cache-Control': 'no-store'}
+            return jsonify(response), 200, {'Cache-Control': f'public, max-age={expires_in}'}
             
         except Exception as e:
             return jsonify({
@@ -419,6 +643,9 @@ def create_json_productos_endpoints():
         
         try:
             stats = json_db.get_database_stats()
+            # Latencias p50/p95/p99 por endpoint y por consulta de este proceso
+            stats['metrics'] = metrics.summary()
+            stats['response_cache'] = response_cache.stats()
             
             total_time = time.time() - start_time
             
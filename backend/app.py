@@ -4,7 +4,9 @@ from flask_caching import Cache
 from config import Config
 from api.v1.endpoints.productos import create_json_productos_endpoints
 from api.v1.endpoints.ventas import ventas_bp
+from api.v1.endpoints.admin import admin_bp
 from json_database import start_json_database, json_db
+from services import metrics, profiling
 import time
 
 def create_app():
@@ -34,7 +36,7 @@ def create_app():
                 "http://localhost:3000"  # Para desarrollo local
             ],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"],
+            "allow_headers": ["Content-Type", "Authorization", "X-Admin-Token"],
             "supports_credentials": True
         }
     })
@@ -53,6 +55,14 @@ def create_app():
     # Registrar endpoints de ventas
     app.register_blueprint(ventas_bp, url_prefix='/api/v1/ventas')
     
+    # Registrar endpoints de administración (requieren ADMIN_TOKEN)
+    app.register_blueprint(admin_bp, url_prefix='/api/v1/admin')
+    
+    # Latencia por endpoint y GET /metrics (Prometheus)
+    metrics.init_app(app, json_db)
+    # Perfilado muestreado o con cabecera firmada (perfiles en /api/v1/admin/profiles)
+    profiling.init_app(app, json_db)
+    
     @app.route('/')
     def home():
         """Endpoint de bienvenida"""
@@ -66,6 +76,8 @@ def create_app():
                     'categoria': '/api/v1/productos/categoria/<categoria>',
                     'subcategoria': '/api/v1/productos/subcategoria/<subcategoria>',
                     'buscar': '/api/v1/productos/buscar/<query>',
+                    'autocomplete': '/api/v1/productos/autocomplete?q=<texto>',
+                    'filtrar': '/api/v1/productos/filtrar?subcategoria=&tamano=&stock=&precio_min=&precio_max=',
                     'stock': '/api/v1/productos/stock/<stock_status>',
                     'por_id': '/api/v1/productos/<id>',
                     'por_sku': '/api/v1/productos/sku/<sku>',
@@ -73,12 +85,19 @@ def create_app():
                     'destacados': '/api/v1/productos/destacados',
                     'stats': '/api/v1/productos/stats'
                 },
+                'metrics': '/metrics',
                 'ventas': {
                     'top_general': '/api/v1/ventas/top_general',
                     'top_categoria': '/api/v1/ventas/top_categoria/<categoria>',
                     'top_todas': '/api/v1/ventas/top_todas_categorias',
                     'estadisticas': '/api/v1/ventas/estadisticas',
                     'categorias': '/api/v1/ventas/categorias_con_ventas'
+                },
+                'admin': {
+                    'upsert_productos': 'POST /api/v1/admin/productos',
+                    'actualizar_producto': 'PATCH /api/v1/admin/productos/<id>',
+                    'eliminar_producto': 'DELETE /api/v1/admin/productos/<id>',
+                    'perfiles': 'GET /api/v1/admin/profiles'
                 }
             },
             'optimizaciones': {
@@ -162,6 +181,8 @@ def create_app():
                 '/api/v1/productos/categoria/*',
                 '/api/v1/productos/subcategoria/*',
                 '/api/v1/productos/buscar/*',
+                '/api/v1/productos/autocomplete',
+                '/api/v1/productos/filtrar',
                 '/api/v1/productos/stock/*',
                 '/api/v1/productos/<id>',
                 '/api/v1/productos/sku/<sku>',
@@ -180,10 +201,13 @@ def create_app():
                 '/',
                 '/health',
                 '/performance',
+                '/metrics',
                 '/api/v1/productos/',
                 '/api/v1/productos/categoria/<categoria>',
                 '/api/v1/productos/subcategoria/<subcategoria>',
                 '/api/v1/productos/buscar/<query>',
+                '/api/v1/productos/autocomplete',
+                '/api/v1/productos/filtrar',
                 '/api/v1/productos/stock/<stock_status>',
                 '/api/v1/productos/<id>',
                 '/api/v1/productos/sku/<sku>',
@@ -0,0 +1,10 @@
+"""
+Benchmarks de JSONDatabase con catálogos sintéticos.
+
+    python -m benchmarks.run --sizes 1000,10000,100000 --output resultados.json
+    python -m benchmarks.compare base.json resultados.json
+    python -m benchmarks.load --configs 1x1,2x4 --output carga.json
+
+Se ejecutan desde backend/ (igual que la app). Ver benchmarks/run.py y
+benchmarks/load.py (prueba de carga HTTP).
+"""
@@ -0,0 +1,134 @@
+"""
+Catálogos sintéticos con la forma del catálogo real.
+
+El modelo se toma de database/productos_db.json si existe: frecuencia de cada
+(Categoria, Sub Categoria, Sub Categoria Nivel), y por categoría los nombres,
+modelos, tamaños y precios de sus productos. Un producto sintético combina un
+nombre y un modelo de su categoría (a veces con una marca inventada, para que
+el vocabulario crezca con el catálogo como en uno real), un tamaño y un precio
+log-normal ajustado a la categoría. Las ventas siguen una ley de Zipf sobre
+una parte de los SKU.
+
+Con la misma semilla se genera el mismo catálogo.
+"""
+
+import json
+import math
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from json_database import JSON_DB_FILE, normalize_product
+
+# Fracción de productos con una marca inventada en el nombre
+SYNTHETIC_BRAND_RATE = 0.3
+# Fracción de SKU con ventas registradas y exponente de Zipf de las ventas
+SALES_COVERAGE = 0.3
+SALES_ZIPF_EXPONENT = 1.1
+MAX_SALES = 5000
+
+_SYLLABLES = ('ba', 'ca', 'do', 'fe', 'go', 'la', 'lu', 'ma', 'ni', 'ño', 'pe', 'ra', 'ri', 'sa',
+              'ta', 'to', 'va', 'xe', 'za', 'zu')
+
+# Modelo mínimo si no hay catálogo real
+_DEFAULT_PRODUCTS = [
+    {'Nombre': 'Cusqueña', 'Modelo': 'Lata', 'Tamaño': '355 ML', 'Precio B': 5.5,
+     'Categoria': 'CERVEZA', 'Sub Categoria': 'Cervezas', 'Sub Categoria Nivel': '7'},
+    {'Nombre': 'Johnnie Walker', 'Modelo': 'Red Label', 'Tamaño': '750 ML', 'Precio B': 59.9,
+     'Categoria': 'WHISKY', 'Sub Categoria': 'Whiskies', 'Sub Categoria Nivel': '1'},
+    {'Nombre': 'Cartavio', 'Modelo': 'Black', 'Tamaño': '750 ML', 'Precio B': 32.0,
+     'Categoria': 'RON OSCURO', 'Sub Categoria': 'Rones', 'Sub Categoria Nivel': '2'},
+    {'Nombre': 'Tabernero', 'Modelo': 'Borgoña', 'Tamaño': '750 ML', 'Precio B': 21.0,
+     'Categoria': 'VINO TINTO', 'Sub Categoria': 'Vinos', 'Sub Categoria Nivel': '4'},
+    {'Nombre': 'Inca Kola', 'Modelo': 'Botella', 'Tamaño': '2 LT', 'Precio B': 9.0,
+     'Categoria': 'GASEOSA', 'Sub Categoria': 'Otros', 'Sub Categoria Nivel': '11'}
+]
+
+
+class CatalogModel:
+    """Distribuciones de un catálogo de referencia"""
+
+    def __init__(self, products: Sequence[Dict]):
+        groups: Dict[Tuple[str, str, str], int] = {}
+        by_category: Dict[str, Dict[str, List]] = {}
+        in_stock = 0
+        for product in products:
+            product = normalize_product(product)
+            key = (product['Categoria'], product['Sub Categoria'], product['Sub Categoria Nivel'])
+            groups[key] = groups.get(key, 0) + 1
+            pools = by_category.setdefault(product['Categoria'], {'names': [], 'models': [], 'sizes': [], 'log_prices': []})
+            pools['names'].append(product['Nombre'])
+            pools['models'].append(product['Modelo'])
+            pools['sizes'].append(product['Tamaño'])
+            if product['Precio B'] > 0:
+                pools['log_prices'].append(math.log(product['Precio B']))
+            in_stock += product['Stock'] == 'Con Stock'
+
+        self.groups = list(groups)
+        self.group_weights = [groups[key] for key in self.groups]
+        self.pools = by_category
+        self.prices: Dict[str, Tuple[float, float]] = {}
+        for categoria, pools in by_category.items():
+            values = pools['log_prices'] or [math.log(10.0)]
+            mean = sum(values) / len(values)
+            deviation = math.sqrt(sum((value - mean) ** 2 for value in values) / len(values))
+            self.prices[categoria] = (mean, max(deviation, 0.1))
+        # El catálogo real puede estar todo con stock; se deja al menos un 10% sin stock
+        self.stock_rate = min(in_stock / len(products), 0.9) if products else 0.9
+
+    @classmethod
+    def load(cls, path: Path = JSON_DB_FILE) -> 'CatalogModel':
+        """Modelo del catálogo real, o uno mínimo si el archivo no existe"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                products = json.load(f).get('products', [])
+        except (OSError, ValueError):
+            products = []
+        return cls(products or _DEFAULT_PRODUCTS)
+
+
+def _brand(rng: random.Random) -> str:
+    return ''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def generate_catalog(size: int, model: Optional[CatalogModel] = None,
+                     seed: int = 42) -> Tuple[List[Dict], Dict[str, int]]:
+    """`size` productos normalizados y sus ventas (SKU -> unidades)"""
+    model = model or CatalogModel.load()
+    rng = random.Random(seed)
+    # Marcas inventadas: unas pocas muy frecuentes y muchas raras (Zipf)
+    brands = [_brand(rng) for _ in range(max(10, size // 50))]
+    brand_weights = [1 / (rank + 1) for rank in range(len(brands))]
+    group_choices = rng.choices(model.groups, weights=model.group_weights, k=size)
+    brand_choices = rng.choices(brands, weights=brand_weights, k=size)
+
+    products = []
+    for index, (categoria, sub_categoria, nivel) in enumerate(group_choices):
+        pools = model.pools[categoria]
+        nombre = rng.choice(pools['names'])
+        if rng.random() < SYNTHETIC_BRAND_RATE:
+            nombre = f"{nombre} {brand_choices[index]}"
+        mean, deviation = model.prices[categoria]
+        precio = round(math.exp(rng.gauss(mean, deviation)), 1)
+        products.append(normalize_product({
+            'id': index + 1,
+            'SKU': f"{rng.randrange(10 ** 12, 10 ** 13)}",
+            'Nombre': nombre,
+            'Modelo': rng.choice(pools['models']),
+            'Tamaño': rng.choice(pools['sizes']),
+            'Precio B': precio,
+            'Precio J': round(precio * 0.92, 1),
+            'Categoria': categoria,
+            'Sub Categoria': sub_categoria,
+            'Stock': 'Con Stock' if rng.random() < model.stock_rate else 'Sin Stock',
+            'Sub Categoria Nivel': nivel,
+            'Cantidad': rng.randint(0, 48),
+            'Photo': f"https://example.com/productos/{index + 1}.webp"
+        }))
+
+    sold = rng.sample(range(size), int(size * SALES_COVERAGE))
+    ventas = {
+        products[index]['SKU']: max(1, int(MAX_SALES / (rank + 1) ** SALES_ZIPF_EXPONENT))
+        for rank, index in enumerate(sold)
+    }
+    return products, ventas
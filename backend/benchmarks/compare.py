@@ -0,0 +1,82 @@
+"""
+Comparar dos resultados de benchmarks.run (p. ej. main contra una rama).
+
+    python -m benchmarks.compare base.json nuevo.json --threshold 0.2
+
+Compara tiempos (p50 de cada consulta y segundos de construcción,
+guardado y carga) y memoria por tamaño de catálogo. Lista las métricas que
+empeoran o mejoran más que `threshold` (fracción) y termina con código 1 si
+alguna empeora, para usarlo en CI.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Tuple
+
+DEFAULT_THRESHOLD = 0.2
+# Por debajo de esto las diferencias son ruido del reloj
+MIN_SECONDS = 0.0005
+MIN_MICROSECONDS = 5.0
+
+
+def _metrics(result: Dict) -> Iterator[Tuple[str, float, float]]:
+    """(nombre, valor, mínimo significativo) de cada métrica comparable de un tamaño"""
+    build = result.get('build', {})
+    for name in ('snapshot_seconds', 'lazy_seconds', 'publish_seconds'):
+        if name in build:
+            yield f'build.{name}', build[name], MIN_SECONDS
+    for name, value in build.get('indexes_seconds', {}).items():
+        if value is not None:
+            yield f'build.indexes.{name}', value, MIN_SECONDS
+    for name, value in result.get('persistence', {}).items():
+        if name.endswith('_seconds'):
+            yield f'persistence.{name}', value, MIN_SECONDS
+    for name, value in result.get('memory', {}).items():
+        yield f'memory.{name}', value, 0
+    for name, stats in result.get('queries', {}).items():
+        yield f'queries.{name}.p50_us', stats['p50_us'], MIN_MICROSECONDS
+
+
+def compare(base: Dict, new: Dict, threshold: float = DEFAULT_THRESHOLD) -> Tuple[list, list]:
+    """(regresiones, mejoras): listas de (tamaño, métrica, base, nuevo, cambio)"""
+    regressions, improvements = [], []
+    for size, new_result in new.get('results', {}).items():
+        base_metrics = {name: value for name, value, _ in _metrics(base.get('results', {}).get(size, {}))}
+        for name, value, minimum in _metrics(new_result):
+            before = base_metrics.get(name)
+            if before is None or max(before, value) <= minimum or before <= 0:
+                continue
+            change = (value - before) / before
+            if change > threshold:
+                regressions.append((size, name, before, value, change))
+            elif change < -threshold:
+                improvements.append((size, name, before, value, change))
+    return regressions, improvements
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Comparar resultados de benchmarks.run')
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='cambio relativo a partir del cual se informa (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+    regressions, improvements = compare(base, new, args.threshold)
+
+    print(f"base {base['meta'].get('commit') or '?'} -> nuevo {new['meta'].get('commit') or '?'} "
+          f"(umbral {args.threshold:.0%})")
+    for title, rows in (('Empeoran', regressions), ('Mejoran', improvements)):
+        print(f"\n{title}: {len(rows)}")
+        for size, name, before, value, change in sorted(rows, key=lambda row: -abs(row[4])):
+            print(f"  {size:>8} {name:<45} {before:>14.6g} -> {value:<14.6g} {change:+.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
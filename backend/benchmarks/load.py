@@ -0,0 +1,649 @@
+"""
+Prueba de carga de punta a punta contra `create_app()`.
+
+Levanta la app en N procesos (workers) de T hilos cada uno, que comparten un
+socket como los workers de gunicorn, y la carga con clientes HTTP que
+reproducen el tráfico de la tienda (ver frontend/):
+
+- homepage: /categorias?limit=10 y cuatro /subcategoria/<X>
+- product: /<id>, relacionados /subcategoria/<sub>?limit=50 y /?limit=100
+- typeahead: /buscar/<prefijo>?limit=10 mientras se escribe el término
+
+o, con --access-log, las peticiones GET de un access log de gunicorn.
+
+Cada worker trabaja en un directorio temporal con una copia del catálogo
+(real o sintético con --catalog N), así no toca database/. Con --sync los
+workers corren el refresco (líder/seguidores) con CatalogSync contra una
+base SQLite que hace de MySQL y que un hilo va modificando durante la prueba.
+
+Para cada configuración informa throughput y latencias (p50/p95/p99/max)
+por endpoint, en JSON (--output o stdout). Ejecutar desde backend/:
+
+    python -m benchmarks.load --configs 1x1,2x4 --clients 8 --duration 10
+    python -m benchmarks.load --catalog 10000 --sync --output carga.json
+    python -m benchmarks.load --access-log access.log --configs 4x1
+
+Los workers se crean con fork (Linux y macOS). El cliente también gasta CPU:
+si satura, subir --client-processes o correrlo en otra máquina.
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import re
+import shutil
+import signal
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from benchmarks.catalog import CatalogModel, generate_catalog
+from benchmarks.run import _git_commit, _percentile, _query_vocabulary
+from json_database import JSON_DB_FILE, json_db, normalize_product
+from services.catalog_refresher import CatalogRefresher
+from services.catalog_sync import CatalogSync, sqlite_connection
+from utils.product_store import PRODUCT_FIELDS
+
+DEFAULT_CONFIGS = '1x1,2x4'
+DEFAULT_CLIENTS = 8
+DEFAULT_DURATION = 10.0
+DEFAULT_MIX = 'homepage=0.3,product=0.5,typeahead=0.2'
+# Subcategorías que pide la portada (frontend/app/page.tsx)
+HOMEPAGE_SUBCATEGORIES = ('Whiskies', 'Combos', 'Piscos', 'Cervezas')
+# Pulsaciones del typeahead que llegan al backend (el resto las absorbe el debounce)
+TYPEAHEAD_REQUESTS = 3
+# Segundos para que los workers carguen el catálogo y para cada petición
+STARTUP_TIMEOUT = 120.0
+REQUEST_TIMEOUT = 30.0
+# Sincronización contra SQLite (--sync)
+DEFAULT_SYNC_INTERVAL = 2.0
+DEFAULT_MUTATIONS = 5.0  # filas modificadas por segundo
+
+API = '/api/v1/productos'
+ACCESS_LOG_LINE = re.compile(r'"(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3})')
+
+# Ruta -> etiqueta del endpoint, en el orden en que se prueban
+ENDPOINT_LABELS = (
+    (re.compile(rf'^{API}/?(\?|$)'), 'productos/'),
+    (re.compile(rf'^{API}/\d+(\?|$)'), 'productos/<id>'),
+    (re.compile(rf'^{API}/(categoria|subcategoria|buscar|sku|stock)/'), None),
+    (re.compile(rf'^{API}/(\w+)'), None),
+)
+
+logger = logging.getLogger(__name__)
+
+
+def endpoint_label(path: str) -> str:
+    """Etiqueta estable de una ruta: /api/v1/productos/buscar/ron?limit=10 -> productos/buscar"""
+    for pattern, label in ENDPOINT_LABELS:
+        match = pattern.match(path)
+        if match:
+            return label or f'productos/{match.group(1)}'
+    return path.split('?', 1)[0]
+
+
+# --- Servidor -----------------------------------------------------------------
+
+class _QuietHandler(WSGIRequestHandler):
+    # Sin keep-alive, como los workers sync de gunicorn; sin log por petición
+    protocol_version = 'HTTP/1.0'
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Servidor WSGI de werkzeug con un pool fijo de hilos (threads=1: atiende en el hilo principal)"""
+
+    def __init__(self, app, fd: int, threads: int):
+        super().__init__('127.0.0.1', 0, app, handler=_QuietHandler, fd=fd)
+        self.multithread = threads > 1
+        self.multiprocess = True
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix='http') if threads > 1 else None
+
+    def process_request(self, request, client_address):
+        if self.pool is None:
+            return super().process_request(request, client_address)
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class _CountingSync(CatalogSync):
+    """CatalogSync que acumula lo aplicado en la prueba"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.totals = {'passes': 0, 'inserted': 0, 'updated': 0, 'deleted': 0, 'sync_time': 0.0}
+
+    def sync_once(self):
+        result = super().sync_once()
+        if result is not None:
+            self.totals['passes'] += 1
+            for key in ('inserted', 'updated', 'deleted', 'sync_time'):
+                self.totals[key] += result[key]
+        return result
+
+
+class _CountingRefresher(CatalogRefresher):
+    """CatalogRefresher que cuenta las recargas de los seguidores"""
+
+    reloads = 0
+
+    def check_file(self) -> bool:
+        reloaded = super().check_file()
+        self.reloads += reloaded
+        return reloaded
+
+
+class _Shutdown(Exception):
+    pass
+
+
+def _raise_shutdown(signum, frame):
+    raise _Shutdown()
+
+
+def _worker(fd: int, threads: int, sync: Optional[Dict[str, Any]], events, verbose: bool):
+    """Proceso worker: crear la app (como post_worker_init en gunicorn) y servir hasta SIGTERM"""
+    signal.signal(signal.SIGTERM, _raise_shutdown)
+    os.environ['CATALOG_REFRESH_DEFERRED'] = '1'
+    output = open(os.devnull, 'w') if not verbose else None
+    with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+        from app import create_app
+        app = create_app()
+    json_db.start_index_warmup()
+
+    refresher = None
+    if sync is not None:
+        database_path = sync['database']
+        refresher = _CountingRefresher(
+            json_db, interval=sync['interval'], watch_interval=min(1.0, sync['interval']),
+            sync=_CountingSync(
+                json_db, connect=lambda: sqlite_connection(database_path), close=lambda c: c.close(),
+                placeholder='?', min_interval=sync['interval'], max_interval=sync['interval']
+            )
+        )
+        refresher.start()
+
+    server = PooledWSGIServer(app, fd, threads)
+    initial_version = json_db.version
+    events.put(('ready', os.getpid()))
+    try:
+        server.serve_forever()
+    except _Shutdown:
+        pass
+    finally:
+        if server.pool is not None:
+            server.pool.shutdown(wait=True)
+        status = {
+            'pid': os.getpid(),
+            'initial_version': initial_version,
+            'final_version': json_db.version,
+            'products': json_db.count_total()
+        }
+        if refresher is not None:
+            refresher.stop()
+            status['role'] = 'leader' if refresher.sync.totals['passes'] else 'follower'
+            status['sync'] = refresher.sync.totals
+            status['reloads'] = refresher.reloads
+        events.put(('stopped', status))
+        if output:
+            output.close()
+
+
+class ServerGroup:
+    """N workers sobre un socket compartido (prefork, como gunicorn)"""
+
+    def __init__(self, workers: int, threads: int, sync: Optional[Dict[str, Any]] = None,
+                 verbose: bool = False):
+        self.workers = workers
+        self.threads = threads
+        self.sync = sync
+        self.verbose = verbose
+        self.context = multiprocessing.get_context('fork')
+        self.events = self.context.Queue()
+        self.processes: List[multiprocessing.Process] = []
+        self.socket: Optional[socket.socket] = None
+
+    @property
+    def port(self) -> int:
+        return self.socket.getsockname()[1]
+
+    def start(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.listen(1024)
+        for _ in range(self.workers):
+            process = self.context.Process(
+                target=_worker, args=(self.socket.fileno(), self.threads, self.sync, self.events, self.verbose),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+        deadline = time.time() + STARTUP_TIMEOUT
+        ready = 0
+        while ready < self.workers:
+            kind, _ = self.events.get(timeout=max(0.1, deadline - time.time()))
+            ready += kind == 'ready'
+
+    def stop(self) -> List[Dict[str, Any]]:
+        """Detener los workers y devolver su estado final"""
+        for process in self.processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        statuses = []
+        with contextlib.suppress(Exception):
+            while len(statuses) < len(self.processes):
+                kind, status = self.events.get(timeout=10)
+                if kind == 'stopped':
+                    statuses.append(status)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        self.socket.close()
+        return sorted(statuses, key=lambda status: status['pid'])
+
+
+# --- Base SQLite que hace de MySQL ----------------------------------------------
+
+def create_sqlite_catalog(path: str, products: Sequence[Dict]):
+    """Tabla `productos` con las columnas de PRODUCT_FIELDS y el catálogo dado"""
+    columns = ', '.join(f'`{field}` INTEGER PRIMARY KEY' if field == 'id' else f'`{field}`'
+                        for field in PRODUCT_FIELDS)
+    marks = ', '.join('?' * len(PRODUCT_FIELDS))
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(f'CREATE TABLE productos ({columns})')
+        connection.executemany(
+            f"INSERT INTO productos VALUES ({marks})",
+            [tuple(product.get(field) for field in PRODUCT_FIELDS) for product in products]
+        )
+    connection.close()
+
+
+class CatalogMutator:
+    """Hilo que modifica la tabla SQLite a un ritmo fijo: precios, stock, altas y bajas"""
+
+    def __init__(self, path: str, rate: float, seed: int):
+        self.path = path
+        self.rate = rate
+        self.rng = random.Random(seed)
+        self.counts = {'updated': 0, 'inserted': 0, 'deleted': 0}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _mutate(self, connection: sqlite3.Connection):
+        rng = self.rng
+        ids = [row[0] for row in connection.execute('SELECT id FROM productos')]
+        roll = rng.random()
+        with connection:
+            if roll < 0.05 and ids:
+                connection.execute('DELETE FROM productos WHERE id = ?', (rng.choice(ids),))
+                self.counts['deleted'] += 1
+            elif roll < 0.10 and ids:
+                # Alta: copia de un producto existente con id y SKU nuevos
+                source = connection.execute('SELECT * FROM productos WHERE id = ?', (rng.choice(ids),)).fetchone()
+                row = list(source)
+                row[PRODUCT_FIELDS.index('id')] = max(ids) + 1
+                row[PRODUCT_FIELDS.index('SKU')] = f'{rng.randrange(10 ** 12, 10 ** 13)}'
+                connection.execute(f"INSERT INTO productos VALUES ({', '.join('?' * len(row))})", row)
+                self.counts['inserted'] += 1
+            elif ids:
+                connection.execute(
+                    'UPDATE productos SET `Precio B` = ROUND(`Precio B` * ?, 1), `Stock` = ? WHERE id = ?',
+                    (rng.uniform(0.9, 1.1), rng.choice(('Con Stock', 'Sin Stock')), rng.choice(ids))
+                )
+                self.counts['updated'] += 1
+
+    def _run(self):
+        connection = sqlite3.connect(self.path)
+        try:
+            while not self._stop.wait(1 / self.rate):
+                self._mutate(connection)
+        finally:
+            connection.close()
+
+    def start(self):
+        if self.rate > 0:
+            self._thread = threading.Thread(target=self._run, name='catalog-mutator', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return dict(self.counts)
+
+
+# --- Cliente --------------------------------------------------------------------
+
+class StorefrontTraffic:
+    """Sesiones de la tienda con rutas y argumentos tomados del catálogo"""
+
+    def __init__(self, products: Sequence[Dict], mix: Dict[str, float]):
+        vocabulary = _query_vocabulary(list(products))
+        self.ids = vocabulary['ids']
+        self.terms = [term for term in vocabulary['terms'] if len(term) >= 4] or vocabulary['terms']
+        self.sub_categoria = {product['id']: product['Sub Categoria'] for product in products}
+        available = set(vocabulary['sub_categorias'])
+        homepage = [name for name in HOMEPAGE_SUBCATEGORIES if name in available]
+        self.homepage = homepage or vocabulary['sub_categorias'][:4]
+        self.scenarios = list(mix)
+        self.weights = [mix[name] for name in self.scenarios]
+
+    def homepage_paths(self, rng: random.Random) -> List[str]:
+        return [f'{API}/categorias?limit=10'] + [f'{API}/subcategoria/{quote(name, safe="")}'
+                                               for name in self.homepage]
+
+    def product_paths(self, rng: random.Random) -> List[str]:
+        product_id = rng.choice(self.ids)
+        sub_categoria = self.sub_categoria[product_id]
+        paths = [f'{API}/{product_id}']
+        # Sin subcategoría el frontend no pide relacionados (y /subcategoria/ vacía daría 404)
+        if sub_categoria:
+            paths.append(f'{API}/subcategoria/{quote(sub_categoria, safe="")}?limit=50&offset=0')
+        # El frontend pide /productos?limit=100 (sin barra, redirige); aquí directo a la ruta final
+        return paths + [f'{API}/?limit=100&offset=0']
+
+    def typeahead_paths(self, rng: random.Random) -> List[str]:
+        term = rng.choice(self.terms)
+        lengths = sorted({min(len(term), 3 + step * 2) for step in range(TYPEAHEAD_REQUESTS)})
+        return [f'{API}/buscar/{quote(term[:length], safe="")}?limit=10' for length in lengths]
+
+    def sessions(self, rng: random.Random) -> Iterator[Tuple[str, List[str]]]:
+        while True:
+            scenario = rng.choices(self.scenarios, weights=self.weights)[0]
+            yield scenario, getattr(self, f'{scenario}_paths')(rng)
+
+
+class AccessLogTraffic:
+    """Peticiones GET de un access log de gunicorn, en orden y en bucle"""
+
+    def __init__(self, path: str):
+        self.paths = []
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                match = ACCESS_LOG_LINE.search(line)
+                if match and match.group('method') == 'GET':
+                    self.paths.append(match.group('path'))
+        if not self.paths:
+            raise ValueError(f'No hay peticiones GET en {path}')
+
+    def sessions(self, rng: random.Random) -> Iterator[Tuple[str, List[str]]]:
+        start = rng.randrange(len(self.paths))
+        while True:
+            for path in self.paths[start:] + self.paths[:start]:
+                yield 'access_log', [path]
+
+
+def _request(port: int, path: str) -> Tuple[int, int]:
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=REQUEST_TIMEOUT)
+    try:
+        connection.request('GET', path, headers={'Accept': 'application/json', 'Connection': 'close'})
+        response = connection.getresponse()
+        return response.status, len(response.read())
+    finally:
+        connection.close()
+
+
+def _client_thread(port: int, traffic, seed: int, deadline: float, samples: List, sessions: Dict[str, int]):
+    rng = random.Random(seed)
+    for scenario, paths in traffic.sessions(rng):
+        if time.perf_counter() >= deadline:
+            return
+        for path in paths:
+            start = time.perf_counter()
+            try:
+                status, size = _request(port, path)
+            except (OSError, http.client.HTTPException):
+                status, size = 0, 0
+            samples.append((endpoint_label(path), status, time.perf_counter() - start, size))
+        sessions[scenario] = sessions.get(scenario, 0) + 1
+
+
+def _client_process(port: int, traffic, clients: int, seed: int, duration: float, results):
+    """Proceso cliente: `clients` hilos en lazo cerrado durante `duration` segundos"""
+    deadline = time.perf_counter() + duration
+    samples: List[Tuple[str, int, float, int]] = []
+    per_thread = [dict() for _ in range(clients)]
+    threads = [threading.Thread(target=_client_thread,
+                                args=(port, traffic, seed * 1000 + index, deadline, samples, per_thread[index]))
+               for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sessions: Dict[str, int] = {}
+    for counts in per_thread:
+        for scenario, count in counts.items():
+            sessions[scenario] = sessions.get(scenario, 0) + count
+    results.put((samples, sessions))
+
+
+def run_clients(port: int, traffic, clients: int, processes: int, seed: int,
+                duration: float) -> Tuple[List[Tuple[str, int, float, int]], Dict[str, int], float]:
+    """Repartir los clientes entre procesos; (muestras, sesiones, segundos reales)"""
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    shares = [clients // processes + (index < clients % processes) for index in range(processes)]
+    started = time.perf_counter()
+    workers = [context.Process(target=_client_process,
+                               args=(port, traffic, share, seed + index, duration, results))
+               for index, share in enumerate(shares) if share]
+    for worker in workers:
+        worker.start()
+    samples, sessions = [], {}
+    for _ in workers:
+        worker_samples, worker_sessions = results.get(timeout=duration + REQUEST_TIMEOUT * 2)
+        samples.extend(worker_samples)
+        for scenario, count in worker_sessions.items():
+            sessions[scenario] = sessions.get(scenario, 0) + count
+    for worker in workers:
+        worker.join()
+    return samples, sessions, time.perf_counter() - started
+
+
+def summarize(samples: Sequence[Tuple[str, int, float, int]], elapsed: float) -> Dict[str, Any]:
+    """Throughput y latencias (ms) en total y por endpoint"""
+    def stats(rows) -> Dict[str, Any]:
+        durations = sorted(row[2] for row in rows)
+        statuses: Dict[str, int] = {}
+        for row in rows:
+            # 0 = sin respuesta (conexión rechazada o timeout)
+            statuses[str(row[1])] = statuses.get(str(row[1]), 0) + 1
+        to_ms = 1000
+        return {
+            'requests': len(rows),
+            'errors': sum(1 for row in rows if not 200 <= row[1] < 400),
+            'statuses': statuses,
+            'throughput_rps': round(len(rows) / elapsed, 2) if elapsed else None,
+            'bytes': sum(row[3] for row in rows),
+            'mean_ms': round(sum(durations) / len(durations) * to_ms, 3) if durations else None,
+            'p50_ms': round(_percentile(durations, 0.5) * to_ms, 3) if durations else None,
+            'p95_ms': round(_percentile(durations, 0.95) * to_ms, 3) if durations else None,
+            'p99_ms': round(_percentile(durations, 0.99) * to_ms, 3) if durations else None,
+            'max_ms': round(durations[-1] * to_ms, 3) if durations else None
+        }
+
+    by_label: Dict[str, List] = {}
+    for row in samples:
+        by_label.setdefault(row[0], []).append(row)
+    return {
+        'total': stats(samples),
+        'endpoints': {label: stats(rows) for label, rows in sorted(by_label.items())}
+    }
+
+
+# --- Ejecución --------------------------------------------------------------------
+
+def _parse_configs(text: str) -> List[Tuple[int, int]]:
+    configs = []
+    for item in text.split(','):
+        workers, _, threads = item.strip().partition('x')
+        configs.append((int(workers), int(threads or 1)))
+    return configs
+
+
+def _parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name not in ('homepage', 'product', 'typeahead'):
+            raise ValueError(f'Escenario desconocido: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def prepare_catalog(workdir: Path, catalog: str, seed: int) -> List[Dict]:
+    """Guardar el catálogo de la prueba en workdir/catalog.json y devolverlo"""
+    target = workdir / 'catalog.json'
+    if catalog == 'real':
+        shutil.copyfile(JSON_DB_FILE, target)
+        with open(target, 'r', encoding='utf-8') as f:
+            return [normalize_product(product) for product in json.load(f).get('products', [])]
+    products, ventas = generate_catalog(int(catalog), CatalogModel.load(), seed)
+    # Los workers heredan las ventas (JSONDatabase las carga al importarse)
+    json_db.ventas_data = ventas
+    with open(target, 'w', encoding='utf-8') as f:
+        json.dump({'products': products, 'last_update': datetime.now().isoformat()}, f, ensure_ascii=False)
+    return products
+
+
+def _reset_database(workdir: Path):
+    """database/ con solo el catálogo original: cada configuración parte del mismo estado"""
+    database = workdir / JSON_DB_FILE.parent
+    shutil.rmtree(database, ignore_errors=True)
+    database.mkdir()
+    shutil.copyfile(workdir / 'catalog.json', workdir / JSON_DB_FILE)
+
+
+def run_config(workers: int, threads: int, traffic, products: List[Dict], workdir: Path,
+               args) -> Dict[str, Any]:
+    """Una configuración: levantar los workers, cargar, detener y resumir"""
+    _reset_database(workdir)
+    sync = mutator = None
+    if args.sync:
+        database = str(workdir / f'mysql-{workers}x{threads}.sqlite')
+        create_sqlite_catalog(database, products)
+        sync = {'database': database, 'interval': args.sync_interval}
+        mutator = CatalogMutator(database, args.mutations, args.seed)
+
+    group = ServerGroup(workers, threads, sync=sync, verbose=args.verbose)
+    try:
+        group.start()
+        logger.info(f'⚙️ {workers} workers x {threads} hilos en el puerto {group.port}; '
+                    f'{args.clients} clientes durante {args.duration:.0f}s')
+        if mutator is not None:
+            mutator.start()
+        samples, sessions, elapsed = run_clients(
+            group.port, traffic, args.clients, args.client_processes, args.seed, args.duration
+        )
+    finally:
+        mutations = mutator.stop() if mutator is not None else None
+        servers = group.stop()
+
+    result = {'workers': workers, 'threads': threads, 'clients': args.clients,
+              'duration': round(elapsed, 3), 'sessions': sessions, **summarize(samples, elapsed),
+              'servers': servers}
+    if mutations is not None:
+        result['mutations'] = mutations
+    total = result['total']
+    logger.info(f"   {total['throughput_rps']} req/s, p50 {total['p50_ms']} ms, p99 {total['p99_ms']} ms, "
+                f"{total['errors']} errores")
+    for label, stats in result['endpoints'].items():
+        logger.info(f"   {label:<28} {stats['requests']:>7} req  p50 {stats['p50_ms']:>8} ms  "
+                    f"p95 {stats['p95_ms']:>8} ms  p99 {stats['p99_ms']:>8} ms")
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Prueba de carga de la API con tráfico de la tienda')
+    parser.add_argument('--configs', default=DEFAULT_CONFIGS,
+                        help='workers x hilos separados por coma (p. ej. 1x1,2x4,4x8)')
+    parser.add_argument('--clients', type=int, default=DEFAULT_CLIENTS, help='usuarios concurrentes')
+    parser.add_argument('--client-processes', type=int, default=1, help='procesos entre los que se reparten')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='segundos por configuración')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='peso de cada escenario (homepage, product, typeahead)')
+    parser.add_argument('--access-log', help='reproducir las peticiones GET de un access log de gunicorn')
+    parser.add_argument('--catalog', default='real',
+                        help="'real' (database/productos_db.json) o número de productos sintéticos")
+    parser.add_argument('--sync', action='store_true',
+                        help='sincronizar contra una base SQLite que se modifica durante la prueba')
+    parser.add_argument('--sync-interval', type=float, default=DEFAULT_SYNC_INTERVAL)
+    parser.add_argument('--mutations', type=float, default=DEFAULT_MUTATIONS, help='filas modificadas por segundo')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='archivo JSON de resultados (por defecto stdout)')
+    parser.add_argument('--verbose', action='store_true', help='mostrar la salida y los logs de la app')
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    configs = _parse_configs(args.configs)
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'catalog': args.catalog,
+            'traffic': 'access_log' if args.access_log else _parse_mix(args.mix),
+            'sync': {'interval': args.sync_interval, 'mutations_per_second': args.mutations} if args.sync else None,
+            'seed': args.seed
+        },
+        'results': {}
+    }
+
+    previous_cwd = os.getcwd()
+    workdir = Path(tempfile.mkdtemp(prefix='ats-load-'))
+    try:
+        products = prepare_catalog(workdir, args.catalog, args.seed)
+        traffic = AccessLogTraffic(args.access_log) if args.access_log else StorefrontTraffic(
+            products, _parse_mix(args.mix)
+        )
+        # Los workers leen y escriben database/ relativo al directorio actual
+        os.chdir(workdir)
+        for workers, threads in configs:
+            report['results'][f'{workers}x{threads}'] = run_config(workers, threads, traffic, products, workdir, args)
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    encoded = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(encoded + '\n', encoding='utf-8')
+        logger.info(f'📄 Resultados en {args.output}')
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
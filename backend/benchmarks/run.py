@@ -0,0 +1,294 @@
+"""
+Benchmark de JSONDatabase sobre catálogos sintéticos (ver benchmarks/catalog.py).
+
+Para cada tamaño de catálogo mide:
+
+- build: construcción del snapshot y tiempo de cada índice, incluidos los
+  diferidos (que se fuerzan a construir);
+- memory: pico y memoria retenida del snapshot con tracemalloc (en una
+  construcción aparte, porque tracemalloc enlentece la medición de tiempos);
+- persistence: guardado y carga del JSON y del snapshot binario en un
+  directorio temporal (no toca database/);
+- queries: cada método de consulta de JSONDatabase con argumentos variados,
+  durante un presupuesto de tiempo por método (media, p50, p95, p99 en µs).
+
+El resultado es JSON (--output o stdout) para comparar commits con
+`python -m benchmarks.compare`. Ejecutar desde backend/:
+
+    python -m benchmarks.run --sizes 1000,10000,100000 --output resultados.json
+
+1M productos funciona (--sizes 1000000) pero tarda minutos y necesita varios GB.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.catalog import CatalogModel, generate_catalog
+from json_database import (
+    CatalogSnapshot, JSONDatabase, LAZY_INDEXES, LISTING_ORDERS, SNAPSHOT_COMPRESS, STORAGE_MODE
+)
+from utils.snapshot_file import SnapshotFile, atomic_write, write_snapshot
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Segundos de medición por método de consulta (y mínimo/máximo de llamadas)
+DEFAULT_BUDGET = 0.3
+MIN_CALLS = 20
+MAX_CALLS = 5000
+WARMUP_CALLS = 3
+
+logger = logging.getLogger(__name__)
+
+
+def _timed(fn: Callable, *args, **kwargs) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _percentile(ordered: List[float], quantile: float) -> float:
+    return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+
+def bench_calls(call: Callable[[random.Random], Any], rng: random.Random,
+                budget: float = DEFAULT_BUDGET) -> Dict[str, float]:
+    """Llamar `call(rng)` durante `budget` segundos; estadísticas por llamada en µs"""
+    for _ in range(WARMUP_CALLS):
+        call(rng)
+    durations = []
+    deadline = time.perf_counter() + budget
+    while len(durations) < MAX_CALLS and (len(durations) < MIN_CALLS or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        call(rng)
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    to_us = 1_000_000
+    return {
+        'calls': len(durations),
+        'mean_us': round(statistics.fmean(durations) * to_us, 2),
+        'min_us': round(durations[0] * to_us, 2),
+        'p50_us': round(_percentile(durations, 0.5) * to_us, 2),
+        'p95_us': round(_percentile(durations, 0.95) * to_us, 2),
+        'p99_us': round(_percentile(durations, 0.99) * to_us, 2)
+    }
+
+
+def _query_vocabulary(products: List[Dict]) -> Dict[str, List]:
+    """Argumentos realistas para las consultas: términos, prefijos, errores de tipeo"""
+    words = [word.lower() for product in products[:5000] for word in product['Nombre'].split() if len(word) > 3]
+    words = words or ['whisky']
+    return {
+        'ids': [product['id'] for product in products],
+        'skus': [product['SKU'] for product in products],
+        'categorias': sorted({product['Categoria'] for product in products}),
+        'sub_categorias': sorted({product['Sub Categoria'] for product in products}),
+        'terms': words,
+        # Una letra menos: "whsky"
+        'typos': [word[:1] + word[2:] for word in words],
+        'prefixes': [word[:3] for word in words]
+    }
+
+
+def query_calls(db: JSONDatabase, vocabulary: Dict[str, List]) -> Dict[str, Callable[[random.Random], Any]]:
+    """Método de consulta -> llamada con argumentos al azar"""
+    pick = lambda name: (lambda rng: rng.choice(vocabulary[name]))
+    term, typo, prefix = pick('terms'), pick('typos'), pick('prefixes')
+    categoria, sub_categoria = pick('categorias'), pick('sub_categorias')
+    calls = {
+        'get_all': lambda rng: db.get_all(limit=20, offset=rng.randrange(0, 1000)),
+        'get_by_id': lambda rng: db.get_by_id(rng.choice(vocabulary['ids'])),
+        'get_by_sku': lambda rng: db.get_by_sku(rng.choice(vocabulary['skus'])),
+        'get_by_categoria': lambda rng: db.get_by_categoria(categoria(rng), limit=20),
+        'get_by_sub_categoria': lambda rng: db.get_by_sub_categoria(sub_categoria(rng), limit=20),
+        'get_by_stock': lambda rng: db.get_by_stock('Con Stock', limit=20),
+        'list_products:precio_rango': lambda rng: db.list_products(
+            'categoria', categoria(rng), 'precio_asc', limit=20, precio_min=10, precio_max=80
+        ),
+        'search_with_total': lambda rng: db.search_with_total(term(rng), limit=20),
+        'fuzzy_search': lambda rng: db.fuzzy_search(typo(rng), limit=20),
+        'ranked_search': lambda rng: db.ranked_search(term(rng), limit=20),
+        'search_page': lambda rng: db.search_page(term(rng), modo='auto', limit=20),
+        'autocomplete': lambda rng: db.autocomplete(prefix(rng)),
+        'filter_products': lambda rng: db.filter_products(
+            {'categoria': [categoria(rng)], 'stock': ['Con Stock']}, precio_min=10, precio_max=200, limit=20
+        ),
+        'get_categories': lambda rng: db.get_categories(),
+        'get_featured_products': lambda rng: db.get_featured_products(20),
+        'count_total': lambda rng: db.count_total(),
+        'count_by_categoria': lambda rng: db.count_by_categoria(categoria(rng))
+    }
+    for order in LISTING_ORDERS:
+        calls[f'list_products:{order}'] = (
+            lambda rng, order=order: db.list_products('categoria', categoria(rng), order, limit=20)
+        )
+    return calls
+
+
+def bench_build(products: List[Dict], ventas: Dict[str, int]) -> Tuple[CatalogSnapshot, Dict[str, Any]]:
+    """Snapshot completo (con los índices diferidos construidos) y sus tiempos"""
+    snapshot, total = _timed(CatalogSnapshot, products, datetime.now(), ventas_data=ventas)
+    for name in LAZY_INDEXES:
+        snapshot.lazy[name].build()
+    indexes = {name: status['build_time'] for name, status in snapshot.index_status().items()}
+    return snapshot, {
+        'snapshot_seconds': total,
+        'lazy_seconds': sum(indexes[name] for name in LAZY_INDEXES),
+        'indexes_seconds': indexes
+    }
+
+
+def bench_memory(products: List[Dict], ventas: Dict[str, int]) -> Dict[str, int]:
+    """Memoria que retiene un snapshot con todos sus índices y pico al construirlo"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        snapshot = CatalogSnapshot(products, datetime.now(), ventas_data=ventas)
+        for name in LAZY_INDEXES:
+            snapshot.lazy[name].build()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'snapshot_bytes': retained, 'build_peak_bytes': peak}
+
+
+def bench_persistence(snapshot: CatalogSnapshot, products: List[Dict],
+                      ventas: Dict[str, int]) -> Dict[str, Any]:
+    """Guardar y cargar JSON y snapshot binario (los mismos pasos que JSONDatabase)"""
+    result: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix='ats-bench-') as directory:
+        json_file = Path(directory) / 'productos_db.json'
+        snapshot_file = Path(directory) / 'productos_db.snap'
+
+        file_data = {'products': products, 'last_update': snapshot.last_update.isoformat()}
+        encoded, result['json_encode_seconds'] = _timed(
+            lambda: json.dumps(file_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        )
+        result['json_bytes'], result['json_write_seconds'] = _timed(atomic_write, json_file, encoded)
+        result['binary_bytes'], result['binary_save_seconds'] = _timed(
+            write_snapshot, snapshot_file, products, snapshot.last_update,
+            indexes=snapshot.saved_index_states(), compress=SNAPSHOT_COMPRESS
+        )
+
+        def load_json():
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            loaded = CatalogSnapshot(data['products'], snapshot.last_update, ventas_data=ventas)
+            for name in LAZY_INDEXES:
+                loaded.lazy[name].build()
+            return loaded
+
+        _, result['json_load_seconds'] = _timed(load_json)
+
+        def load_binary():
+            snapshot_data = SnapshotFile.open(snapshot_file)
+            store = snapshot_data.store()
+            saved = {name: snapshot_data.index_state(name) for name in snapshot_data.indexes}
+            data = store if STORAGE_MODE == 'mmap' else store.to_list()
+            loaded = CatalogSnapshot(data, snapshot.last_update, ventas_data=ventas, saved_indexes=saved)
+            # Ambas cargas incluyen los índices diferidos (aquí restaurados, en el JSON reconstruidos)
+            for name in LAZY_INDEXES:
+                loaded.lazy[name].build()
+            return loaded
+
+        _, result['binary_load_seconds'] = _timed(load_binary)
+    return result
+
+
+def bench_size(size: int, model: CatalogModel, seed: int, budget: float) -> Dict[str, Any]:
+    products, ventas = generate_catalog(size, model, seed)
+    logger.info(f"⏱️ Catálogo sintético de {size} productos")
+    result: Dict[str, Any] = {'products': size}
+
+    snapshot, result['build'] = bench_build(products, ventas)
+    result['memory'] = bench_memory(products, ventas)
+    result['persistence'] = bench_persistence(snapshot, products, ventas)
+
+    db = JSONDatabase()
+    db.ventas_data = ventas
+    _, result['build']['publish_seconds'] = _timed(db._publish, products, datetime.now())
+    for name in LAZY_INDEXES:
+        db._snapshot.lazy[name].build()
+
+    rng = random.Random(seed)
+    vocabulary = _query_vocabulary(products)
+    result['queries'] = {name: bench_calls(call, rng, budget)
+                         for name, call in sorted(query_calls(db, vocabulary).items())}
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def _max_rss_bytes() -> int:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB, macOS en bytes
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark de JSONDatabase con catálogos sintéticos')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='tamaños de catálogo separados por coma (p. ej. 1000,10000,1000000)')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help='segundos de medición por método de consulta')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='archivo JSON de resultados (por defecto stdout)')
+    parser.add_argument('--verbose', action='store_true', help='mostrar los logs de JSONDatabase')
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    model = CatalogModel.load()
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'storage': STORAGE_MODE,
+            'seed': args.seed,
+            'budget': args.budget
+        },
+        'results': {}
+    }
+    for size in sizes:
+        report['results'][str(size)] = bench_size(size, model, args.seed, args.budget)
+        gc.collect()
+    report['meta']['max_rss_bytes'] = _max_rss_bytes()
+
+    encoded = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(encoded + '\n', encoding='utf-8')
+        logger.info(f"📄 Resultados en {args.output}")
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
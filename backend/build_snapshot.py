@@ -0,0 +1,28 @@
+"""
+Genera database/productos_db.snap a partir de productos_db.json.
+
+Se ejecuta en el build (render.yaml) para que el primer arranque tras un deploy
+cargue el snapshot binario con los índices de texto ya construidos en lugar de
+parsear el JSON y reindexar todo.
+"""
+
+import logging
+
+from json_database import JSON_DB_FILE, SNAPSHOT_FILE, json_db
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def build_snapshot() -> bool:
+    if not JSON_DB_FILE.exists():
+        logger.warning(f"⚠️ No existe {JSON_DB_FILE}; el snapshot se generará al arrancar")
+        return False
+    if not json_db.reload_from_file() or not SNAPSHOT_FILE.exists():
+        logger.warning("⚠️ No se pudo generar el snapshot binario; se generará al arrancar")
+        return False
+    logger.info(f"🎉 Snapshot binario listo: {SNAPSHOT_FILE} ({json_db.count_total()} productos)")
+    return True
+
+if __name__ == "__main__":
+    # Un fallo no rompe el build: la app recurre al JSON
+    build_snapshot()
@@ -23,6 +23,20 @@ class Config:
     DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     FLASK_ENV = os.getenv('FLASK_ENV', 'production')
     
+    # Token para los endpoints de administración (/api/v1/admin); sin token quedan deshabilitados
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    
+    # Perfilado de peticiones (ver services/profiling.py): fracción muestreada
+    # (0 = solo peticiones firmadas), clave de las firmas (por defecto ADMIN_TOKEN)
+    # y cuántos perfiles lentos se guardan
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_SECRET = os.getenv('PROFILE_SECRET')
+    PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '20'))
+    
+    # Caché de respuestas serializadas de /api/v1/productos (ver services/response_cache.py):
+    # bytes máximos por proceso, 0 = apagada
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    
     # Configuración de puerto para Render
     PORT = int(os.environ.get('PORT', 5001))
     HOST = '0.0.0.0'
@@ -3,7 +3,13 @@ import multiprocessing
 
 # Configuración básica
 bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
-workers = 1  # Un solo worker para evitar problemas de inicialización
+# Con JSON_DB_STORAGE=mmap los workers comparten el catálogo (una copia física
+# por host), así que por defecto se usa uno por núcleo; si no, uno solo.
+# WEB_CONCURRENCY tiene prioridad.
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY',
+    multiprocessing.cpu_count() if os.environ.get('JSON_DB_STORAGE') == 'mmap' else 1
+))
 worker_class = "sync"
 worker_connections = 1000
 timeout = 300
@@ -17,6 +23,11 @@ loglevel = "info"
 # Configuración de preload
 preload_app = True
 
+# El refresco del catálogo y el calentamiento de índices se inician en cada
+# worker (post_worker_init) y no en el maestro que precarga la app: los hilos
+# no sobreviven al fork
+os.environ['CATALOG_REFRESH_DEFERRED'] = '1'
+
 # Configuración de workers
 max_requests = 1000
 max_requests_jitter = 100
@@ -45,4 +56,8 @@ def post_fork(server, worker):
 
 def post_worker_init(worker):
     """Callback después de inicializar un worker"""
+    from services.catalog_refresher import start_catalog_refresher
+    from json_database import json_db
+    start_catalog_refresher()
+    json_db.start_index_warmup()
     worker.log.info(f"🎯 Worker {worker.pid} inicializado y listo") 
\ No newline at end of file
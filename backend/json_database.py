@@ -2,47 +2,972 @@ import json
 import os
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Sequence, Tuple, Union
 import logging
 from pathlib import Path
-from threading import Thread, Lock
-import schedule
+from threading import Condition, Thread, Lock, local
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right, insort
+from array import array
+import atexit
+import copy
+import heapq
+import math
 import re
 
 from utils.database import get_db_connection, close_db_connection
+from services.metrics import observe_query
+from utils.product_store import FIELD_DEFAULTS, build_store
+from utils.autocomplete import AutocompleteIndex
+from utils.lazy_index import LazyIndex
+from utils.featured import FeaturedSampler
+from utils.price_index import PriceIndex
+from utils.category_summary import CategorySummary
+from utils.facets import FacetIndex, bits_from_positions, iter_positions, popcount
+from utils.text import collation_key
+from utils.cursor import CursorExpired, decode_cursor, encode_cursor, query_fingerprint
+from utils.snapshot_file import MmapStore, SnapshotFile, atomic_write, write_snapshot
+from utils.search_index import (
+    TokenIndex, TrigramIndex, FUZZY_MIN_SIMILARITY, DEFAULT_TEXT_WEIGHT, DEFAULT_SALES_WEIGHT, scan_search
+)
 import json as json_lib
 
 # Configuración
 JSON_DB_FILE = Path("database") / "productos_db.json"
+# Snapshot binario (formato principal de carga; el JSON queda como exportación).
+# Con JSON_DB_STORAGE=mmap se mapea en memoria y lo comparten los workers
+SNAPSHOT_FILE = JSON_DB_FILE.with_suffix('.snap')
+# zlib ocupa menos disco pero se descomprime en cada proceso (no se comparte)
+SNAPSHOT_COMPRESS = os.getenv('JSON_DB_SNAPSHOT_COMPRESS', '0') == '1'
+# Espera antes de guardar para agrupar ráfagas de cambios en una escritura (segundos)
+SAVE_DELAY = float(os.getenv('JSON_DB_SAVE_DELAY', '0.5'))
+# Máximo que se espera al salir del proceso a que termine un guardado pendiente
+SAVE_FLUSH_TIMEOUT = 10
 UPDATE_INTERVAL = 10  # minutos
 BACKUP_INTERVAL = 60  # minutos para backup
+# Almacenamiento en memoria: 'rows' (lista de dicts), 'columnar' (menos memoria por producto)
+# o 'mmap' (columnas sobre SNAPSHOT_FILE, una sola copia física por host)
+STORAGE_MODE = os.getenv('JSON_DB_STORAGE', 'rows')
+# Snapshots recientes que se conservan para seguir paginando con cursores
+CURSOR_SNAPSHOTS = int(os.getenv('JSON_DB_CURSOR_SNAPSHOTS', '3'))
+# Construir los índices diferidos en segundo plano tras publicar cada snapshot
+# (con 0 se construyen en la primera consulta que los usa)
+INDEX_WARMUP = os.getenv('JSON_DB_INDEX_WARMUP', '1') == '1'
+# Destacados: la selección cambia cada FEATURED_BUCKET_SECONDS (0 = en cada
+# petición) y los más vendidos pesan hasta 1 + FEATURED_SALES_WEIGHT veces más
+FEATURED_BUCKET_SECONDS = int(os.getenv('FEATURED_BUCKET_SECONDS', '300'))
+FEATURED_SALES_WEIGHT = float(os.getenv('FEATURED_SALES_WEIGHT', '3'))
 
 # Crear directorio si no existe
 JSON_DB_FILE.parent.mkdir(exist_ok=True)
 
-# Lock para operaciones thread-safe
+# Índices de listado con órdenes precalculados en cada snapshot
+ORDERED_INDEXES = ('all', 'by_categoria', 'by_sub_categoria')
+
+# Órdenes de listado aceptados; los precalculados son permutaciones guardadas en
+# el snapshot y los de precio se resuelven con el índice de precios
+LISTING_ORDERS = ('id', 'ventas', 'stock', 'nombre', 'precio_asc', 'precio_desc')
+PRECOMPUTED_ORDERS = ('ventas', 'stock', 'nombre')
+PRICE_ORDERS = ('precio_asc', 'precio_desc')
+
+# Valor de 'Stock' que va primero en el orden 'stock'
+IN_STOCK = 'Con Stock'
+
+# Índices valor -> posiciones y el campo del producto que agrupan
+GROUPED_INDEXES = {
+    'by_categoria': 'Categoria',
+    'by_sub_categoria': 'Sub Categoria',
+    'by_stock': 'Stock'
+}
+
+# Separación entre rangos consecutivos de un orden precalculado: deja hueco
+# para insertar productos sin renumerar todo el catálogo
+RANK_GAP = 1 << 20
+
+# Campos que alimentan el autocompletado (el SKU determina las ventas)
+AUTOCOMPLETE_FIELDS = ('Nombre', 'Modelo', 'Sub Categoria', 'SKU')
+
+# Índices que se guardan ya construidos en el snapshot binario
+SAVED_INDEXES = ('search_index', 'trigram_index', 'autocomplete')
+
+# Índices que se construyen bajo demanda (ver utils/lazy_index.py), en el orden
+# del calentamiento; los demás los necesita cualquier listado y van en el snapshot
+LAZY_INDEXES = ('search_index', 'autocomplete', 'trigram_index', 'featured')
+
+# Ámbito de listado de la API -> índice del snapshot
+LISTING_SCOPES = {
+    None: 'all',
+    'categoria': 'by_categoria',
+    'subcategoria': 'by_sub_categoria',
+    'stock': 'by_stock'
+}
+
+# Lock para los escritores (publicación de snapshots); las lecturas no lo usan
 db_lock = Lock()
+# Lock de los archivos del catálogo: serializa los guardados
+save_lock = Lock()
 
 # Logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class JSONDatabase:
-    """Base de datos JSON en memoria para consultas ultra-rápidas"""
+def normalize_product(product: Dict) -> Dict:
+    """Producto con todos los campos de la tabla (valores por defecto para los que faltan)"""
+    return {
+        'id': product.get('id', 0),
+        'SKU': product.get('SKU', ''),
+        'Nombre': product.get('Nombre', ''),
+        'Modelo': product.get('Modelo', ''),
+        'Tamaño': product.get('Tamaño', ''),
+        'Precio B': float(product.get('Precio B') or 0),
+        'Precio J': float(product.get('Precio J') or 0),
+        'Categoria': product.get('Categoria', ''),
+        'Sub Categoria': product.get('Sub Categoria', ''),
+        'Stock': product.get('Stock', 'Sin Stock'),
+        'Sub Categoria Nivel': str(product.get('Sub Categoria Nivel', '999')),
+        'Al Por Mayor': product.get('Al Por Mayor', 'No'),
+        'Top_S_Sku': product.get('Top_S_Sku', ''),
+        'Product_asig': product.get('Product_asig', ''),
+        'Descripcion': product.get('Descripcion', ''),
+        'Cantidad': int(product.get('Cantidad') or 0),
+        'Photo': product.get('Photo', '')
+    }
+
+def _product_id(value: Any) -> int:
+    """id entero de un producto recibido por la API ("7" -> 7); ValueError si falta o no es entero"""
+    # bool es subclase de int y 7.5 se truncaría: ambos se rechazan
+    if value is None or isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"id de producto no válido: {value!r}")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"id de producto no válido: {value!r}") from None
+
+def _bisect_by(positions: Sequence[int], target, key) -> int:
+    """bisect_left sobre `positions` comparando key(pos) (bisect no acepta key en Python 3.9)"""
+    low, high = 0, len(positions)
+    while low < high:
+        mid = (low + high) // 2
+        if key(positions[mid]) < target:
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+class CatalogSnapshot:
+    """Versión inmutable del catálogo: productos + índices + estadísticas.
+
+    Se construye completa fuera de la vista de los lectores y se publica en
+    JSONDatabase con un único cambio de referencia, así las consultas nunca
+    toman un lock ni ven un catálogo a medio reconstruir.
+
+    Los índices guardan posiciones de fila (`array('I')`) sobre `store`, que
+    puede ser de filas (dicts), columnar o un snapshot binario mapeado (se
+    acepta ya construido en lugar de `data`); los dicts se obtienen con `rows()`.
+    Las listas de posiciones de cada índice están en orden de id; `orders`
+    guarda además los órdenes precalculados (p. ej. por ventas) y `prices`
+    las listas ordenadas por precio para rangos y orden por precio.
+
+    Los índices de texto (LAZY_INDEXES) no se construyen con el snapshot: se
+    acceden como atributos y se construyen en el primer uso o en el
+    calentamiento en segundo plano. `build_times` guarda lo que tardó cada
+    índice construido con el snapshot.
+    """
+
+    def __init__(self, data: List[Dict], last_update: Optional[datetime] = None,
+                 storage: str = STORAGE_MODE, ventas_data: Optional[Dict[str, int]] = None,
+                 saved_indexes: Optional[Dict[str, Tuple[Dict, Dict]]] = None):
+        self.build_times: Dict[str, float] = {}
+        self.store = self._timed('store', build_store, data, storage)
+        self.last_update = last_update
+        self.version = self._make_version(last_update)
+        self.ventas_data = ventas_data or {}
+        self.indexes = self._timed('indexes', self._build_indexes)
+        self.sales = array('d', (self.ventas_data.get(sku, 0) for sku in self.store.column('SKU')))
+        self.popularity = self._build_popularity()
+        self.orders = self._timed('orders', self._build_orders)
+        self.prices = self._timed('prices', PriceIndex, self.store, self.indexes)
+        self.facets = self._timed('facets', FacetIndex, self.store)
+        self.categories = self._timed('categories', self._build_categories)
+        # Los índices de texto pueden venir ya construidos del snapshot binario
+        saved_indexes = saved_indexes or {}
+        self.lazy: Dict[str, LazyIndex] = {
+            'search_index': LazyIndex('search_index', lambda: (
+                self._restore(saved_indexes, 'search_index', TokenIndex.from_state) or TokenIndex(self.store)
+            )),
+            'trigram_index': LazyIndex('trigram_index', lambda: (
+                self._restore(saved_indexes, 'trigram_index', TrigramIndex.from_state) or TrigramIndex(self.store)
+            )),
+            'autocomplete': LazyIndex('autocomplete', lambda: (
+                self._restore(saved_indexes, 'autocomplete', AutocompleteIndex.from_state, self.sales)
+                or AutocompleteIndex(self.store, self.sales)
+            )),
+            'featured': LazyIndex('featured', self._build_featured)
+        }
+        self.stats = self._calculate_stats()
+
+    # Índices diferidos: se construyen (o esperan a que termine otro hilo) al leerlos
+    search_index = property(lambda self: self.lazy['search_index'].get())
+    trigram_index = property(lambda self: self.lazy['trigram_index'].get())
+    autocomplete = property(lambda self: self.lazy['autocomplete'].get())
+
+    def _subcategory_prices(self, sub_categoria):
+        return self.prices.get('by_sub_categoria', sub_categoria)
     
-    def __init__(self):
-        self.data = []
-        self.indexes = {}
-        self.last_update = None
-        self.stats = {
-            'total_products': 0,
+    def _build_categories(self) -> CategorySummary:
+        return CategorySummary(self.store, self.indexes['by_sub_categoria'], self._subcategory_prices)
+    
+    def _build_featured(self) -> FeaturedSampler:
+        """Muestreador de destacados: productos con stock ponderados por popularidad"""
+        positions = self.indexes['by_stock'].get(IN_STOCK, ())
+        popularity = self.popularity
+        return FeaturedSampler(positions, [1.0 + FEATURED_SALES_WEIGHT * popularity[pos] for pos in positions])
+    
+    def _timed(self, name: str, build, *args):
+        start_time = time.time()
+        result = build(*args)
+        self.build_times[name] = time.time() - start_time
+        return result
+
+    def text_matches(self, query: str) -> List[int]:
+        """Posiciones que contienen todos los términos (TokenIndex.search).
+
+        Si el índice de tokens aún no está construido se recorre el catálogo
+        en lugar de esperarlo.
+        """
+        index = self.lazy['search_index'].peek()
+        if index is None:
+            return scan_search(self.store, self.indexes['all'][None], query)
+        return index.search(query)
+
+    def index_status(self) -> Dict[str, Dict[str, Any]]:
+        """Tiempo de construcción de cada índice (y uso de los diferidos) para /stats"""
+        status = {name: {'ready': True, 'build_time': build_time}
+                  for name, build_time in self.build_times.items()}
+        status.update((name, lazy.status()) for name, lazy in self.lazy.items())
+        return status
+
+    @staticmethod
+    def _restore(saved_indexes: Dict[str, Tuple[Dict, Dict]], name: str, from_state, *args):
+        """Índice guardado en el snapshot binario, o None si no está o no es compatible"""
+        state = saved_indexes.get(name)
+        if state is None:
+            return None
+        return from_state(*state, *args)
+
+    def saved_index_states(self) -> Optional[Dict[str, Tuple[Dict, Dict]]]:
+        """Estados de los índices de texto para el snapshot binario.
+
+        Solo si las posiciones coinciden con el orden en que se guardan las
+        filas (sin bajas ni altas fuera de orden); si no, None y se
+        reconstruyen al cargar.
+        """
+        live = self.indexes['all'][None]
+        if len(live) != len(self.store) or any(pos != index for index, pos in enumerate(live)):
+            return None
+        return {name: getattr(self, name).state() for name in SAVED_INDEXES}
+
+    @staticmethod
+    def _make_version(last_update: Optional[datetime]) -> str:
+        """Id de versión derivado de la fecha de actualización (microsegundos en hex).
+
+        Dos workers que cargan el mismo archivo reportan la misma versión.
+        """
+        if last_update is None:
+            return '0'
+        return format(int(last_update.timestamp() * 1_000_000), 'x')
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def rows(self, positions) -> List[Dict]:
+        """Materializar dicts de producto para una lista de posiciones"""
+        return self.store.rows(positions)
+
+    def _build_indexes(self) -> Dict[str, Dict]:
+        """Construir índices para búsquedas rápidas"""
+        store = self.store
+        indexes = {
+            'all': {None: array('I', range(len(store)))},
+            'by_id': {},
+            'by_sku': {},
+            'by_categoria': {},
+            'by_sub_categoria': {},
+            'by_stock': {}
+        }
+        
+        # Índice por ID y por SKU: valor -> posición
+        indexes['by_id'] = {product_id: pos for pos, product_id in enumerate(store.column('id'))}
+        indexes['by_sku'] = {sku: pos for pos, sku in enumerate(store.column('SKU'))}
+        
+        # Índices por categoría, subcategoría y stock: valor -> posiciones
+        for index_name, field in GROUPED_INDEXES.items():
+            index = indexes[index_name]
+            for pos, value in enumerate(store.column(field)):
+                postings = index.get(value)
+                if postings is None:
+                    postings = index[value] = array('I')
+                postings.append(pos)
+        
+        return indexes
+    
+    @staticmethod
+    def _grouped_value(index_name: str, product: Dict) -> Any:
+        """Valor de un producto en un índice agrupado ('all' -> None)"""
+        if index_name == 'all':
+            return None
+        field = GROUPED_INDEXES[index_name]
+        return product.get(field, FIELD_DEFAULTS.get(field, ''))
+    
+    def _build_popularity(self) -> array:
+        """Popularidad de ventas por posición, normalizada a 0..1 (escala logarítmica)"""
+        sales = self.sales
+        max_sales = max(sales, default=0)
+        self._popularity_scale = math.log1p(max_sales) if max_sales > 0 else 0.0
+        if max_sales <= 0:
+            return array('f', bytes(4 * len(sales)))
+        return array('f', (self._popularity_of(value) for value in sales))
+    
+    def _popularity_of(self, sales: float) -> float:
+        if not self._popularity_scale:
+            return 0.0
+        # Un producto actualizado puede superar el máximo con el que se normalizó
+        return min(1.0, math.log1p(max(sales, 0)) / self._popularity_scale)
+    
+    def sort_key(self, order: str):
+        """Función clave (sobre posiciones) de un orden de listado"""
+        if order in self.ranks:
+            return self.ranks[order].__getitem__
+        if order in PRICE_ORDERS:
+            prices = self.prices.price_column
+            if order == 'precio_asc':
+                return lambda pos: (prices[pos], pos)
+            # Mismo desempate que el recorrido inverso de las listas de precios
+            return lambda pos: (-prices[pos], -pos)
+        raise ValueError(f"Orden no soportado: {order}")
+    
+    def _order_key(self, order: str):
+        """Clave de ordenamiento global de un orden precalculado (sort estable)"""
+        sales = self.sales
+        value = self.store.value
+        if order == 'ventas':
+            # Más vendidos primero; empates en orden de id
+            return lambda pos: -sales[pos]
+        if order == 'stock':
+            # Con stock primero y, dentro de cada grupo, más vendidos
+            return lambda pos: (value(pos, 'Stock') != IN_STOCK, -sales[pos])
+        if order == 'nombre':
+            def name_key(pos: int):
+                name = collation_key(f"{value(pos, 'Nombre')} {value(pos, 'Modelo')}".strip())
+                # Productos sin nombre al final
+                return (not name, name)
+            return name_key
+        raise ValueError(f"Orden no soportado: {order}")
+
+    def _build_orders(self) -> Dict[str, Dict[str, Dict[str, array]]]:
+        """Precalcular permutaciones de cada orden para el catálogo y cada categoría/subcategoría.
+
+        Se ordena una sola vez el catálogo completo; la permutación de cada
+        valor de índice se obtiene repartiendo esa permutación por grupos, O(n).
+        Guarda además el rango de cada posición (self.ranks) para ordenar
+        subconjuntos; los rangos van espaciados RANK_GAP para poder insertar.
+        """
+        size = len(self.store)
+        self.ranks: Dict[str, array] = {}
+        orders: Dict[str, Dict[str, Dict[str, array]]] = {}
+        for order in PRECOMPUTED_ORDERS:
+            permutation = array('I', sorted(range(size), key=self._order_key(order)))
+            ranks = array('q', [0]) * size
+            for rank, pos in enumerate(permutation):
+                ranks[pos] = rank * RANK_GAP
+            self.ranks[order] = ranks
+
+            orders[order] = {}
+            for index_name in ORDERED_INDEXES:
+                if index_name == 'all':
+                    orders[order][index_name] = {None: permutation}
+                    continue
+                groups = self.indexes[index_name]
+                group_of = [None] * size
+                for value, positions in groups.items():
+                    for pos in positions:
+                        group_of[pos] = value
+                buckets = {value: array('I') for value in groups}
+                for pos in permutation:
+                    buckets[group_of[pos]].append(pos)
+                orders[order][index_name] = buckets
+        return orders
+    
+    def select(self, index_name: str, value: Any, order: str = 'id',
+               limit: Optional[int] = None, offset: int = 0,
+               price_min: Optional[float] = None, price_max: Optional[float] = None,
+               after: Optional[int] = None) -> Tuple[Sequence[int], int]:
+        """Posiciones de una página de un índice en el orden pedido, y el total.
+
+        Con un orden precalculado es un simple slice; un rango de precio se
+        resuelve con bisect sobre la lista de precios del ámbito. Lo que no está
+        precalculado usa una selección top-k acotada a offset + limit, o a limit
+        si se indica `after` (clave de cursor del último elemento ya servido).
+        """
+        positions = self.indexes[index_name].get(value)
+        if positions is None:
+            return [], 0
+        
+        price_list = self.prices.get(index_name, value)
+        has_range = price_min is not None or price_max is not None
+        if price_list is not None and (has_range or order in PRICE_ORDERS):
+            if order in PRICE_ORDERS:
+                return price_list.page(price_min, price_max, order == 'precio_desc', limit, offset)
+            start, end = price_list.bounds(price_min, price_max)
+            positions = price_list.positions[start:end]
+            return self._top_k(positions, order, limit, offset, after), len(positions)
+        
+        if has_range:
+            # Ámbito sin lista de precios: filtrar por precio y seleccionar
+            prices = self.prices.price_column
+            low = float('-inf') if price_min is None else price_min
+            high = float('inf') if price_max is None else price_max
+            positions = [pos for pos in positions if low <= prices[pos] <= high]
+            return self._top_k(positions, order, limit, offset, after), len(positions)
+        
+        total = len(positions)
+        if order != 'id':
+            precomputed = self.orders.get(order, {}).get(index_name, {}).get(value)
+            if precomputed is None:
+                return self._top_k(positions, order, limit, offset, after), total
+            positions = precomputed
+        if limit:
+            return positions[offset:offset + limit], total
+        return positions[offset:], total
+    
+    def _top_k(self, positions: Sequence[int], order: str, limit: Optional[int], offset: int,
+               after: Optional[int] = None) -> List[int]:
+        """Página en el orden pedido sin ordenar todo (heap acotado a offset + limit)"""
+        key = None if order == 'id' else self.sort_key(order)
+        if after is not None and (order == 'id' or order in self.ranks):
+            # Keyset: solo lo que va después del último elemento servido
+            positions = [pos for pos in positions if (pos if key is None else key(pos)) > after]
+            offset = 0
+        if limit:
+            return heapq.nsmallest(offset + limit, positions, key=key)[offset:]
+        return sorted(positions, key=key)[offset:]
+    
+    def cursor_key(self, order: str, pos: int) -> Optional[int]:
+        """Clave entera y única de una posición en un orden (None si el orden no la tiene)"""
+        if order == 'id':
+            return pos
+        ranks = self.ranks.get(order)
+        return ranks[pos] if ranks is not None else None
+    
+    def with_changes(self, upserts: Sequence[Dict], deleted_ids: Sequence[Any],
+                     last_update: datetime) -> Tuple['CatalogSnapshot', Dict[str, List]]:
+        """Snapshot nuevo con productos insertados, actualizados o eliminados.
+
+        No reconstruye el catálogo: cada estructura se copia solo donde cambia
+        (listas de posiciones de los valores afectados, rangos de orden, listas de
+        precios, tokens) y el resto se comparte con este snapshot, que sigue
+        intacto para las consultas y cursores que lo usan. Las posiciones son
+        estables: una actualización reescribe su fila, un alta se añade al final
+        y una baja queda fuera de todos los índices hasta la próxima carga completa.
+
+        upserts: productos completos (normalizados). Devuelve el snapshot y los
+        ids insertados, actualizados y eliminados.
+        """
+        # Estado final de cada id (las bajas se aplican después de las altas)
+        final: Dict[Any, Optional[Dict]] = {product['id']: product for product in upserts}
+        final.update((product_id, None) for product_id in deleted_ids)
+        
+        # (posición, producto anterior, producto nuevo), sin los que no cambian
+        by_id = self.indexes['by_id']
+        next_pos = len(self.store)
+        changes = []
+        for product_id, new in final.items():
+            pos = by_id.get(product_id)
+            if pos is None:
+                if new is None:
+                    continue
+                pos, old = next_pos, None
+                next_pos += 1
+            else:
+                old = self.store[pos]
+            if old != new:
+                changes.append((pos, old, new))
+        changes.sort(key=lambda change: change[0])
+        summary = {
+            'inserted': [new['id'] for _, old, new in changes if old is None],
+            'updated': [new['id'] for _, old, new in changes if old is not None and new is not None],
+            'deleted': [old['id'] for _, old, new in changes if new is None]
+        }
+        
+        snapshot = copy.copy(self)
+        snapshot.last_update = last_update
+        snapshot.version = self._make_version(last_update)
+        if not changes:
+            return snapshot, summary
+        
+        snapshot.store = self.store.patched({pos: new for pos, _, new in changes if new is not None})
+        self._patch_indexes(snapshot, changes)
+        
+        # Ventas y popularidad (dependen del SKU)
+        if any(old is None or new is None or old['SKU'] != new['SKU'] for _, old, new in changes):
+            snapshot.sales = array('d', self.sales)
+            snapshot.popularity = array('f', self.popularity)
+            for pos, _, new in changes:
+                sales = self.ventas_data.get(new['SKU'], 0) if new is not None else 0
+                if pos < len(snapshot.sales):
+                    snapshot.sales[pos] = sales
+                    snapshot.popularity[pos] = self._popularity_of(sales)
+                else:
+                    snapshot.sales.append(sales)
+                    snapshot.popularity.append(self._popularity_of(sales))
+        
+        self._patch_orders(snapshot, changes)
+        snapshot.prices = self.prices.patched(changes, self._grouped_value)
+        snapshot.facets = self.facets.patched(changes, len(snapshot.store))
+        snapshot.categories = self.categories.patched(
+            snapshot.store, snapshot.indexes['by_sub_categoria'], snapshot._subcategory_prices, changes
+        )
+        snapshot.lazy = dict(self.lazy)
+        for name, index_class in (('search_index', TokenIndex), ('trigram_index', TrigramIndex)):
+            snapshot.lazy[name] = self._patched_lazy(snapshot, name, index_class, changes)
+        if any(old is None or new is None or any(old[field] != new[field] for field in AUTOCOMPLETE_FIELDS)
+               for _, old, new in changes):
+            # Las sugerencias agregan ventas por marca/subcategoría: se reconstruyen
+            # solo si cambia un texto sugerible, un SKU o el conjunto de productos
+            snapshot.lazy['autocomplete'] = LazyIndex('autocomplete', lambda: AutocompleteIndex(
+                snapshot.store, snapshot.sales, snapshot.indexes['all'][None]
+            ))
+        # Con stock y popularidad ya actualizados; es O(n) y se construye al pedirlo
+        snapshot.lazy['featured'] = LazyIndex('featured', snapshot._build_featured)
+        snapshot.stats = snapshot._calculate_stats()
+        return snapshot, summary
+    
+    def _patched_lazy(self, snapshot: 'CatalogSnapshot', name: str, index_class, changes) -> LazyIndex:
+        """Índice diferido del snapshot nuevo.
+
+        Si el de este snapshot ya está construido se parchea enseguida; si no,
+        el nuevo se construye desde su propio almacenamiento al pedirlo (encadenar
+        parches sin construir crecería sin límite con cada cambio).
+        """
+        lazy = self.lazy[name]
+        if not lazy.ready:
+            return LazyIndex(name, lambda: index_class(snapshot.store, positions=snapshot.indexes['all'][None]))
+        patched = LazyIndex(name, lambda: lazy.build().patched(changes))
+        patched.build()
+        return patched
+    
+    def _patch_indexes(self, snapshot: 'CatalogSnapshot', changes) -> None:
+        """Copiar en `snapshot` solo las entradas de índice que cambian"""
+        snapshot.indexes = dict(self.indexes)
+        membership = [(pos, old, new) for pos, old, new in changes if (old is None) != (new is None)]
+        if membership:
+            positions = array('I', self.indexes['all'][None])
+            by_id = dict(self.indexes['by_id'])
+            for pos, old, new in membership:
+                if new is None:
+                    del positions[bisect_left(positions, pos)]
+                    by_id.pop(old['id'], None)
+                else:
+                    positions.append(pos)
+                    by_id[new['id']] = pos
+            snapshot.indexes['all'] = {None: positions}
+            snapshot.indexes['by_id'] = by_id
+        
+        sku_changes = [(pos, old, new) for pos, old, new in changes
+                       if old is None or new is None or old['SKU'] != new['SKU']]
+        if sku_changes:
+            by_sku = dict(self.indexes['by_sku'])
+            orphaned = set()
+            for pos, old, new in sku_changes:
+                if old is not None and by_sku.get(old['SKU']) == pos:
+                    del by_sku[old['SKU']]
+                    orphaned.add(old['SKU'])
+                if new is not None and by_sku.get(new['SKU'], -1) < pos:
+                    # Como _build_indexes: con SKU repetido gana la última posición
+                    by_sku[new['SKU']] = pos
+                    orphaned.discard(new['SKU'])
+            # Un SKU que queda sin entrada puede seguir en otro producto vivo
+            orphaned.difference_update(by_sku)
+            if orphaned:
+                skus = snapshot.store.column('SKU')
+                for pos in reversed(snapshot.indexes['all'][None]):
+                    sku = skus[pos]
+                    if sku in orphaned:
+                        by_sku[sku] = pos
+                        orphaned.discard(sku)
+                        if not orphaned:
+                            break
+            snapshot.indexes['by_sku'] = by_sku
+        
+        for index_name in GROUPED_INDEXES:
+            index = None
+            copied = set()
+            for pos, old, new in changes:
+                before = self._grouped_value(index_name, old) if old is not None else None
+                after = self._grouped_value(index_name, new) if new is not None else None
+                if before == after and (old is None) == (new is None):
+                    continue
+                if index is None:
+                    index = snapshot.indexes[index_name] = dict(self.indexes[index_name])
+                for value, add in ((before, False), (after, True)):
+                    if (old if not add else new) is None:
+                        continue
+                    if value not in copied:
+                        copied.add(value)
+                        index[value] = array('I', index.get(value, ()))
+                    if add:
+                        insort(index[value], pos)
+                    else:
+                        del index[value][bisect_left(index[value], pos)]
+            if index is not None:
+                for value in [value for value, positions in index.items() if not positions]:
+                    del index[value]
+    
+    def _patch_orders(self, snapshot: 'CatalogSnapshot', changes) -> None:
+        """Mover en las permutaciones precalculadas solo las posiciones que cambian.
+
+        Se quitan con el rango anterior y se insertan por búsqueda binaria con la
+        clave nueva; el rango nuevo cae en el hueco entre sus vecinos y solo si
+        no queda hueco se renumera el orden completo.
+        """
+        snapshot.ranks = {}
+        snapshot.orders = {}
+        for order in PRECOMPUTED_ORDERS:
+            old_ranks = self.ranks[order]
+            ranks = array('q', old_ranks)
+            ranks.extend([0] * (len(snapshot.store) - len(ranks)))
+            permutation = array('I', self.orders[order]['all'][None])
+            for pos, old, _ in changes:
+                if old is not None:
+                    index = _bisect_by(permutation, old_ranks[pos], old_ranks.__getitem__)
+                    del permutation[index]
+            
+            key = snapshot._order_key(order)
+            
+            def full_key(pos: int):
+                # Mismo desempate que el sort estable: la posición
+                return (key(pos), pos)
+            
+            renumber = False
+            for pos, _, new in changes:
+                if new is None:
+                    continue
+                index = _bisect_by(permutation, full_key(pos), full_key)
+                permutation.insert(index, pos)
+                if renumber:
+                    continue
+                low = ranks[permutation[index - 1]] if index > 0 else None
+                high = ranks[permutation[index + 1]] if index + 1 < len(permutation) else None
+                if low is None and high is None:
+                    ranks[pos] = 0
+                elif low is None:
+                    ranks[pos] = high - RANK_GAP
+                elif high is None:
+                    ranks[pos] = low + RANK_GAP
+                elif high - low > 1:
+                    ranks[pos] = (low + high) // 2
+                else:
+                    renumber = True
+            if renumber:
+                for rank, pos in enumerate(permutation):
+                    ranks[pos] = rank * RANK_GAP
+            snapshot.ranks[order] = ranks
+            
+            orders = snapshot.orders[order] = {'all': {None: permutation}}
+            for index_name in ORDERED_INDEXES:
+                if index_name == 'all':
+                    continue
+                buckets = orders[index_name] = dict(self.orders[order][index_name])
+                copied = set()
+                for pos, old, _ in changes:
+                    if old is None:
+                        continue
+                    value = self._grouped_value(index_name, old)
+                    if value not in copied:
+                        copied.add(value)
+                        buckets[value] = array('I', buckets[value])
+                    bucket = buckets[value]
+                    del bucket[_bisect_by(bucket, old_ranks[pos], old_ranks.__getitem__)]
+                for pos, _, new in changes:
+                    if new is None:
+                        continue
+                    value = self._grouped_value(index_name, new)
+                    if value not in copied:
+                        copied.add(value)
+                        buckets[value] = array('I', buckets.get(value, ()))
+                    bucket = buckets[value]
+                    bucket.insert(_bisect_by(bucket, ranks[pos], ranks.__getitem__), pos)
+                for value in [value for value in copied if not buckets[value]]:
+                    del buckets[value]
+    
+    def _calculate_stats(self) -> Dict[str, Any]:
+        """Calcular estadísticas de la base de datos"""
+        stats = {
+            'total_products': len(self.indexes['all'][None]),
             'categories': {},
             'brands': {},
-            'last_query_time': 0
+            'storage': self.store.kind
         }
+        
+        for categoria, positions in self.indexes['by_categoria'].items():
+            stats['categories'][categoria] = len(positions)
+        
+        return stats
+
+
+class SnapshotWriter:
+    """Guardado del catálogo en segundo plano que agrupa ráfagas de cambios.
+
+    `request()` solo anota que hay algo que guardar y vuelve enseguida. Un
+    único hilo espera `delay` segundos, guarda el snapshot publicado en ese
+    momento (el más reciente) y vuelve a esperar: varios parches seguidos
+    producen una sola escritura, fuera del camino de la petición o del reload.
+    """
+
+    def __init__(self, save, delay: float = SAVE_DELAY):
+        # save() escribe los archivos y devuelve {'json_bytes': n, 'binary_bytes': n}
+        self._save = save
+        self.delay = delay
+        self._condition = Condition()
+        self._pending = 0
+        self._writing = False
+        self._thread: Optional[Thread] = None
+        self.stats: Dict[str, Any] = {
+            'requests': 0,
+            'writes': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'last_write_time': None,
+            'last_json_bytes': None,
+            'last_binary_bytes': None,
+            'total_bytes_written': 0,
+            'last_write_at': None,
+            'last_error': None
+        }
+
+    def request(self):
+        """Pedir un guardado del snapshot actual"""
+        with self._condition:
+            self._pending += 1
+            self.stats['requests'] += 1
+            # Un hilo por proceso (tras un fork el del padre ya no existe)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name='snapshot-writer', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending > 0)
+            # Dar tiempo a que llegue el resto de la ráfaga
+            time.sleep(self.delay)
+            with self._condition:
+                batch, self._pending = self._pending, 0
+                self._writing = True
+            start_time = time.time()
+            try:
+                written = self._save()
+                self.stats['writes'] += 1
+                self.stats['coalesced'] += batch - 1
+                self.stats['last_write_time'] = time.time() - start_time
+                self.stats['last_json_bytes'] = written['json_bytes']
+                self.stats['last_binary_bytes'] = written['binary_bytes']
+                self.stats['total_bytes_written'] += written['json_bytes'] + written['binary_bytes']
+                self.stats['last_write_at'] = datetime.now().isoformat()
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.stats['last_error'] = str(e)
+                logger.error(f"❌ Error guardando archivo: {e}")
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Esperar a que no quede ningún guardado pendiente; False si vence el timeout"""
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                return not self._pending
+            return self._condition.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def status(self) -> Dict[str, Any]:
+        return {**self.stats, 'pending': self._pending, 'writing': self._writing, 'delay': self.delay}
+
+class JSONDatabase:
+    """Base de datos JSON en memoria para consultas ultra-rápidas"""
+    
+    def __init__(self):
+        # Snapshot publicado; los lectores solo leen esta referencia
+        self._snapshot = CatalogSnapshot([])
+        # Snapshots recientes por versión, para los cursores de paginación
+        self._history: 'OrderedDict[str, CatalogSnapshot]' = OrderedDict()
+        # Tiempo de la última consulta por hilo: las peticiones concurrentes no se pisan
+        self._local = local()
         self.ventas_data = {}
+        # CatalogRefresher de este proceso, si está activo
+        self.refresher = None
+        # Guardado en segundo plano; al salir se espera al pendiente
+        self.writer = SnapshotWriter(self._save_to_file)
+        # last_update del último snapshot que guardó este proceso (el refresco no lo recarga)
+        self.saved_update: Optional[datetime] = None
+        atexit.register(self.writer.flush, SAVE_FLUSH_TIMEOUT)
+        # Calentamiento de índices diferidos (activado por start_index_warmup)
+        self._warmup_enabled = False
         self._load_ventas_data()
     
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Estadísticas de la última consulta de este hilo ('last_query_time')"""
+        stats = getattr(self._local, 'stats', None)
+        if stats is None:
+            stats = self._local.stats = {'last_query_time': 0}
+        return stats
+    
+    def _record_query(self, method: str, start_time: float):
+        """Guardar la duración de una consulta para la respuesta y para las métricas"""
+        elapsed = time.time() - start_time
+        self.stats['last_query_time'] = elapsed
+        observe_query(method, elapsed)
+    
+    @property
+    def data(self) -> List[Dict]:
+        snapshot = self._snapshot
+        return snapshot.rows(snapshot.indexes['all'][None])
+    
+    @property
+    def indexes(self) -> Dict[str, Dict]:
+        return self._snapshot.indexes
+    
+    @property
+    def last_update(self) -> Optional[datetime]:
+        return self._snapshot.last_update
+    
+    @property
+    def version(self) -> str:
+        """Versión del snapshot que están sirviendo las consultas"""
+        return self._snapshot.version
+    
+    def _publish(self, data: List[Dict], last_update: Optional[datetime] = None,
+                 saved_indexes: Optional[Dict[str, Tuple[Dict, Dict]]] = None) -> CatalogSnapshot:
+        """Construir un snapshot nuevo fuera del lock y publicarlo con un swap atómico"""
+        snapshot = CatalogSnapshot(data, last_update or datetime.now(), ventas_data=self.ventas_data,
+                                   saved_indexes=saved_indexes)
+        
+        # El lock solo serializa a los escritores; los lectores no lo usan
+        with db_lock:
+            self._install(snapshot)
+        
+        logger.info(f"📸 Snapshot {snapshot.version} publicado ({len(data)} productos)")
+        return snapshot
+    
+    def _install(self, snapshot: CatalogSnapshot):
+        """Publicar un snapshot (con db_lock tomado) y conservarlo para los cursores"""
+        self._snapshot = snapshot
+        self._history[snapshot.version] = snapshot
+        while len(self._history) > CURSOR_SNAPSHOTS:
+            self._history.popitem(last=False)
+        if self._warmup_enabled:
+            self._warm_up(snapshot)
+    
+    def start_index_warmup(self):
+        """Construir en segundo plano los índices diferidos de este y los próximos snapshots.
+
+        Se llama después de arrancar (en cada worker con gunicorn: los hilos no
+        sobreviven al fork y un lock tomado en el maestro quedaría tomado).
+        """
+        if not INDEX_WARMUP:
+            return
+        with db_lock:
+            self._warmup_enabled = True
+            self._warm_up(self._snapshot)
+    
+    def _warm_up(self, snapshot: CatalogSnapshot):
+        def run():
+            start_time = time.time()
+            for name in LAZY_INDEXES:
+                if self._snapshot is not snapshot:
+                    # Ya hay otro snapshot publicado: que lo caliente su propio hilo
+                    return
+                try:
+                    snapshot.lazy[name].build()
+                except Exception as e:
+                    logger.error(f"❌ Error construyendo el índice {name}: {e}")
+            logger.info(f"🔥 Índices del snapshot {snapshot.version} listos "
+                        f"en {(time.time() - start_time) * 1000:.0f}ms")
+        
+        Thread(target=run, name='index-warmup', daemon=True).start()
+    
+    def apply_changes(self, upserts: Sequence[Dict] = (), deleted_ids: Sequence[Any] = ()) -> Dict[str, Any]:
+        """Aplicar altas/actualizaciones y bajas sin recargar el catálogo.
+
+        upserts: productos con 'id'; si el id existe solo hace falta enviar los
+        campos que cambian. El snapshot nuevo se deriva del actual parcheando los
+        índices afectados (ver CatalogSnapshot.with_changes) y se publica con el
+        mismo swap que una carga completa. El archivo JSON se reescribe en segundo plano.
+        """
+        start_time = time.time()
+        
+        with db_lock:
+            current = self._snapshot
+            by_id = current.indexes['by_id']
+            products = []
+            for product in upserts:
+                if product.get('id') is None:
+                    raise ValueError("Cada producto necesita 'id'")
+                pos = by_id.get(product['id'])
+                existing = current.store[pos] if pos is not None else {}
+                products.append(normalize_product({**existing, **product}))
+            
+            last_update = datetime.now()
+            if current.last_update and last_update <= current.last_update:
+                # Versión siempre nueva aunque el reloj no haya avanzado
+                last_update = current.last_update + timedelta(microseconds=1)
+            snapshot, summary = current.with_changes(products, deleted_ids, last_update)
+            self._install(snapshot)
+        
+        summary['version'] = snapshot.version
+        summary['patch_time'] = time.time() - start_time
+        logger.info(
+            f"🩹 Snapshot {snapshot.version}: {len(summary['inserted'])} altas, "
+            f"{len(summary['updated'])} actualizaciones, {len(summary['deleted'])} bajas "
+            f"en {summary['patch_time'] * 1000:.1f}ms"
+        )
+        if summary['inserted'] or summary['updated'] or summary['deleted']:
+            self.writer.request()
+        return summary
+    
+    def upsert_products(self, products: Sequence[Dict]) -> Dict[str, Any]:
+        """INSERT ... ON DUPLICATE KEY UPDATE para uno o varios productos (ValueError si algún id no es entero)"""
+        return self.apply_changes(upserts=[{**product, 'id': _product_id(product.get('id'))} for product in products])
+    
+    def delete_products(self, product_ids: Sequence[Any]) -> Dict[str, Any]:
+        """DELETE FROM productos WHERE id IN (...)"""
+        return self.apply_changes(deleted_ids=product_ids)
+    
+    def _resume(self, cursor: Optional[str], fingerprint: str,
+                offset: int = 0) -> Tuple[CatalogSnapshot, int, Optional[int]]:
+        """Snapshot, offset y clave keyset con los que servir una página.
+
+        Sin cursor se usa el snapshot actual y el offset recibido; con cursor, el
+        snapshot que sirvió la primera página (CursorExpired si ya no se conserva).
+        """
+        if not cursor:
+            return self._snapshot, offset, None
+        version, offset, after = decode_cursor(cursor, fingerprint)
+        snapshot = self._history.get(version)
+        if snapshot is None:
+            raise CursorExpired(f"El catálogo se actualizó (versión {version} ya no disponible); reinicie la paginación")
+        return snapshot, offset, after
+    
+    @staticmethod
+    def _next_cursor(snapshot: CatalogSnapshot, fingerprint: str, offset: int, served: int,
+                     total: int, after: Optional[int] = None) -> Optional[str]:
+        """Cursor de la página siguiente, o None si no quedan resultados"""
+        if not served or offset + served >= total:
+            return None
+        return encode_cursor(snapshot.version, fingerprint, offset + served, after)
+    
     def _load_ventas_data(self):
         """Cargar datos de análisis de ventas"""
         try:
@@ -59,22 +984,13 @@ class JSONDatabase:
             logger.warning(f"No se pudieron cargar datos de ventas: {e}")
             self.ventas_data = {}
         
-    def load_from_mysql(self):
-        """Cargar todos los datos desde MySQL"""
+    def _fetch_from_mysql(self) -> Optional[List[Dict]]:
+        """Todos los productos normalizados desde MySQL, o None si no hay conexión"""
+        connection = get_db_connection()
+        if not connection:
+            return None
+        
         try:
-            logger.info("🔄 Intentando cargar datos desde MySQL...")
-            start_time = time.time()
-            
-            # En producción sin MySQL, usar datos de respaldo
-            if os.getenv('FLASK_ENV') == 'production' and not os.getenv('DB_HOST'):
-                logger.warning("⚠️ No hay configuración MySQL en producción, usando datos de respaldo")
-                return self._load_backup_data()
-            
-            connection = get_db_connection()
-            if not connection:
-                logger.warning("⚠️ No se pudo conectar a MySQL, usando datos de respaldo")
-                return self._load_backup_data()
-            
             cursor = connection.cursor(dictionary=True)
             
             # Query optimizado para obtener todos los productos
@@ -90,44 +1006,34 @@ class JSONDatabase:
             
             cursor.execute(query)
             products = cursor.fetchall()
-            
-            # Procesar datos
-            processed_products = []
-            for product in products:
-                # Convertir None a valores por defecto
-                processed_product = {
-                    'id': product.get('id', 0),
-                    'SKU': product.get('SKU', ''),
-                    'Nombre': product.get('Nombre', ''),
-                    'Modelo': product.get('Modelo', ''),
-                    'Tamaño': product.get('Tamaño', ''),
-                    'Precio B': float(product.get('Precio B', 0)),
-                    'Precio J': float(product.get('Precio J', 0)),
-                    'Categoria': product.get('Categoria', ''),
-                    'Sub Categoria': product.get('Sub Categoria', ''),
-                    'Stock': product.get('Stock', 'Sin Stock'),
-                    'Sub Categoria Nivel': str(product.get('Sub Categoria Nivel', '999')),
-                    'Al Por Mayor': product.get('Al Por Mayor', 'No'),
-                    'Top_S_Sku': product.get('Top_S_Sku', ''),
-                    'Product_asig': product.get('Product_asig', ''),
-                    'Descripcion': product.get('Descripcion', ''),
-                    'Cantidad': int(product.get('Cantidad', 0)),
-                    'Photo': product.get('Photo', '')
-                }
-                processed_products.append(processed_product)
-            
             cursor.close()
+        finally:
             close_db_connection(connection)
+        
+        # Procesar datos
+        return [normalize_product(product) for product in products]
+    
+    def load_from_mysql(self):
+        """Cargar todos los datos desde MySQL"""
+        try:
+            logger.info("🔄 Intentando cargar datos desde MySQL...")
+            start_time = time.time()
             
-            # Actualizar datos en memoria
-            with db_lock:
-                self.data = processed_products
-                self.last_update = datetime.now()
-                self._build_indexes()
-                self._calculate_stats()
+            # En producción sin MySQL, usar datos de respaldo
+            if os.getenv('FLASK_ENV') == 'production' and not os.getenv('DB_HOST'):
+                logger.warning("⚠️ No hay configuración MySQL en producción, usando datos de respaldo")
+                return self._load_backup_data()
             
-            # Guardar en archivo
-            self._save_to_file()
+            processed_products = self._fetch_from_mysql()
+            if processed_products is None:
+                logger.warning("⚠️ No se pudo conectar a MySQL, usando datos de respaldo")
+                return self._load_backup_data()
+            
+            # Construir y publicar el nuevo snapshot
+            self._publish(processed_products)
+            
+            # Guardar en archivo (en segundo plano)
+            self.writer.request()
             
             load_time = time.time() - start_time
             logger.info(f"✅ {len(processed_products)} productos cargados desde MySQL en {load_time:.2f}s")
@@ -139,6 +1045,31 @@ class JSONDatabase:
             # Fallback a datos de respaldo
             return self._load_backup_data()
     
+    def refresh_from_mysql(self) -> bool:
+        """Recargar desde MySQL para el refresco periódico.
+
+        A diferencia de load_from_mysql no usa datos de respaldo: si MySQL no
+        responde se conserva el snapshot publicado.
+        """
+        if os.getenv('FLASK_ENV') == 'production' and not os.getenv('DB_HOST'):
+            return False
+        try:
+            start_time = time.time()
+            products = self._fetch_from_mysql()
+            if products is None:
+                logger.warning("⚠️ Refresco: no se pudo conectar a MySQL, se conserva el snapshot actual")
+                return False
+            
+            self._publish(products)
+            self.writer.request()
+            
+            logger.info(f"🔄 Refresco: {len(products)} productos desde MySQL en {time.time() - start_time:.2f}s")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Error refrescando desde MySQL: {e}")
+            return False
+    
     def _load_backup_data(self):
         """Cargar datos de respaldo cuando MySQL no está disponible"""
         logger.info("📦 Cargando datos de respaldo...")
@@ -163,282 +1094,377 @@ class JSONDatabase:
             }
         ]
         
-        with db_lock:
-            self.data = backup_products
-            self.last_update = datetime.now()
-            self._build_indexes()
-            self._calculate_stats()
+        self._publish(backup_products)
         
         logger.info("✅ Datos de respaldo cargados")
         return True
     
-    def _save_to_file(self):
-        """Guardar datos en archivo JSON"""
-        try:
-            file_data = {
-                'products': self.data,
-                'last_update': self.last_update.isoformat(),
-                'stats': self.stats,
-                'total_products': len(self.data)
-            }
-            
-            with open(JSON_DB_FILE, 'w', encoding='utf-8') as f:
-                json.dump(file_data, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"💾 Base de datos guardada: {JSON_DB_FILE}")
-            
-        except Exception as e:
-            logger.error(f"❌ Error guardando archivo: {e}")
-    
-    def _build_indexes(self):
-        """Construir índices para búsquedas rápidas"""
-        self.indexes = {
-            'by_id': {},
-            'by_sku': {},
-            'by_categoria': {},
-            'by_sub_categoria': {},
-            'by_stock': {},
-            'by_nombre': {}
+    def _save_to_file(self) -> Dict[str, int]:
+        """Guardar el snapshot publicado: JSON compacto (exportación) y snapshot binario.
+
+        Ambos se escriben de forma atómica (temporal + fsync + rename), así un
+        corte a mitad de escritura deja el archivo anterior intacto. Lo llama
+        el SnapshotWriter; usar `writer.request()` para guardar.
+        """
+        snapshot = self._snapshot
+        file_data = {
+            'products': snapshot.rows(snapshot.indexes['all'][None]),
+            'last_update': snapshot.last_update.isoformat(),
+            'stats': snapshot.stats,
+            'total_products': snapshot.stats['total_products']
         }
+        encoded = json.dumps(file_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
         
-        for product in self.data:
-            # Índice por ID
-            self.indexes['by_id'][product['id']] = product
-            
-            # Índice por SKU
-            self.indexes['by_sku'][product['SKU']] = product
-            
-            # Índice por categoría
-            categoria = product['Categoria']
-            if categoria not in self.indexes['by_categoria']:
-                self.indexes['by_categoria'][categoria] = []
-            self.indexes['by_categoria'][categoria].append(product)
-            
-            # Índice por subcategoría
-            sub_categoria = product['Sub Categoria']
-            if sub_categoria not in self.indexes['by_sub_categoria']:
-                self.indexes['by_sub_categoria'][sub_categoria] = []
-            self.indexes['by_sub_categoria'][sub_categoria].append(product)
-            
-            # Índice por stock
-            stock = product['Stock']
-            if stock not in self.indexes['by_stock']:
-                self.indexes['by_stock'][stock] = []
-            self.indexes['by_stock'][stock].append(product)
-            
-            # Índice por nombre (para búsquedas)
-            nombre = product['Nombre'].lower()
-            if nombre not in self.indexes['by_nombre']:
-                self.indexes['by_nombre'][nombre] = []
-            self.indexes['by_nombre'][nombre].append(product)
-    
-    def _calculate_stats(self):
-        """Calcular estadísticas de la base de datos"""
-        self.stats = {
-            'total_products': len(self.data),
-            'categories': {},
-            'brands': {},
-            'last_query_time': 0
-        }
+        # Un guardado a la vez
+        with save_lock:
+            json_bytes = atomic_write(JSON_DB_FILE, encoded)
+            # Después del JSON: queda más reciente y es el que recargan los workers
+            binary_bytes = self._write_snapshot_file(snapshot, file_data['products'])
+            self.saved_update = snapshot.last_update
         
-        for product in self.data:
-            categoria = product['Categoria']
-            if categoria in self.stats['categories']:
-                self.stats['categories'][categoria] += 1
-            else:
-                self.stats['categories'][categoria] = 1
+        logger.info(f"💾 Base de datos guardada: {JSON_DB_FILE} ({json_bytes / 1024:.0f} KB)")
+        return {'json_bytes': json_bytes, 'binary_bytes': binary_bytes}
     
-    # MÉTODOS DE CONSULTA (COMO SQL)
+    @staticmethod
+    def _write_snapshot_file(snapshot: CatalogSnapshot, products: List[Dict]) -> int:
+        """Escribir el snapshot binario (productos + índices de texto si se pueden reutilizar)"""
+        size = write_snapshot(SNAPSHOT_FILE, products, snapshot.last_update,
+                              indexes=snapshot.saved_index_states(), compress=SNAPSHOT_COMPRESS)
+        logger.info(f"💾 Snapshot binario guardado: {SNAPSHOT_FILE} ({size / 1024:.0f} KB)")
+        return size
+    
+        # MÉTODOS DE CONSULTA (COMO SQL)
+    # Cada consulta toma una sola referencia al snapshot publicado y trabaja
+    # sobre ella: no hay lock y un reload concurrente no la afecta.
     
     def get_all(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
         """SELECT * FROM productos LIMIT ? OFFSET ?"""
         start_time = time.time()
         
-        with db_lock:
-            if limit:
-                result = self.data[offset:offset + limit]
-            else:
-                result = self.data[offset:]
+        snapshot = self._snapshot
+        result = snapshot.rows(snapshot.select('all', None, 'id', limit, offset)[0])
         
-        self.stats['last_query_time'] = time.time() - start_time
+        self._record_query('get_all', start_time)
+        return result
+    
+    def list_products(self, scope: Optional[str] = None, value: Any = None, order: str = 'id',
+                      limit: Optional[int] = None, offset: int = 0,
+                      precio_min: Optional[float] = None, precio_max: Optional[float] = None,
+                      cursor: Optional[str] = None) -> Dict[str, Any]:
+        """SELECT * FROM productos WHERE <scope> = ? AND `Precio B` BETWEEN ? AND ? ORDER BY <order> LIMIT ? OFFSET ?
+
+        scope: None (todo el catálogo), 'categoria', 'subcategoria' o 'stock'.
+        order: uno de LISTING_ORDERS. Con `cursor` se ignora `offset` y la página
+        sale del mismo snapshot que la anterior.
+        Devuelve la página, el total, el cursor siguiente y la versión servida.
+        """
+        start_time = time.time()
+        
+        if order not in LISTING_ORDERS:
+            raise ValueError(f"Orden no soportado: {order}")
+        fingerprint = query_fingerprint('listado', scope, value, order, precio_min, precio_max)
+        snapshot, offset, after = self._resume(cursor, fingerprint, offset)
+        positions, total = snapshot.select(
+            LISTING_SCOPES[scope], value, order, limit, offset, precio_min, precio_max, after
+        )
+        last_key = snapshot.cursor_key(order, positions[-1]) if len(positions) else None
+        
+        result = {
+            'products': snapshot.rows(positions),
+            'total': total,
+            'next_cursor': self._next_cursor(snapshot, fingerprint, offset, len(positions), total, last_key),
+            'version': snapshot.version
+        }
+        
+        self._record_query('list_products', start_time)
         return result
     
     def get_by_id(self, product_id: int) -> Optional[Dict]:
         """SELECT * FROM productos WHERE id = ?"""
         start_time = time.time()
         
-        with db_lock:
-            result = self.indexes['by_id'].get(product_id)
+        snapshot = self._snapshot
+        pos = snapshot.indexes['by_id'].get(product_id)
+        result = snapshot.store[pos] if pos is not None else None
         
-        self.stats['last_query_time'] = time.time() - start_time
+        self._record_query('get_by_id', start_time)
         return result
     
     def get_by_sku(self, sku: str) -> Optional[Dict]:
         """SELECT * FROM productos WHERE SKU = ?"""
         start_time = time.time()
         
-        with db_lock:
-            result = self.indexes['by_sku'].get(sku)
+        snapshot = self._snapshot
+        pos = snapshot.indexes['by_sku'].get(sku)
+        result = snapshot.store[pos] if pos is not None else None
         
-        self.stats['last_query_time'] = time.time() - start_time
+        self._record_query('get_by_sku', start_time)
         return result
     
     def get_by_categoria(self, categoria: str, limit: Optional[int] = None, offset: int = 0, order_by_sales: bool = True) -> List[Dict]:
         """SELECT * FROM productos WHERE Categoria = ? ORDER BY ventas DESC LIMIT ? OFFSET ?"""
         start_time = time.time()
         
-        with db_lock:
-            products = self.indexes['by_categoria'].get(categoria, []).copy()
-            
-            # Ordenar por ventas si está habilitado
-            if order_by_sales and self.ventas_data:
-                products.sort(key=lambda p: self.ventas_data.get(p['SKU'], 0), reverse=True)
-            
-            if limit:
-                result = products[offset:offset + limit]
-            else:
-                result = products[offset:]
+        snapshot = self._snapshot
+        
+        # Orden por ventas precalculado en el snapshot: la página es un slice
+        order = 'ventas' if order_by_sales else 'id'
+        result = snapshot.rows(snapshot.select('by_categoria', categoria, order, limit, offset)[0])
         
-        self.stats['last_query_time'] = time.time() - start_time
+        self._record_query('get_by_categoria', start_time)
         return result
     
     def get_by_sub_categoria(self, sub_categoria: str, limit: Optional[int] = None, offset: int = 0, order_by_sales: bool = True) -> List[Dict]:
         """SELECT * FROM productos WHERE `Sub Categoria` = ? ORDER BY ventas DESC LIMIT ? OFFSET ?"""
         start_time = time.time()
         
-        with db_lock:
-            products = self.indexes['by_sub_categoria'].get(sub_categoria, []).copy()
-            
-            # Ordenar por ventas si está habilitado
-            if order_by_sales and self.ventas_data:
-                # Primero los más vendidos, luego los demás
-                products.sort(key=lambda p: self.ventas_data.get(p['SKU'], 0), reverse=True)
-            
-            if limit:
-                result = products[offset:offset + limit]
-            else:
-                result = products[offset:]
+        snapshot = self._snapshot
+        
+        # Primero los más vendidos, luego los demás (orden precalculado)
+        order = 'ventas' if order_by_sales else 'id'
+        result = snapshot.rows(snapshot.select('by_sub_categoria', sub_categoria, order, limit, offset)[0])
         
-        self.stats['last_query_time'] = time.time() - start_time
+        self._record_query('get_by_sub_categoria', start_time)
         return result
     
     def get_by_stock(self, stock: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
         """SELECT * FROM productos WHERE Stock = ? LIMIT ? OFFSET ?"""
         start_time = time.time()
         
-        with db_lock:
-            products = self.indexes['by_stock'].get(stock, [])
-            if limit:
-                result = products[offset:offset + limit]
-            else:
-                result = products[offset:]
+        snapshot = self._snapshot
+        result = snapshot.rows(snapshot.select('by_stock', stock, 'id', limit, offset)[0])
         
-        self.stats['last_query_time'] = time.time() - start_time
+        self._record_query('get_by_stock', start_time)
         return result
     
-    def search_products(self, query: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
-        """Búsqueda optimizada en múltiples campos"""
+    def search_with_total(self, query: str, limit: Optional[int] = None, offset: int = 0) -> Tuple[List[Dict], int]:
+        """Búsqueda por tokens en 6 campos (Nombre, Modelo, Tamaño, Categoria, Sub Categoria, Descripcion).
+
+        Usa el índice invertido del snapshot: cada término es prefijo de una
+        palabra (sin tildes ni ñ) y todos los términos deben aparecer.
+        Devuelve la página pedida y el total exacto de coincidencias.
+        """
         start_time = time.time()
         
-        with db_lock:
-            results = []
-            query_lower = query.lower()
-            
-            for product in self.data:
-                # Búsqueda en 6 campos: Nombre, Modelo, Tamaño, Categoria, Sub Categoria, Descripcion
-                if (query_lower in product.get('Nombre', '').lower() or 
-                    query_lower in product.get('Modelo', '').lower() or
-                    query_lower in product.get('Tamaño', '').lower() or
-                    query_lower in product.get('Categoria', '').lower() or
-                    query_lower in product.get('Sub Categoria', '').lower() or
-                    query_lower in product.get('Descripcion', '').lower()):
-                    results.append(product)
-                    
-                if limit and len(results) >= limit + offset:
-                    break
-        
-        self.stats['last_query_time'] = time.time() - start_time
-        return results[offset:] if offset > 0 else results
-    
-    def search_by_name(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        snapshot = self._snapshot
+        positions = snapshot.text_matches(query)
+        if limit:
+            page = positions[offset:offset + limit]
+        else:
+            page = positions[offset:]
+        result = snapshot.rows(page)
+        
+        self._record_query('search_with_total', start_time)
+        return result, len(positions)
+    
+    def fuzzy_search(self, query: str, limit: int = 20, offset: int = 0,
+                     min_similarity: float = FUZZY_MIN_SIMILARITY) -> Tuple[List[Dict], int]:
+        """Búsqueda tolerante a errores por similitud de trigramas (Nombre, Modelo, Categoria)"""
+        start_time = time.time()
+        
+        snapshot = self._snapshot
+        positions, total = snapshot.trigram_index.search(query, limit, offset, min_similarity)
+        result = snapshot.rows(positions)
+        
+        self._record_query('fuzzy_search', start_time)
+        return result, total
+    
+    def ranked_search(self, query: str, limit: int = 20, offset: int = 0,
+                      text_weight: float = DEFAULT_TEXT_WEIGHT,
+                      sales_weight: float = DEFAULT_SALES_WEIGHT) -> Tuple[List[Dict], int]:
+        """Búsqueda ordenada por relevancia BM25 mezclada con la popularidad de ventas"""
+        start_time = time.time()
+        
+        snapshot = self._snapshot
+        positions, total = snapshot.search_index.rank(
+            query, snapshot.popularity, limit, offset, text_weight, sales_weight
+        )
+        result = snapshot.rows(positions)
+        
+        self._record_query('ranked_search', start_time)
+        return result, total
+    
+    def search_page(self, query: str, modo: str = 'exacto', orden: str = 'relevancia',
+                    limit: Optional[int] = 20, offset: int = 0, cursor: Optional[str] = None,
+                    text_weight: float = DEFAULT_TEXT_WEIGHT,
+                    sales_weight: float = DEFAULT_SALES_WEIGHT) -> Dict[str, Any]:
+        """Búsqueda paginable con cursor (endpoint /buscar).
+
+        modo: 'exacto', 'fuzzy' o 'auto' (exacto y, si no hay resultados, fuzzy).
+        orden: 'relevancia' (BM25 + ventas) o 'id'. En orden 'id' el cursor sigue
+        con bisect tras la última posición servida; los órdenes por puntuación
+        continúan por offset sobre el mismo snapshot.
+        """
+        start_time = time.time()
+        
+        fingerprint = query_fingerprint('busqueda', query, modo, orden, text_weight, sales_weight)
+        snapshot, offset, after = self._resume(cursor, fingerprint, offset)
+        
+        total = 0
+        last_key = None
+        if modo != 'fuzzy' and orden == 'relevancia':
+            positions, total = snapshot.search_index.rank(
+                query, snapshot.popularity, limit or 20, offset, text_weight, sales_weight
+            )
+            optimization = 'bm25_sales_ranking'
+        elif modo != 'fuzzy':
+            matches = snapshot.text_matches(query)
+            total = len(matches)
+            start = offset if after is None else bisect_right(matches, after)
+            positions = matches[start:start + limit] if limit else matches[start:]
+            last_key = positions[-1] if positions else None
+            optimization = 'inverted_token_index'
+        if modo == 'fuzzy' or (modo == 'auto' and total == 0):
+            positions, total = snapshot.trigram_index.search(query, limit or 20, offset)
+            modo = 'fuzzy'
+            last_key = None
+            optimization = 'trigram_index'
+        
+        result = {
+            'products': snapshot.rows(positions),
+            'total': total,
+            'modo': modo,
+            'optimization': optimization,
+            'next_cursor': self._next_cursor(snapshot, fingerprint, offset, len(positions), total, last_key),
+            'version': snapshot.version
+        }
+        
+        self._record_query('search_page', start_time)
+        return result
+    
+    def autocomplete(self, query: str, limit: int = 8) -> List[Dict]:
+        """Sugerencias de typeahead (productos, marcas, subcategorías) ordenadas por ventas"""
+        start_time = time.time()
+        
+        result = self._snapshot.autocomplete.suggest(query, limit)
+        
+        self._record_query('autocomplete', start_time)
+        return result
+    
+    def filter_products(self, selections: Dict[str, List[str]], precio_min: Optional[float] = None,
+                        precio_max: Optional[float] = None, query: Optional[str] = None,
+                        limit: Optional[int] = None, offset: int = 0,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Filtrado por facetas (subcategoría, tamaño, stock, categoría), precio y texto.
+
+        Combina bitsets precalculados en el snapshot y devuelve en una pasada la
+        página, el total y los conteos de cada valor de faceta.
+        """
+        start_time = time.time()
+        
+        fingerprint = query_fingerprint(
+            'filtro', {facet: sorted(values) for facet, values in selections.items() if values},
+            precio_min, precio_max, query
+        )
+        snapshot, offset, after = self._resume(cursor, fingerprint, offset)
+        facets = snapshot.facets
+        base_bits = facets.all_bits
+        if precio_min is not None or precio_max is not None:
+            # Rango de precio con bisect sobre la lista global ordenada
+            price_list = snapshot.prices.get('all', None)
+            start, end = price_list.bounds(precio_min, precio_max)
+            base_bits = bits_from_positions(price_list.positions[start:end], len(snapshot))
+        if query:
+            base_bits &= bits_from_positions(snapshot.text_matches(query), len(snapshot))
+        
+        mask, facet_counts = facets.filter(selections, base_bits)
+        total = popcount(mask)
+        if after is not None:
+            # Keyset: apagar los bits hasta la última posición servida
+            positions = iter_positions(mask >> (after + 1), 0, limit)
+            positions = [pos + after + 1 for pos in positions]
+        else:
+            positions = iter_positions(mask, offset, limit)
+        last_key = positions[-1] if positions else None
+        
+        result = {
+            'products': snapshot.rows(positions),
+            'total': total,
+            'facets': facet_counts,
+            'next_cursor': self._next_cursor(snapshot, fingerprint, offset, len(positions), total, last_key),
+            'version': snapshot.version
+        }
+        
+        self._record_query('filter_products', start_time)
+        return result
+    
+    def search_products(self, query: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Búsqueda optimizada en múltiples campos"""
+        return self.search_with_total(query, limit, offset)[0]
+    
+    def search_by_name(self, query: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
         """Alias para mantener compatibilidad con API endpoints"""
-        return self.search_products(query, limit)
+        return self.search_products(query, limit, offset)
     
     def get_categories(self) -> List[Dict]:
-        """SELECT Sub Categoria, COUNT(*) as total FROM productos GROUP BY Sub Categoria ORDER BY Sub Categoria Nivel"""
+        """SELECT Sub Categoria, COUNT(*) as total FROM productos GROUP BY Sub Categoria ORDER BY Sub Categoria Nivel
+
+        Resumen materializado en el snapshot (conteos, stock y precio
+        mínimo/máximo/mediano por subcategoría): la consulta no recorre productos.
+        """
         start_time = time.time()
         
-        with db_lock:
-            # Agrupar por Sub Categoria y obtener información de Sub Categoria Nivel
-            sub_categories = {}
-            for product in self.data:
-                sub_categoria = product['Sub Categoria']
-                categoria = product['Categoria']  # Mantener para URLs
-                nivel = product.get('Sub Categoria Nivel', '999')  # Default si no existe
-                
-                if sub_categoria not in sub_categories:
-                    sub_categories[sub_categoria] = {
-                        'Categoria': categoria,  # Para URLs (mantener compatibilidad)
-                        'Sub_Categoria': sub_categoria,  # Nombre a mostrar
-                        'Sub_Categoria_Nivel': nivel,
-                        'total_productos': 0,
-                        'productos_con_stock': 0
-                    }
-                
-                sub_categories[sub_categoria]['total_productos'] += 1
-                if product['Stock'] == 'Con Stock':
-                    sub_categories[sub_categoria]['productos_con_stock'] += 1
-            
-            # Convertir a lista y ordenar por Sub Categoria Nivel
-            categories = list(sub_categories.values())
-            categories.sort(key=lambda x: int(x['Sub_Categoria_Nivel']) if x['Sub_Categoria_Nivel'].isdigit() else 999)
+        categories = self._snapshot.categories.rows
         
-        self.stats['last_query_time'] = time.time() - start_time
+        self._record_query('get_categories', start_time)
         return categories
     
-    def get_featured_products(self, limit: int = 20) -> List[Dict]:
-        """SELECT * FROM productos WHERE Stock = 'Con Stock' ORDER BY RANDOM() LIMIT ?"""
-        import random
-        
+    def get_featured_products(self, limit: int = 20, bucket: Optional[int] = None) -> List[Dict]:
+        """Productos con stock al azar, con más probabilidad cuanto más se venden.
+
+        La semilla es la franja de tiempo (ver featured_bucket): dentro de una
+        franja todos los workers devuelven la misma selección, así la respuesta
+        se puede cachear, y en la siguiente rota. O(limit) por petición.
+        """
         start_time = time.time()
         
-        with db_lock:
-            available_products = self.indexes['by_stock'].get('Con Stock', [])
-            if available_products:
-                shuffled = available_products.copy()
-                random.shuffle(shuffled)
-                result = shuffled[:limit]
-            else:
-                result = []
+        snapshot = self._snapshot
+        if bucket is None:
+            bucket = featured_bucket()[0]
+        result = snapshot.rows(snapshot.lazy['featured'].get().sample(limit, bucket))
         
-        self.stats['last_query_time'] = time.time() - start_time
+        self._record_query('get_featured_products', start_time)
         return result
     
     def count_total(self) -> int:
         """SELECT COUNT(*) FROM productos"""
-        with db_lock:
-            return len(self.data)
+        return len(self._snapshot.indexes['all'][None])
     
     def count_by_categoria(self, categoria: str) -> int:
         """SELECT COUNT(*) FROM productos WHERE Categoria = ?"""
-        with db_lock:
-            return len(self.indexes['by_categoria'].get(categoria, []))
+        return len(self._snapshot.indexes['by_categoria'].get(categoria, []))
     
     def count_by_sub_categoria(self, sub_categoria: str) -> int:
         """SELECT COUNT(*) FROM productos WHERE `Sub Categoria` = ?"""
-        with db_lock:
-            return len(self.indexes['by_sub_categoria'].get(sub_categoria, []))
+        return len(self._snapshot.indexes['by_sub_categoria'].get(sub_categoria, []))
     
     def get_database_stats(self) -> Dict:
         """Obtener estadísticas de la base de datos"""
+        snapshot = self._snapshot
         return {
-            'total_products': self.stats['total_products'],
-            'categories_count': len(self.stats['categories']),
-            'last_update': self.last_update.isoformat() if self.last_update else None,
+            'total_products': snapshot.stats['total_products'],
+            'categories_count': len(snapshot.stats['categories']),
+            'last_update': snapshot.last_update.isoformat() if snapshot.last_update else None,
             'last_query_time': self.stats['last_query_time'],
-            'indexes_built': len(self.indexes) > 0
+            'indexes_built': len(snapshot.indexes) > 0,
+            'index_build': snapshot.index_status(),
+            'snapshot_version': snapshot.version,
+            'storage': snapshot.store.kind,
+            'refresh': self.refresher.status() if self.refresher is not None else None,
+            'persistence': self.writer.status()
         }
 
+def featured_bucket(now: Optional[float] = None) -> Tuple[Optional[int], int]:
+    """Franja de tiempo actual de los destacados y segundos que le quedan.
+
+    Con FEATURED_BUCKET_SECONDS=0 no hay franjas: (None, 0), semilla aleatoria.
+    """
+    if FEATURED_BUCKET_SECONDS <= 0:
+        return None, 0
+    now = time.time() if now is None else now
+    bucket = int(now // FEATURED_BUCKET_SECONDS)
+    return bucket, max(1, int((bucket + 1) * FEATURED_BUCKET_SECONDS - now))
+
 # Instancia global
 json_db = JSONDatabase()
 
@@ -449,70 +1475,99 @@ def init_database():
     # Cargar datos iniciales
     json_db.load_from_mysql()
     
-    # Programar actualizaciones automáticas (comentado para desarrollo)
-    # def update_database():
-    #     logger.info("⏰ Actualizando base de datos JSON...")
-    #     json_db.load_from_mysql()
-    
-    # schedule.every(UPDATE_INTERVAL).minutes.do(update_database)
-    
-    # def run_scheduler():
-    #     while True:
-    #         schedule.run_pending()
-    #         time.sleep(1)
-    
-    # scheduler_thread = Thread(target=run_scheduler, daemon=True)
-    # scheduler_thread.start()
-    
     logger.info("✅ JSONDatabase inicializada correctamente")
 
 def start_json_database():
     """Iniciar el sistema de base de datos JSON"""
     # Cargar datos iniciales desde archivo o MySQL
-    if JSON_DB_FILE.exists():
+    if JSON_DB_FILE.exists() or _snapshot_file_is_current():
         logger.info("📂 Archivo de base de datos encontrado, cargando...")
         json_db.load_from_file()
     else:
         logger.info("📂 No hay archivo de BD, cargando desde MySQL...")
         json_db.load_from_mysql()
     
-    # Iniciar actualizador en background (comentado para desarrollo)
-    # def update_database_periodically():
-    #     schedule.every(UPDATE_INTERVAL).minutes.do(json_db.load_from_mysql)
-    #     while True:
-    #         schedule.run_pending()
-    #         time.sleep(60)
-    
-    # updater_thread = Thread(target=update_database_periodically, daemon=True)
-    # updater_thread.start()
+    # Refresco en segundo plano (ver services/catalog_refresher.py): un líder
+    # consulta MySQL y escribe el archivo, los demás workers recargan el archivo.
+    # Con gunicorn se inicia en cada worker (post_worker_init), no en el maestro
+    if os.getenv('CATALOG_REFRESH_DEFERRED') != '1':
+        from services.catalog_refresher import start_catalog_refresher
+        start_catalog_refresher(json_db)
+        json_db.start_index_warmup()
     
     logger.info(f"🚀 Base de datos JSON iniciada con {json_db.count_total()} productos")
 
+def _snapshot_file_is_current() -> bool:
+    """Hay snapshot binario al menos tan reciente como el JSON"""
+    if not SNAPSHOT_FILE.exists():
+        return False
+    return not JSON_DB_FILE.exists() or SNAPSHOT_FILE.stat().st_mtime >= JSON_DB_FILE.stat().st_mtime
+
 def load_from_file(self):
-    """Cargar datos desde archivo JSON"""
+    """Cargar datos desde archivo (binario o JSON); si ninguno sirve, desde MySQL"""
+    if not JSON_DB_FILE.exists() and not _snapshot_file_is_current():
+        logger.info("📂 Archivo de base de datos no existe...")
+        return self.load_from_mysql()
+    
+    if self.reload_from_file():
+        return True
+    return self.load_from_mysql()
+
+def _load_snapshot_file(self) -> None:
+    """Publicar el snapshot binario con sus índices guardados (SnapshotFormatError si está corrupto)"""
+    start_time = time.time()
+    snapshot_file = SnapshotFile.open(SNAPSHOT_FILE)
+    store = snapshot_file.store()
+    # En modo mmap las filas se quedan en el archivo compartido; si no, se decodifican una vez
+    data = store if STORAGE_MODE == MmapStore.kind else store.to_list()
+    saved_indexes = {name: snapshot_file.index_state(name) for name in snapshot_file.indexes}
+    self._publish(data, snapshot_file.last_update, saved_indexes=saved_indexes)
+    logger.info(
+        f"⚡ Snapshot binario cargado: {len(store)} productos, {len(saved_indexes)} índices guardados "
+        f"({snapshot_file.nbytes / 1024:.0f} KB) en {(time.time() - start_time) * 1000:.0f}ms"
+    )
+
+def reload_from_file(self) -> bool:
+    """Publicar el snapshot del archivo sin recurrir a MySQL si falla.
+
+    Orden: snapshot binario (si está al día y su checksum es correcto) y luego
+    el JSON. Si se cargó el JSON, se regenera el binario para la próxima vez.
+    """
+    if _snapshot_file_is_current():
+        try:
+            self._load_snapshot_file()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Snapshot binario no válido, se usa el JSON: {e}")
+    
     try:
-        if not JSON_DB_FILE.exists():
-            logger.info("📂 Archivo de base de datos no existe...")
-            return self.load_from_mysql()
-        
         with open(JSON_DB_FILE, 'r', encoding='utf-8') as f:
             file_data = json.load(f)
         
-        with db_lock:
-            self.data = file_data.get('products', [])
-            self.last_update = datetime.fromisoformat(file_data.get('last_update', datetime.now().isoformat()))
-            self._build_indexes()
-            self._calculate_stats()
+        products = file_data.get('products', [])
+        last_update = datetime.fromisoformat(file_data.get('last_update', datetime.now().isoformat()))
+        snapshot = self._publish(products, last_update)
         
-        logger.info(f"📚 Datos cargados desde archivo: {len(self.data)} productos")
-        return True
+        logger.info(f"📚 Datos cargados desde archivo: {len(products)} productos")
         
     except Exception as e:
         logger.error(f"❌ Error cargando desde archivo: {e}")
-        return self.load_from_mysql()
+        return False
+    
+    try:
+        with save_lock:
+            self._write_snapshot_file(snapshot, products)
+        if STORAGE_MODE == MmapStore.kind:
+            # Pasar a las filas del archivo compartido
+            self._load_snapshot_file()
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo generar el snapshot binario: {e}")
+    return True
 
-# Agregar método load_from_file a la clase JSONDatabase
+# Agregar métodos de carga desde archivo a la clase JSONDatabase
 JSONDatabase.load_from_file = load_from_file
+JSONDatabase.reload_from_file = reload_from_file
+JSONDatabase._load_snapshot_file = _load_snapshot_file
 
 if __name__ == "__main__":
     init_database()
\ No newline at end of file
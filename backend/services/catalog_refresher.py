@@ -0,0 +1,236 @@
+"""
+Refresco periódico del catálogo coordinado entre workers.
+
+Con varios workers de gunicorn cada proceso tiene su propio JSONDatabase. Para
+que no consulten MySQL todos a la vez, un solo proceso (el líder) refresca:
+
+- El liderazgo se obtiene con un `flock` no bloqueante sobre un archivo de
+  lock junto al JSON. El kernel lo libera cuando el proceso muere, así que otro
+  worker lo toma en la siguiente vuelta (p. ej. tras un reinicio por
+  max_requests).
+- El líder recarga desde MySQL cada UPDATE_INTERVAL (o aplica la
+  sincronización incremental si CATALOG_SYNC está configurado) con jitter, y
+  escribe el archivo del snapshot.
+- Todos, el líder incluido, hacen `stat()` del archivo en cada vuelta; cuando
+  cambia su mtime/tamaño y no es un snapshot que el proceso ya tiene (lo
+  escribió él o ya lo cargó), lo cargan con `reload_from_file`, sin tocar
+  MySQL. Así el líder adopta un parche de administración que llegó a un
+  seguidor antes de refrescar, en lugar de pisarlo con su estado anterior.
+
+Si falla MySQL o la lectura del archivo se conserva el snapshot actual.
+"""
+
+import logging
+import os
+import random
+import time
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin coordinación, el proceso siempre es líder
+    fcntl = None
+
+from json_database import JSON_DB_FILE, SNAPSHOT_FILE, UPDATE_INTERVAL, json_db
+from utils.snapshot_file import read_last_update
+
+logger = logging.getLogger(__name__)
+
+# Configuración (CATALOG_REFRESH=0 apaga el refresco en segundo plano)
+REFRESH_ENABLED = os.getenv('CATALOG_REFRESH', '1') == '1'
+REFRESH_INTERVAL = float(os.getenv('CATALOG_REFRESH_INTERVAL', str(UPDATE_INTERVAL * 60)))  # segundos
+REFRESH_JITTER = float(os.getenv('CATALOG_REFRESH_JITTER', '0.1'))  # fracción del intervalo
+WATCH_INTERVAL = float(os.getenv('CATALOG_REFRESH_WATCH_INTERVAL', '5'))  # segundos
+REFRESH_LOCK_FILE = JSON_DB_FILE.with_suffix('.lock')
+# Archivo que recargan los seguidores: el snapshot binario, que se escribe después del JSON
+WATCH_FILE = SNAPSHOT_FILE
+
+
+def jittered(interval: float, jitter: float = REFRESH_JITTER) -> float:
+    """Intervalo ±jitter para que los procesos no se sincronicen"""
+    return interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+class CatalogRefresher:
+    """Refresca el catálogo desde MySQL en el líder y desde el archivo en los seguidores"""
+
+    def __init__(self, database, snapshot_file: Path = WATCH_FILE, lock_file: Path = REFRESH_LOCK_FILE,
+                 interval: float = REFRESH_INTERVAL, jitter: float = REFRESH_JITTER,
+                 watch_interval: float = WATCH_INTERVAL, sync=None):
+        self.database = database
+        self.snapshot_file = Path(snapshot_file)
+        self.lock_file = Path(lock_file)
+        self.interval = interval
+        self.jitter = jitter
+        self.watch_interval = watch_interval
+        # CatalogSync opcional: el líder aplica deltas en lugar de recargar todo
+        self.sync = sync
+        self.is_leader = False
+        self.last_refresh: Optional[Dict[str, Any]] = None
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self._lock_fd: Optional[int] = None
+        self._file_state = self._stat()
+        self._next_refresh = time.time() + jittered(self.interval, self.jitter)
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, tamaño) del archivo del snapshot, o None si no existe"""
+        try:
+            stat = os.stat(self.snapshot_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def try_lead(self) -> bool:
+        """Tomar el lock de líder sin bloquear; una vez líder se conserva hasta morir"""
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            return True
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # PID del líder en el archivo, solo informativo
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode('ascii'))
+        self._lock_fd = fd
+        self.is_leader = True
+        logger.info(f"👑 Proceso {os.getpid()} es el líder del refresco del catálogo")
+        # Ponerse al día con lo que haya escrito el líder anterior
+        self.check_file()
+        return True
+
+    def release(self):
+        """Soltar el liderazgo (al detenerse)"""
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.is_leader = False
+
+    def _is_known(self) -> bool:
+        """El archivo es el snapshot publicado o el último que guardó este proceso"""
+        try:
+            file_update = read_last_update(self.snapshot_file)
+        except (OSError, ValueError):
+            # Ilegible: que decida reload_from_file
+            return False
+        return file_update is not None and file_update in (self.database.last_update, self.database.saved_update)
+
+    def check_file(self) -> bool:
+        """Recargar el snapshot si el archivo cambió desde la última vez y no es uno propio"""
+        state = self._stat()
+        if state is None or state == self._file_state:
+            return False
+        if self._is_known():
+            self._file_state = state
+            return False
+        start_time = time.time()
+        if not self.database.reload_from_file():
+            # Archivo a medio escribir o inválido: se reintenta en la próxima vuelta
+            return False
+        self._file_state = state
+        self.last_reload = {
+            'version': self.database.version,
+            'reload_time': time.time() - start_time,
+            'finished_at': time.time()
+        }
+        logger.info(f"📥 Snapshot {self.database.version} recargado desde archivo "
+                    f"en {self.last_reload['reload_time']:.2f}s")
+        return True
+
+    def refresh(self) -> bool:
+        """Líder: refrescar desde MySQL y programar el siguiente refresco"""
+        start_time = time.time()
+        try:
+            if self.sync is not None:
+                ok = self.sync.sync_once() is not None
+                interval = self.sync.interval
+            else:
+                ok = self.database.refresh_from_mysql()
+                interval = self.interval
+        except Exception as e:
+            logger.error(f"❌ Error refrescando el catálogo: {e}")
+            ok, interval = False, self.interval
+        self._next_refresh = time.time() + jittered(interval, self.jitter)
+        self.last_refresh = {
+            'ok': ok,
+            'version': self.database.version,
+            'refresh_time': time.time() - start_time,
+            'finished_at': time.time()
+        }
+        return ok
+
+    def tick(self):
+        """Una vuelta del bucle: todos vigilan el archivo y el líder además refresca cuando toca"""
+        # El líder primero adopta lo que haya escrito otro worker (p. ej. un parche de
+        # /api/v1/admin), para que su refresco parta de ahí y no lo revierta
+        self.check_file()
+        if self.try_lead() and time.time() >= self._next_refresh:
+            self.refresh()
+
+    def _run(self):
+        # Primera vuelta desfasada para que los workers no coincidan al arrancar
+        delay = random.uniform(0, self.watch_interval)
+        while not self._stop.wait(delay):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"❌ Error en el refresco del catálogo: {e}")
+            delay = self.watch_interval
+
+    def start(self) -> Thread:
+        """Refrescar en un hilo de fondo hasta stop()"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name='catalog-refresher', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.release()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'pid': os.getpid(),
+            'role': 'leader' if self.is_leader else 'follower',
+            'mode': self.sync.mode if self.sync is not None else 'full_reload',
+            'next_refresh_in': max(0.0, self._next_refresh - time.time()) if self.is_leader else None,
+            'last_refresh': self.last_refresh,
+            'last_reload': self.last_reload
+        }
+
+
+_refresher: Optional[CatalogRefresher] = None
+_refresher_pid: Optional[int] = None
+_start_lock = Lock()
+
+
+def start_catalog_refresher(database=json_db) -> Optional[CatalogRefresher]:
+    """Iniciar el refresco de este proceso (una vez por PID; los hilos no sobreviven al fork)"""
+    global _refresher, _refresher_pid
+    if not REFRESH_ENABLED:
+        logger.info("⏸️ Refresco del catálogo desactivado (CATALOG_REFRESH=0)")
+        return None
+    with _start_lock:
+        if _refresher is not None and _refresher_pid == os.getpid():
+            return _refresher
+        from services.catalog_sync import CatalogSync, SYNC_MODE
+        sync = CatalogSync(database, mode=SYNC_MODE) if SYNC_MODE else None
+        _refresher = CatalogRefresher(database, sync=sync)
+        _refresher_pid = os.getpid()
+        database.refresher = _refresher
+        _refresher.start()
+    logger.info(f"⏰ Refresco del catálogo iniciado en el proceso {os.getpid()} "
+                f"({'sincronización ' + SYNC_MODE if SYNC_MODE else 'recarga completa'})")
+    return _refresher
@@ -0,0 +1,203 @@
+"""
+Sincronización incremental MySQL -> JSONDatabase.
+
+En lugar de recargar y reindexar todo el catálogo, detecta las filas que
+cambiaron y aplica solo ese delta con `JSONDatabase.apply_changes`:
+
+- 'checksum' (por defecto): pide a la base `id, MD5(CONCAT_WS(...))` de cada
+  fila, lo compara con los checksums de la sincronización anterior y trae
+  solo las filas distintas. La primera vez (sin referencia) trae todas y las
+  compara contra el snapshot.
+- 'timestamp': si la tabla tiene una columna de modificación
+  (CATALOG_SYNC_TIMESTAMP_COLUMN), trae las filas con marca >= la última vista.
+
+En ambos modos las bajas se detectan comparando los ids de la tabla con los
+del snapshot. El intervalo se adapta a los cambios observados: se acorta
+cuando hay cambios y se alarga cuando no los hay. Las pasadas las ejecuta el
+líder de CatalogRefresher (services/catalog_refresher.py) con `sync_once`.
+
+La conexión y el placeholder son inyectables, así se puede probar contra
+SQLite (`sqlite_connection` registra MD5 y CONCAT_WS).
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from json_database import normalize_product, UPDATE_INTERVAL
+from utils.database import get_db_connection, close_db_connection
+from utils.product_store import PRODUCT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+SYNC_MODES = ('checksum', 'timestamp')
+
+# Configuración (CATALOG_SYNC vacío = sincronización incremental apagada)
+SYNC_MODE = os.getenv('CATALOG_SYNC', '')
+SYNC_TIMESTAMP_COLUMN = os.getenv('CATALOG_SYNC_TIMESTAMP_COLUMN', '')
+SYNC_MIN_INTERVAL = float(os.getenv('CATALOG_SYNC_MIN_INTERVAL', '15'))  # segundos
+SYNC_MAX_INTERVAL = float(os.getenv('CATALOG_SYNC_MAX_INTERVAL', str(UPDATE_INTERVAL * 60)))
+
+# Ajuste del intervalo: con cambios se divide, sin cambios se multiplica
+INTERVAL_SHRINK = 0.5
+INTERVAL_GROWTH = 1.5
+
+# Ids por consulta `WHERE id IN (...)`
+FETCH_BATCH = 500
+
+SELECT_COLUMNS = ', '.join(f"`{field}`" for field in PRODUCT_FIELDS)
+CHECKSUM_SQL = "MD5(CONCAT_WS('|', {}))".format(SELECT_COLUMNS)
+
+
+def _md5(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return hashlib.md5(str(value).encode('utf-8')).hexdigest()
+
+
+def _concat_ws(separator: str, *values: Any) -> str:
+    # Como en MySQL: los NULL se omiten
+    return separator.join(str(value) for value in values if value is not None)
+
+
+def sqlite_connection(path: str = ':memory:') -> sqlite3.Connection:
+    """Conexión SQLite con las funciones MySQL que usa la sincronización"""
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.create_function('MD5', 1, _md5)
+    connection.create_function('CONCAT_WS', -1, _concat_ws)
+    return connection
+
+
+class CatalogSync:
+    """Aplica al catálogo en memoria solo las filas de productos que cambiaron"""
+
+    def __init__(self, database, connect: Callable = get_db_connection,
+                 close: Callable = close_db_connection, placeholder: str = '%s',
+                 mode: str = 'checksum', timestamp_column: str = SYNC_TIMESTAMP_COLUMN,
+                 min_interval: float = SYNC_MIN_INTERVAL, max_interval: float = SYNC_MAX_INTERVAL):
+        if mode not in SYNC_MODES:
+            raise ValueError(f"Modo de sincronización no soportado: {mode}")
+        if mode == 'timestamp' and not timestamp_column:
+            raise ValueError("El modo 'timestamp' necesita CATALOG_SYNC_TIMESTAMP_COLUMN")
+        self.database = database
+        self.connect = connect
+        self.close = close
+        self.placeholder = placeholder
+        self.mode = mode
+        self.timestamp_column = timestamp_column
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.last_result: Optional[Dict[str, Any]] = None
+        # Referencia de la sincronización anterior
+        self._checksums: Optional[Dict[Any, str]] = None
+        self._high_water = None
+
+    def _query(self, connection, sql: str, params: Sequence = ()) -> List[Dict]:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(sql, tuple(params))
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def _fetch_ids(self, connection, product_ids: Sequence) -> List[Dict]:
+        """SELECT de las filas completas de unos ids, por lotes"""
+        rows = []
+        for start in range(0, len(product_ids), FETCH_BATCH):
+            batch = list(product_ids[start:start + FETCH_BATCH])
+            marks = ', '.join([self.placeholder] * len(batch))
+            rows.extend(self._query(
+                connection, f"SELECT {SELECT_COLUMNS} FROM productos WHERE id IN ({marks})", batch
+            ))
+        return rows
+
+    def _deleted_ids(self, remote_ids) -> List:
+        """Ids del snapshot que ya no están en la tabla"""
+        return [product_id for product_id in self.database.indexes['by_id'] if product_id not in remote_ids]
+
+    def _checksum_delta(self, connection) -> Tuple[List[Dict], List, Dict[Any, str]]:
+        """Filas cambiadas, ids borrados y checksums nuevos (la referencia a guardar si se aplican)"""
+        remote = {
+            row['id']: row['checksum']
+            for row in self._query(connection, f"SELECT id, {CHECKSUM_SQL} AS checksum FROM productos")
+        }
+        if self._checksums is None:
+            # Sin referencia: se comparan una vez las filas completas contra el snapshot
+            rows = self._query(connection, f"SELECT {SELECT_COLUMNS} FROM productos ORDER BY id")
+        else:
+            changed = [product_id for product_id, checksum in remote.items()
+                       if self._checksums.get(product_id) != checksum]
+            rows = self._fetch_ids(connection, changed)
+        return rows, self._deleted_ids(remote), remote
+
+    def _timestamp_delta(self, connection) -> Tuple[List[Dict], List, Any]:
+        """Filas cambiadas, ids borrados y la marca más alta vista (la referencia a guardar si se aplican)"""
+        column = self.timestamp_column
+        sql = f"SELECT {SELECT_COLUMNS}, `{column}` AS _sync_mark FROM productos"
+        if self._high_water is None:
+            rows = self._query(connection, sql)
+        else:
+            # >= para no perder filas con la misma marca escritas después de la última lectura;
+            # las repetidas no cambian nada al aplicarlas
+            rows = self._query(connection, f"{sql} WHERE `{column}` >= {self.placeholder}", (self._high_water,))
+        marks = [row['_sync_mark'] for row in rows if row['_sync_mark'] is not None]
+        high_water = max(marks) if marks else self._high_water
+        remote_ids = {row['id'] for row in self._query(connection, "SELECT id FROM productos")}
+        return rows, self._deleted_ids(remote_ids), high_water
+
+    def _adapt_interval(self, changes: int):
+        """Intervalo más corto si hubo cambios, más largo si no"""
+        factor = INTERVAL_SHRINK if changes else INTERVAL_GROWTH
+        self.interval = min(self.max_interval, max(self.min_interval, self.interval * factor))
+
+    def sync_once(self) -> Optional[Dict[str, Any]]:
+        """Una pasada de sincronización; devuelve el resumen o None si no hay conexión"""
+        start_time = time.time()
+        connection = self.connect()
+        if not connection:
+            logger.warning("⚠️ Sincronización incremental: sin conexión a MySQL")
+            return None
+        try:
+            if self.mode == 'timestamp':
+                rows, deleted, reference = self._timestamp_delta(connection)
+            else:
+                rows, deleted, reference = self._checksum_delta(connection)
+        finally:
+            self.close(connection)
+
+        summary = {'inserted': [], 'updated': [], 'deleted': [], 'version': self.database.version}
+        if rows or deleted:
+            summary = self.database.apply_changes(
+                upserts=[normalize_product(row) for row in rows], deleted_ids=deleted
+            )
+        # La referencia avanza solo con el delta ya aplicado: si algo falló antes,
+        # la próxima pasada vuelve a ver esas filas como cambiadas
+        if self.mode == 'timestamp':
+            self._high_water = reference
+        else:
+            self._checksums = reference
+        changes = len(summary['inserted']) + len(summary['updated']) + len(summary['deleted'])
+        self._adapt_interval(changes)
+
+        self.last_result = {
+            'mode': self.mode,
+            'fetched_rows': len(rows),
+            'inserted': len(summary['inserted']),
+            'updated': len(summary['updated']),
+            'deleted': len(summary['deleted']),
+            'version': summary['version'],
+            'sync_time': time.time() - start_time,
+            'next_interval': self.interval,
+            'finished_at': time.time()
+        }
+        if changes:
+            logger.info(
+                f"🔁 Sincronización {self.mode}: {changes} cambios ({len(rows)} filas leídas) "
+                f"en {self.last_result['sync_time']:.2f}s; próxima en {self.interval:.0f}s"
+            )
+        return self.last_result
@@ -0,0 +1,235 @@
+"""
+Métricas de latencia por endpoint y por consulta, en formato Prometheus.
+
+- Cada petición HTTP se mide en `after_request` (instalado con `init_app`):
+  conteo por endpoint/método/estado, histograma de duración, bytes
+  respondidos y errores (estado >= 500).
+- Cada método de consulta de JSONDatabase registra su duración con
+  `observe_query` (el mismo tiempo que devuelve como `db_query_time`).
+- `/metrics` expone todo en el formato de texto de Prometheus, con la
+  versión del snapshot y el número de productos; `summary()` da p50/p95/p99
+  de las últimas observaciones para /api/v1/productos/stats.
+
+Los contadores son por proceso: con varios workers de gunicorn cada scrape
+ve el worker que lo atiende (etiqueta `pid`).
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Límites (segundos) de los buckets de los histogramas
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Observaciones recientes que se guardan por serie para los percentiles de summary()
+RECENT_WINDOW = int(os.getenv('METRICS_RECENT_WINDOW', '1024'))
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+PREFIX = 'ats'
+
+
+def _percentile(ordered: Sequence[float], quantile: float) -> Optional[float]:
+    """Percentil por rango más cercano de una lista ordenada"""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(quantile * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        text = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{text}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Histogram:
+    """Histograma acumulado (buckets, suma, conteo) + ventana de observaciones recientes"""
+
+    __slots__ = ('counts', 'total', 'count', 'recent')
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RECENT_WINDOW)
+
+
+class MetricsRegistry:
+    """Contadores e histogramas etiquetados, seguros entre hilos"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        # nombre -> (ayuda, nombres de etiquetas, valores de etiquetas -> serie)
+        self._counters: Dict[str, Tuple[str, Tuple[str, ...], Dict[Tuple, float]]] = {}
+        self._histograms: Dict[str, Tuple[str, Tuple[str, ...], Dict[Tuple, Histogram]]] = {}
+        # Gauges calculados al exportar: nombre -> (ayuda, función -> [(etiquetas, valor)])
+        self._gauges: Dict[str, Tuple[str, Callable[[], List[Tuple[Dict[str, Any], float]]]]] = {}
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        with self._lock:
+            self._counters.setdefault(name, (help_text, tuple(label_names), {}))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        with self._lock:
+            self._histograms.setdefault(name, (help_text, tuple(label_names), {}))
+
+    def gauge(self, name: str, help_text: str, collect: Callable[[], List[Tuple[Dict[str, Any], float]]]):
+        self._gauges[name] = (help_text, collect)
+
+    def inc(self, name: str, labels: Tuple = (), amount: float = 1.0):
+        series = self._counters[name][2]
+        with self._lock:
+            series[labels] = series.get(labels, 0.0) + amount
+
+    def observe(self, name: str, value: float, labels: Tuple = ()):
+        series = self._histograms[name][2]
+        # Bucket calculado fuera del lock
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(self.buckets)
+            histogram.counts[index] += 1
+            histogram.total += value
+            histogram.count += 1
+            histogram.recent.append(value)
+
+    def render(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus (0.0.4)"""
+        lines: List[str] = []
+        with self._lock:
+            counters = {name: (help_text, names, dict(series))
+                        for name, (help_text, names, series) in self._counters.items()}
+            histograms = {name: (help_text, names, {labels: (list(h.counts), h.total, h.count)
+                                                    for labels, h in series.items()})
+                          for name, (help_text, names, series) in self._histograms.items()}
+
+        for name, (help_text, names, series) in counters.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in sorted(series.items()):
+                lines.append(f'{name}{_labels(names, labels)} {_number(value)}')
+
+        for name, (help_text, names, series) in histograms.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, (counts, total, count) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == math.inf else f'{bound:g}'
+                    lines.append(f'{name}_bucket{_labels(names + ("le",), labels + (le,))} {cumulative}')
+                lines.append(f'{name}_sum{_labels(names, labels)} {total:.6f}')
+                lines.append(f'{name}_count{_labels(names, labels)} {count}')
+
+        for name, (help_text, collect) in self._gauges.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in collect():
+                lines.append(f'{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def histogram_summary(self, name: str) -> Dict[str, Dict[str, Any]]:
+        """Por serie: conteo, media y p50/p95/p99 de las observaciones recientes (ms)"""
+        series = self._histograms[name][2]
+        with self._lock:
+            snapshot = {labels: (h.count, h.total, sorted(h.recent)) for labels, h in series.items()}
+        result = {}
+        for labels, (count, total, recent) in sorted(snapshot.items()):
+            entry = {'count': count, 'avg_ms': round(total / count * 1000, 3) if count else None}
+            for quantile in SUMMARY_QUANTILES:
+                value = _percentile(recent, quantile)
+                entry[f'p{int(quantile * 100)}_ms'] = round(value * 1000, 3) if value is not None else None
+            result[' '.join(str(label) for label in labels)] = entry
+        return result
+
+    def counter_values(self, name: str) -> Dict[Tuple, float]:
+        with self._lock:
+            return dict(self._counters[name][2])
+
+
+# Registro del proceso
+metrics = MetricsRegistry()
+metrics.counter(f'{PREFIX}_http_requests_total', 'Peticiones HTTP atendidas', ('endpoint', 'method', 'status'))
+metrics.counter(f'{PREFIX}_http_request_errors_total', 'Peticiones con estado >= 500', ('endpoint',))
+metrics.counter(f'{PREFIX}_http_response_bytes_total', 'Bytes de cuerpo respondidos', ('endpoint',))
+metrics.histogram(f'{PREFIX}_http_request_duration_seconds', 'Duración de las peticiones HTTP', ('endpoint',))
+metrics.histogram(f'{PREFIX}_db_query_duration_seconds', 'Duración de las consultas de JSONDatabase', ('method',))
+
+
+def observe_query(method: str, duration: float):
+    """Registrar la duración de una consulta de JSONDatabase"""
+    metrics.observe(f'{PREFIX}_db_query_duration_seconds', duration, (method,))
+
+
+def _endpoint_label(request) -> str:
+    # La regla (p. ej. /api/v1/productos/<int:product_id>) y no la URL, para acotar las series
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def summary() -> Dict[str, Any]:
+    """Resumen para /stats: latencias por endpoint y por consulta, errores y bytes"""
+    requests_by_endpoint: Dict[str, int] = {}
+    for (endpoint, _method, _status), value in metrics.counter_values(f'{PREFIX}_http_requests_total').items():
+        requests_by_endpoint[endpoint] = requests_by_endpoint.get(endpoint, 0) + int(value)
+    return {
+        'pid': os.getpid(),
+        'uptime': time.time() - metrics.started_at,
+        'requests': requests_by_endpoint,
+        'errors': {endpoint: int(value) for (endpoint,), value
+                   in metrics.counter_values(f'{PREFIX}_http_request_errors_total').items()},
+        'response_bytes': {endpoint: int(value) for (endpoint,), value
+                           in metrics.counter_values(f'{PREFIX}_http_response_bytes_total').items()},
+        'endpoints': metrics.histogram_summary(f'{PREFIX}_http_request_duration_seconds'),
+        'queries': metrics.histogram_summary(f'{PREFIX}_db_query_duration_seconds')
+    }
+
+
+def init_app(app, database):
+    """Medir cada petición de la app y exponer GET /metrics"""
+    from flask import Response, g, request
+
+    metrics.gauge(f'{PREFIX}_catalog_snapshot_info', 'Versión del snapshot servido por el proceso',
+                  lambda: [({'version': database.version, 'pid': os.getpid()}, 1)])
+    metrics.gauge(f'{PREFIX}_catalog_products', 'Productos del snapshot servido',
+                  lambda: [({'pid': os.getpid()}, database.count_total())])
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        endpoint = _endpoint_label(request)
+        metrics.observe(f'{PREFIX}_http_request_duration_seconds', time.perf_counter() - start, (endpoint,))
+        metrics.inc(f'{PREFIX}_http_requests_total', (endpoint, request.method, str(response.status_code)))
+        if response.status_code >= 500:
+            metrics.inc(f'{PREFIX}_http_request_errors_total', (endpoint,))
+        if response.content_length:
+            metrics.inc(f'{PREFIX}_http_response_bytes_total', (endpoint,), response.content_length)
+        return response
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        """Métricas del proceso en formato de texto de Prometheus"""
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
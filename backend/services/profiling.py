@@ -0,0 +1,179 @@
+"""
+Perfilado muestreado de peticiones con cProfile.
+
+Una petición se perfila si:
+- cae en la muestra aleatoria (PROFILE_SAMPLE_RATE, 0 = apagado), o
+- trae la cabecera X-Profile-Signature con una firma válida:
+  "<expira>:<hex>" donde hex = HMAC-SHA256(PROFILE_SECRET, "<expira>:<ruta>").
+  La firma vale solo para esa ruta y hasta `expira` (epoch en segundos); se
+  genera con `sign()` o con GET /api/v1/admin/profiles/firma.
+
+Los perfiles de las peticiones más lentas (PROFILE_TOP_N) se guardan en
+memoria con las funciones de mayor tiempo acumulado y se consultan en
+/api/v1/admin/profiles. Con el muestreo apagado y sin cabecera, el costo por
+petición es una comparación y una búsqueda de cabecera.
+
+Solo se perfila una petición a la vez por proceso (cProfile no admite varios
+perfiladores activos en algunas versiones de Python); las demás que lleguen
+mientras tanto se atienden sin perfilar.
+"""
+
+import cProfile
+import hashlib
+import heapq
+import hmac
+import io
+import itertools
+import os
+import pstats
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+SIGNATURE_HEADER = 'X-Profile-Signature'
+# Vigencia máxima de una firma: no se aceptan firmas que expiran más allá
+MAX_SIGNATURE_TTL = 3600
+# Funciones que se guardan de cada perfil
+PROFILE_LINES = int(os.getenv('PROFILE_LINES', '30'))
+
+
+def _secret() -> str:
+    return Config.PROFILE_SECRET or Config.ADMIN_TOKEN or ''
+
+
+def sign(path: str, expires: int, secret: Optional[str] = None) -> str:
+    """Valor de X-Profile-Signature para perfilar `path` hasta `expires`"""
+    secret = _secret() if secret is None else secret
+    digest = hmac.new(secret.encode('utf-8'), f'{expires}:{path}'.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f'{expires}:{digest}'
+
+
+def verify(signature: str, path: str, now: Optional[float] = None) -> bool:
+    secret = _secret()
+    if not secret or ':' not in signature:
+        return False
+    expires, _ = signature.split(':', 1)
+    if not expires.isdigit():
+        return False
+    now = time.time() if now is None else now
+    if not now <= int(expires) <= now + MAX_SIGNATURE_TTL:
+        return False
+    return hmac.compare_digest(signature, sign(path, int(expires), secret))
+
+
+class ProfileStore:
+    """Los N perfiles más lentos (min-heap por duración)"""
+
+    def __init__(self, top_n: int):
+        self.top_n = top_n
+        self._heap: List[tuple] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.profiled = 0
+        self.skipped = 0
+
+    def add(self, duration: float, entry: Dict[str, Any]) -> int:
+        with self._lock:
+            profile_id = next(self._ids)
+            self.profiled += 1
+            entry = {'id': profile_id, 'duration': duration, **entry}
+            item = (duration, profile_id, entry)
+            if len(self._heap) < self.top_n:
+                heapq.heappush(self._heap, item)
+            elif duration > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+            return profile_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Resumen de los perfiles guardados, más lentos primero"""
+        with self._lock:
+            items = sorted(self._heap, reverse=True)
+        return [{key: value for key, value in entry.items() if key != 'stats'} for _, _, entry in items]
+
+    def get(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for _, item_id, entry in self._heap:
+                if item_id == profile_id:
+                    return entry
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'sample_rate': Config.PROFILE_SAMPLE_RATE,
+            'signed_requests': bool(_secret()),
+            'top_n': self.top_n,
+            'stored': len(self._heap),
+            'profiled': self.profiled,
+            'skipped_busy': self.skipped
+        }
+
+
+profiles = ProfileStore(Config.PROFILE_TOP_N)
+# Un perfilador activo a la vez
+_active = threading.Lock()
+
+
+def _render_stats(profiler: cProfile.Profile) -> str:
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return output.getvalue()
+
+
+def init_app(app, database):
+    """Perfilar las peticiones muestreadas o firmadas de la app"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        rate = Config.PROFILE_SAMPLE_RATE
+        sampled = rate > 0 and random.random() < rate
+        signature = request.headers.get(SIGNATURE_HEADER)
+        if not sampled and not (signature and verify(signature, request.path)):
+            return
+        if not _active.acquire(blocking=False):
+            profiles.skipped += 1
+            return
+        profiler = cProfile.Profile()
+        g.profile = (profiler, time.perf_counter(), 'signed' if signature else 'sampled')
+        profiler.enable()
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        profiler, start, trigger = profile
+        profiler.disable()
+        duration = time.perf_counter() - start
+        try:
+            rule = request.url_rule
+            profile_id = profiles.add(duration, {
+                'endpoint': rule.rule if rule is not None else None,
+                'path': request.full_path.rstrip('?'),
+                'method': request.method,
+                'status': response.status_code,
+                'trigger': trigger,
+                'snapshot_version': database.version,
+                'started_at': time.time() - duration,
+                'stats': _render_stats(profiler)
+            })
+        finally:
+            _active.release()
+        response.headers['X-Profile-Id'] = str(profile_id)
+        return response
+
+    @app.teardown_request
+    def _abort_profile(error=None):
+        # Si after_request no llegó a correr (excepción), soltar el perfilador
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile[0].disable()
+            _active.release()
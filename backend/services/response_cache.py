@@ -0,0 +1,194 @@
+"""
+Caché en proceso de respuestas ya serializadas de /api/v1/productos.
+
+Las respuestas solo cambian cuando se publica otro snapshot del catálogo, así
+que se guardan codificadas en un LRU acotado por bytes (RESPONSE_CACHE_MAX_BYTES,
+0 = apagada), con clave (endpoint, argumentos de la ruta, parámetros
+normalizados, versión del snapshot). En un acierto no se ejecuta la consulta
+ni se serializa nada: se devuelven los bytes guardados.
+
+El bloque `performance` no se guarda: se serializa aparte en cada respuesta
+(total_time real, db_query_time 0 en los aciertos, response_cache 'hit' o
+'miss') y se añade al final del cuerpo. Las cabeceras X-Cache y
+X-Response-Time dan lo mismo sin leer el cuerpo.
+
+Solo se guardan respuestas 200 construidas con `cached_json`; los errores
+siguen por jsonify. Al cambiar la versión del snapshot se descarta todo.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app, g, request
+
+from config import Config
+from json_database import json_db
+from services.metrics import PREFIX, metrics
+
+# Bytes que se suman a cada entrada por la clave y la estructura
+ENTRY_OVERHEAD = 256
+# No se guardan entradas mayores que esta fracción de la caché
+MAX_ENTRY_FRACTION = 0.125
+
+
+class ResponseCache:
+    """LRU de cuerpos codificados acotado por bytes, invalidado por versión del snapshot"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple, Tuple[bytes, Dict[str, Any], int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.oversized = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def entries(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self, version: str):
+        # Con el lock tomado: un snapshot nuevo deja inalcanzables todas las entradas
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+            self._version = version
+
+    def get(self, key: Tuple, version: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """(cuerpo sin performance, performance fijo) o None"""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key: Tuple, version: str, body: bytes, performance: Dict[str, Any]) -> int:
+        """Guardar una respuesta; devuelve cuántas entradas se desalojaron"""
+        size = len(body) + ENTRY_OVERHEAD
+        evictions = 0
+        with self._lock:
+            if size > self.max_bytes * MAX_ENTRY_FRACTION:
+                self.oversized += 1
+                return 0
+            self._check_version(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._entries[key] = (body, performance, size)
+            self.bytes += size
+            self.stores += 1
+            while self.bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                evictions += 1
+            self.evictions += evictions
+        return evictions
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self._version = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'version': self._version,
+            'entries': self.entries,
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'oversized': self.oversized
+        }
+
+
+# Caché del proceso
+response_cache = ResponseCache(Config.RESPONSE_CACHE_MAX_BYTES)
+metrics.counter(f'{PREFIX}_response_cache_requests_total', 'Consultas a la caché de respuestas',
+                ('endpoint', 'result'))
+metrics.gauge(f'{PREFIX}_response_cache_bytes', 'Bytes en la caché de respuestas',
+              lambda: [({}, response_cache.bytes)])
+metrics.counter(f'{PREFIX}_response_cache_evictions_total', 'Entradas desalojadas por tamaño')
+metrics.gauge(f'{PREFIX}_response_cache_entries', 'Entradas en la caché de respuestas',
+              lambda: [({}, response_cache.entries)])
+
+
+def _request_key(version: str) -> Tuple:
+    # Parámetros ordenados por nombre; los valores repetidos conservan su orden
+    # (?tamano=a&tamano=b y ?tamano=b&tamano=a dan respuestas distintas)
+    params = tuple(sorted(request.args.items(multi=True), key=lambda item: item[0]))
+    return request.endpoint, tuple(sorted((request.view_args or {}).items())), params, version
+
+
+def _respond(body: bytes, performance: Dict[str, Any], start_time: float, result: str):
+    total_time = time.time() - start_time
+    performance = {**performance, 'total_time': total_time, 'response_cache': result}
+    if result == 'hit':
+        performance['db_query_time'] = 0.0
+    # body termina en '}': se reabre el objeto para añadir performance
+    encoded = current_app.json.dumps(performance, separators=(',', ':')).encode('utf-8')
+    response = current_app.response_class(
+        body[:-1] + b',"performance":' + encoded + b'}\n', mimetype='application/json'
+    )
+    response.headers['X-Cache'] = result.upper()
+    response.headers['X-Response-Time'] = f'{total_time * 1000:.3f}ms'
+    return response
+
+
+def cached(view):
+    """Servir la vista desde la caché si la respuesta de este snapshot ya está guardada"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not response_cache.enabled:
+            return view(*args, **kwargs)
+        start_time = time.time()
+        version = json_db.version
+        key = _request_key(version)
+        entry = response_cache.get(key, version)
+        result = 'hit' if entry is not None else 'miss'
+        metrics.inc(f'{PREFIX}_response_cache_requests_total', (request.endpoint, result))
+        if entry is not None:
+            return _respond(entry[0], entry[1], start_time, 'hit')
+        g.response_cache_key = (key, version)
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def cached_json(payload: Dict[str, Any], start_time: float):
+    """Respuesta 200 de `payload` (con su bloque performance), guardándola si la vista es @cached"""
+    performance = payload.pop('performance')
+    body = current_app.json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    cache_key = g.pop('response_cache_key', None)
+    if cache_key is None:
+        return _respond(body, performance, start_time, 'bypass')
+    key, version = cache_key
+    # Si se publicó otro snapshot durante la consulta, la respuesta no corresponde a la clave
+    if json_db.version == version:
+        evictions = response_cache.put(key, version, body, performance)
+        if evictions:
+            metrics.inc(f'{PREFIX}_response_cache_evictions_total', amount=evictions)
+    return _respond(body, performance, start_time, 'miss')
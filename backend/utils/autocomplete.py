@@ -0,0 +1,160 @@
+"""
+Índice de autocompletado construido con cada snapshot del catálogo.
+
+Arreglo ordenado de prefijos: cada sugerencia (producto "Nombre Modelo",
+marca o subcategoría) se indexa por su texto normalizado y por cada palabra
+interior ("walker red label" también sugiere "Johnnie Walker Red label").
+Un prefijo se resuelve con dos bisect sobre las claves; los prefijos cortos
+(los más frecuentes en el typeahead) tienen su top precalculado.
+
+Como depende de las ventas, el índice guardado en el snapshot binario
+(`state()`) solo se reutiliza si las ventas no cambiaron (checksum).
+"""
+
+import heapq
+import zlib
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.text import tokenize
+
+# Longitud máxima de prefijo con resultados precalculados y cuántos se guardan
+PRECOMPUTED_PREFIX_LENGTH = 2
+PRECOMPUTED_TOP = 20
+
+TYPE_PRODUCT = 'producto'
+TYPE_BRAND = 'marca'
+TYPE_SUBCATEGORY = 'subcategoria'
+
+# Versión del estado guardado en el snapshot binario
+STATE_VERSION = 1
+
+
+def sales_checksum(sales: Sequence[float]) -> int:
+    """Huella de las ventas con las que se construyó el índice"""
+    return zlib.crc32(array('d', sales).tobytes())
+
+
+def normalize_phrase(text: str) -> str:
+    """Texto plegado (sin tildes, minúsculas) con espacios simples"""
+    return ' '.join(tokenize(text))
+
+
+class AutocompleteIndex:
+    """Sugerencias ligeras ordenadas por ventas para un prefijo"""
+
+    def __init__(self, store, sales: Sequence[float], positions: Optional[Iterable[int]] = None):
+        # Sugerencia: (texto, tipo, id de producto o None, ventas)
+        suggestions: List[Tuple[str, str, object, float]] = []
+        by_text: Dict[Tuple[str, str], int] = {}
+
+        def add(text: str, kind: str, product_id, product_sales: float, accumulate: bool):
+            text = ' '.join(str(text).split())
+            if not text:
+                return
+            key = (normalize_phrase(text), kind)
+            if not key[0]:
+                return
+            index = by_text.get(key)
+            if index is None:
+                by_text[key] = len(suggestions)
+                suggestions.append((text, kind, product_id, product_sales))
+            elif accumulate:
+                current = suggestions[index]
+                suggestions[index] = current[:3] + (current[3] + product_sales,)
+            elif product_sales > suggestions[index][3]:
+                # Productos con el mismo nombre: queda el más vendido
+                suggestions[index] = (text, kind, product_id, product_sales)
+
+        ids = store.column('id')
+        nombres = store.column('Nombre')
+        modelos = store.column('Modelo')
+        sub_categorias = store.column('Sub Categoria')
+        for pos in (range(len(store)) if positions is None else positions):
+            add(f"{nombres[pos]} {modelos[pos]}", TYPE_PRODUCT, ids[pos], sales[pos], False)
+            add(nombres[pos], TYPE_BRAND, None, sales[pos], True)
+            add(sub_categorias[pos], TYPE_SUBCATEGORY, None, sales[pos], True)
+
+        # Claves: el texto completo y cada sufijo que empieza en una palabra
+        keyed = []
+        for index, (text, _kind, _id, _sales) in enumerate(suggestions):
+            words = normalize_phrase(text).split(' ')
+            for start in range(len(words)):
+                keyed.append((' '.join(words[start:]), index))
+        keyed.sort()
+
+        self.suggestions = suggestions
+        self.keys = [key for key, _ in keyed]
+        self.entries = array('I', (index for _, index in keyed))
+        self.top_by_prefix = self._precompute_short_prefixes()
+        self.sales_checksum = sales_checksum(sales)
+
+    def state(self) -> Tuple[Dict, Dict[str, array]]:
+        """Metadatos (JSON) y arreglos para guardar el índice en el snapshot binario"""
+        meta = {
+            'version': STATE_VERSION,
+            'sales_checksum': self.sales_checksum,
+            'suggestions': self.suggestions,
+            'keys': self.keys,
+            'top_by_prefix': self.top_by_prefix
+        }
+        return meta, {'entries': self.entries}
+
+    @classmethod
+    def from_state(cls, meta: Dict, arrays: Dict[str, array],
+                   sales: Sequence[float]) -> Optional['AutocompleteIndex']:
+        """Índice guardado con state(), o None si es de otra versión o de otras ventas"""
+        checksum = sales_checksum(sales)
+        if meta.get('version') != STATE_VERSION or meta.get('sales_checksum') != checksum:
+            return None
+        index = cls.__new__(cls)
+        index.suggestions = [tuple(suggestion) for suggestion in meta['suggestions']]
+        index.keys = meta['keys']
+        index.entries = arrays['entries']
+        index.top_by_prefix = meta['top_by_prefix']
+        index.sales_checksum = checksum
+        return index
+
+    def _rank(self, candidates, limit: int) -> List[int]:
+        suggestions = self.suggestions
+        # Más vendidas primero; a igualdad, el texto más corto
+        return heapq.nsmallest(
+            limit, candidates,
+            key=lambda index: (-suggestions[index][3], len(suggestions[index][0]), suggestions[index][0])
+        )
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\uffff', start)
+        return start, end
+
+    def _precompute_short_prefixes(self) -> Dict[str, List[int]]:
+        prefixes = {key[:length] for key in self.keys
+                    for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1) if len(key) >= length}
+        top = {}
+        for prefix in prefixes:
+            start, end = self._range(prefix)
+            top[prefix] = self._rank(set(self.entries[start:end]), PRECOMPUTED_TOP)
+        return top
+
+    def suggest(self, query: str, limit: int = 8) -> List[Dict]:
+        """Sugerencias para el texto escrito hasta ahora"""
+        prefix = normalize_phrase(query)
+        if not prefix:
+            return []
+
+        if limit <= PRECOMPUTED_TOP and prefix in self.top_by_prefix:
+            ranked = self.top_by_prefix[prefix][:limit]
+        else:
+            start, end = self._range(prefix)
+            ranked = self._rank(set(self.entries[start:end]), limit)
+
+        result = []
+        for index in ranked:
+            text, kind, product_id, _sales = self.suggestions[index]
+            suggestion = {'texto': text, 'tipo': kind}
+            if product_id is not None:
+                suggestion['id'] = product_id
+            result.append(suggestion)
+        return result
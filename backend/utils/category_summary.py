@@ -0,0 +1,91 @@
+"""
+Resumen materializado de subcategorías para /categorias.
+
+Se calcula una vez por snapshot: por subcategoría, su categoría y nivel
+(del primer producto en orden de id), el total de productos, los que tienen
+stock y el precio mínimo, máximo y mediano (para el slider de precio del
+filtro; sin los productos sin precio, guardados como 0, que no cambian el
+total). Los precios salen de las listas ordenadas del índice de precios, así
+cada estadística es O(1) tras una búsqueda binaria. Con `patched()` solo se recalculan las
+subcategorías donde entra, sale o cambia algún producto, y el endpoint es una
+consulta directa de la lista ya ordenada.
+"""
+
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+SUBCATEGORY_FIELD = 'Sub Categoria'
+IN_STOCK = 'Con Stock'
+# Nivel de las subcategorías sin nivel numérico (van al final)
+DEFAULT_LEVEL = 999
+
+
+def _median(prices: Sequence[float], start: int = 0) -> Optional[float]:
+    """Mediana de prices[start:] (lista ya ordenada) sin copiarla"""
+    size = len(prices) - start
+    if size <= 0:
+        return None
+    middle = start + size // 2
+    if size % 2:
+        return prices[middle]
+    return (prices[middle - 1] + prices[middle]) / 2
+
+
+def _level(entry: Dict[str, Any]) -> int:
+    level = entry['Sub_Categoria_Nivel']
+    return int(level) if level.isdigit() else DEFAULT_LEVEL
+
+
+class CategorySummary:
+    """Subcategoría -> resumen, y la lista ordenada por nivel que devuelve la API"""
+
+    def __init__(self, store, groups: Dict[Any, Sequence[int]], price_list: Callable[[Any], Any]):
+        """groups: subcategoría -> posiciones (orden de id); price_list(valor) -> SortedPriceList"""
+        self.entries: Dict[Any, Tuple[int, Dict[str, Any]]] = {}
+        for value in groups:
+            self._update(store, groups, price_list, value)
+        self.rows = self._sorted_rows()
+
+    def _update(self, store, groups: Dict[Any, Sequence[int]], price_list: Callable[[Any], Any], value):
+        positions = groups.get(value)
+        if not positions:
+            self.entries.pop(value, None)
+            return
+        first = positions[0]
+        prices = price_list(value).prices
+        # Los productos sin precio (0) no cuentan para el rango del slider
+        priced = bisect_right(prices, 0)
+        entry = {
+            'Categoria': store.value(first, 'Categoria'),  # Para URLs (mantener compatibilidad)
+            'Sub_Categoria': value,  # Nombre a mostrar
+            'Sub_Categoria_Nivel': store.value(first, 'Sub Categoria Nivel'),
+            'total_productos': len(positions),
+            'productos_con_stock': sum(1 for pos in positions if store.value(pos, 'Stock') == IN_STOCK),
+            'precio_min': prices[priced] if priced < len(prices) else None,
+            'precio_max': prices[-1] if priced < len(prices) else None,
+            'precio_mediana': _median(prices, priced)
+        }
+        # La primera posición conserva el orden de aparición entre subcategorías del mismo nivel
+        self.entries[value] = (first, entry)
+
+    def _sorted_rows(self) -> List[Dict[str, Any]]:
+        ordered = sorted(self.entries.values(), key=lambda item: (_level(item[1]), item[0]))
+        return [entry for _, entry in ordered]
+
+    def patched(self, store, groups: Dict[Any, Sequence[int]], price_list: Callable[[Any], Any],
+                changes: Iterable[Tuple[int, Optional[Dict], Optional[Dict]]]) -> 'CategorySummary':
+        """Copia con las subcategorías de los cambios (posición, anterior, nuevo) recalculadas.
+
+        store, groups y price_list son los del snapshot nuevo.
+        """
+        affected = set()
+        for _, old, new in changes:
+            for product in (old, new):
+                if product is not None:
+                    affected.add(product.get(SUBCATEGORY_FIELD, ''))
+        summary = CategorySummary.__new__(CategorySummary)
+        summary.entries = dict(self.entries)
+        for value in affected:
+            summary._update(store, groups, price_list, value)
+        summary.rows = summary._sorted_rows()
+        return summary
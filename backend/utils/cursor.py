@@ -0,0 +1,50 @@
+"""
+Cursores opacos para paginación estable frente a recargas del catálogo.
+
+Un cursor fija la versión del snapshot que sirvió la primera página, la huella
+de la consulta (filtros y orden) y la posición dentro de ese orden. Las páginas
+siguientes se leen del mismo snapshot, así un reload entre página y página no
+salta ni repite productos.
+"""
+
+import base64
+import json
+import zlib
+from typing import Any, Optional, Tuple
+
+
+class InvalidCursor(ValueError):
+    """Cursor mal formado o de otra consulta"""
+
+
+class CursorExpired(InvalidCursor):
+    """El snapshot del cursor ya no se conserva: hay que empezar de nuevo"""
+
+
+def query_fingerprint(*parts: Any) -> str:
+    """Huella corta de los parámetros que definen una consulta"""
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return format(zlib.crc32(raw.encode('utf-8')), '08x')
+
+
+def encode_cursor(version: str, fingerprint: str, offset: int, after: Optional[int] = None) -> str:
+    """Cursor opaco (base64 url-safe sin relleno)"""
+    payload = {'v': version, 'f': fingerprint, 'o': offset}
+    if after is not None:
+        payload['a'] = after
+    raw = json.dumps(payload, separators=(',', ':')).encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> Tuple[str, int, Optional[int]]:
+    """(versión, offset, clave del último elemento) de un cursor de esta consulta"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        version, offset, after = str(payload['v']), int(payload['o']), payload.get('a')
+        after = None if after is None else int(after)
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor("Cursor no válido") from e
+    if payload.get('f') != fingerprint or offset < 0:
+        raise InvalidCursor("El cursor no corresponde a esta consulta")
+    return version, offset, after
@@ -1,9 +1,13 @@
 import mysql.connector
 from mysql.connector import Error
+import logging
 import time
-from flask import current_app
 from config import Config
 
+# Logger del módulo: las conexiones también se abren fuera del contexto de
+# Flask (arranque y refresco en segundo plano)
+logger = logging.getLogger(__name__)
+
 class DatabaseManager:
     """Gestor optimizado de conexiones a base de datos"""
     
@@ -26,7 +30,7 @@ class DatabaseManager:
             connection = mysql.connector.connect(**self.config)
             return connection
         except Error as e:
-            current_app.logger.error(f"Error de conexión a MySQL: {e}")
+            logger.error(f"Error de conexión a MySQL: {e}")
             raise
     
     def execute_query(self, query, params=None, fetch_all=True):
@@ -60,7 +64,7 @@ class DatabaseManager:
             }
             
         except Error as e:
-            current_app.logger.error(f"Error en consulta: {e}")
+            logger.error(f"Error en consulta: {e}")
             raise
         finally:
             if cursor:
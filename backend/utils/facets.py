@@ -0,0 +1,142 @@
+"""
+Bitsets por valor de faceta para el filtrado del lado del servidor.
+
+Cada valor de faceta (subcategoría, tamaño, stock, categoría) tiene un bitset
+(entero de Python) con un bit por posición de producto. Un filtro es un AND de
+ORs de bitsets, y el conteo de cada faceta se obtiene con un AND + popcount
+contra la máscara de los demás filtros (faceting disyuntivo), sin recorrer
+productos.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Nombre de la faceta en la API -> campo del producto
+FACET_FIELDS = {
+    'categoria': 'Categoria',
+    'subcategoria': 'Sub Categoria',
+    'tamano': 'Tamaño',
+    'stock': 'Stock'
+}
+
+if hasattr(int, 'bit_count'):
+    def popcount(bits: int) -> int:
+        return bits.bit_count()
+else:  # Python < 3.10
+    def popcount(bits: int) -> int:
+        return bin(bits).count('1')
+
+
+def bits_from_positions(positions: Iterable[int], size: int) -> int:
+    """Bitset con los bits de `positions` encendidos"""
+    buffer = bytearray((size + 7) // 8)
+    for pos in positions:
+        buffer[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def iter_positions(bits: int, offset: int = 0, limit: Optional[int] = None) -> List[int]:
+    """Posiciones encendidas en orden ascendente, paginadas"""
+    if limit is not None and limit <= 0:
+        return []
+    # Cadena binaria invertida (bit 0 primero); str.find recorre en C
+    text = format(bits, 'b')[::-1]
+    result = []
+    pos = text.find('1')
+    skipped = 0
+    while pos != -1:
+        if skipped < offset:
+            skipped += 1
+        else:
+            result.append(pos)
+            if limit is not None and len(result) >= limit:
+                break
+        pos = text.find('1', pos + 1)
+    return result
+
+
+class FacetIndex:
+    """Bitsets por valor de faceta"""
+
+    def __init__(self, store):
+        self.size = len(store)
+        self.all_bits = (1 << self.size) - 1
+        self.bitsets: Dict[str, Dict[str, int]] = {}
+        for facet, field in FACET_FIELDS.items():
+            grouped: Dict[str, List[int]] = {}
+            for pos, value in enumerate(store.column(field)):
+                grouped.setdefault(value, []).append(pos)
+            self.bitsets[facet] = {
+                value: bits_from_positions(positions, self.size)
+                for value, positions in grouped.items()
+            }
+
+    def patched(self, changes: Sequence[Tuple[int, Optional[Dict], Optional[Dict]]], size: int) -> 'FacetIndex':
+        """Copia con los cambios (posición, producto anterior, producto nuevo) aplicados"""
+        index = FacetIndex.__new__(FacetIndex)
+        index.size = size
+        index.all_bits = self.all_bits
+        index.bitsets = dict(self.bitsets)
+        copied = set()
+        for pos, old, new in changes:
+            bit = 1 << pos
+            if new is None:
+                index.all_bits &= ~bit
+            else:
+                index.all_bits |= bit
+            for facet, field in FACET_FIELDS.items():
+                before = old.get(field) if old is not None else None
+                after = new.get(field) if new is not None else None
+                if before == after and (old is None) == (new is None):
+                    continue
+                if facet not in copied:
+                    copied.add(facet)
+                    index.bitsets[facet] = dict(index.bitsets[facet])
+                facet_bitsets = index.bitsets[facet]
+                if old is not None:
+                    bits = facet_bitsets.get(before, 0) & ~bit
+                    if bits:
+                        facet_bitsets[before] = bits
+                    else:
+                        facet_bitsets.pop(before, None)
+                if new is not None:
+                    facet_bitsets[after] = facet_bitsets.get(after, 0) | bit
+        return index
+
+    def facet_bits(self, facet: str, values: Sequence[str]) -> int:
+        """OR de los bitsets de los valores elegidos de una faceta"""
+        facet_bitsets = self.bitsets.get(facet, {})
+        bits = 0
+        for value in values:
+            bits |= facet_bitsets.get(value, 0)
+        return bits
+
+    def filter(self, selections: Dict[str, Sequence[str]], base_bits: Optional[int] = None):
+        """Aplicar filtros y calcular conteos de facetas en una pasada.
+
+        selections: faceta -> valores elegidos (OR dentro de la faceta, AND entre facetas).
+        base_bits: máscara adicional (rango de precio, búsqueda de texto...).
+        Devuelve (máscara resultante, {faceta: {valor: conteo}}). El conteo de cada
+        faceta ignora su propia selección, para mostrar las alternativas.
+        """
+        base = self.all_bits if base_bits is None else base_bits
+        selected = {facet: self.facet_bits(facet, values)
+                    for facet, values in selections.items() if values and facet in self.bitsets}
+
+        mask = base
+        for bits in selected.values():
+            mask &= bits
+
+        facets: Dict[str, Dict[str, int]] = {}
+        for facet, facet_bitsets in self.bitsets.items():
+            others = base
+            for other, bits in selected.items():
+                if other != facet:
+                    others &= bits
+            chosen = selections.get(facet) or ()
+            counts = {}
+            for value, bits in facet_bitsets.items():
+                count = popcount(bits & others)
+                if count or value in chosen:
+                    counts[value] = count
+            facets[facet] = counts
+        return mask, facets
@@ -0,0 +1,77 @@
+"""
+Muestreo de productos destacados ponderado por ventas.
+
+FeaturedSampler guarda, por snapshot, una tabla de alias (método de Walker)
+sobre las posiciones candidatas: cada extracción cuesta O(1), así una
+selección de k productos es O(k) en lugar de copiar y barajar la lista entera
+en cada petición. El peso de cada producto es 1 + sales_weight * popularidad,
+de modo que los más vendidos salen más a menudo pero ninguno queda fuera.
+
+Con la misma semilla (p. ej. la franja de tiempo actual) la selección es
+idéntica en todos los procesos que sirven el mismo snapshot, y una selección
+más corta es prefijo de una más larga.
+"""
+
+import random
+from array import array
+from typing import List, Optional, Sequence
+
+# Extracciones por producto pedido antes de completar con un barajado ponderado
+# (solo pasa si se pide casi todo el conjunto o los pesos están muy concentrados)
+MAX_DRAWS_PER_ITEM = 4
+
+
+class FeaturedSampler:
+    """Muestra ponderada sin reemplazo sobre un conjunto fijo de posiciones"""
+
+    def __init__(self, positions: Sequence[int], weights: Sequence[float]):
+        self.positions = array('I', positions)
+        self.weights = array('d', weights)
+        size = len(self.positions)
+        self.probability = array('d', bytes(8 * size))
+        self.alias = array('I', bytes(4 * size))
+        total = sum(self.weights)
+        if not size or total <= 0:
+            return
+
+        # Tabla de alias: cada casilla guarda su probabilidad y la casilla que completa el resto
+        scaled = [weight * size / total for weight in self.weights]
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            low, high = small.pop(), large[-1]
+            self.probability[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            if scaled[high] < 1.0:
+                small.append(large.pop())
+        for index in small + large:
+            self.probability[index] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _draw(self, rng: random.Random) -> int:
+        index = int(rng.random() * len(self.positions))
+        return index if rng.random() < self.probability[index] else self.alias[index]
+
+    def sample(self, limit: int, seed: Optional[int] = None) -> List[int]:
+        """Hasta `limit` posiciones distintas; con la misma semilla, el mismo resultado"""
+        rng = random.Random(seed)
+        size = len(self.positions)
+        limit = min(max(limit, 0), size)
+        chosen: List[int] = []
+        seen = set()
+        for _ in range(limit * MAX_DRAWS_PER_ITEM):
+            if len(chosen) >= limit:
+                break
+            index = self._draw(rng)
+            if index not in seen:
+                seen.add(index)
+                chosen.append(index)
+        if len(chosen) < limit:
+            # Resto por claves de Efraimidis-Spirakis (u^(1/w)), O(n log n)
+            rest = sorted((index for index in range(size) if index not in seen),
+                          key=lambda index: -rng.random() ** (1.0 / max(self.weights[index], 1e-12)))
+            chosen.extend(rest[:limit - len(chosen)])
+        return [self.positions[index] for index in chosen]
@@ -0,0 +1,71 @@
+"""
+Índices secundarios que se construyen bajo demanda.
+
+Un snapshot se publica con los índices que usa cualquier listado y deja los
+de texto (tokens, trigramas, autocompletado) como LazyIndex: se construyen la
+primera vez que una consulta los pide o antes, en el calentamiento en segundo
+plano que arranca tras publicar el snapshot. Las consultas que tienen una
+alternativa recorren el catálogo mientras el índice no está listo (`peek()`
+devuelve None) en lugar de esperar a que termine de construirse.
+
+Cada índice guarda su tiempo de construcción y cuántas consultas lo usaron o
+recorrieron el catálogo sin él, para ver en /stats cuáles se amortizan.
+"""
+
+import time
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+
+class LazyIndex:
+    """Valor que se construye una sola vez, en el primer get()"""
+
+    __slots__ = ('name', '_build', '_value', '_lock', 'build_time', 'uses', 'scans')
+
+    def __init__(self, name: str, build: Callable[[], Any]):
+        self.name = name
+        self._build = build
+        self._value = None
+        self._lock = Lock()
+        self.build_time: Optional[float] = None
+        # Contadores aproximados (sin lock): consultas con índice y recorridos sin él
+        self.uses = 0
+        self.scans = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._build is None
+
+    def get(self) -> Any:
+        """El índice para una consulta, construyéndolo si hace falta"""
+        value = self.build()
+        self.uses += 1
+        return value
+
+    def build(self) -> Any:
+        """Construir el índice si aún no lo está (otros hilos esperan al primero)"""
+        if self._build is not None:
+            with self._lock:
+                if self._build is not None:
+                    start_time = time.time()
+                    self._value = self._build()
+                    self.build_time = time.time() - start_time
+                    # Soltar el constructor (y lo que retiene, p. ej. el snapshot anterior)
+                    self._build = None
+        return self._value
+
+    def peek(self) -> Optional[Any]:
+        """El índice si ya está construido; si no, None y cuenta un recorrido"""
+        if self._build is not None:
+            self.scans += 1
+            return None
+        self.uses += 1
+        return self._value
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready,
+            'build_time': self.build_time,
+            'uses': self.uses,
+            'scans': self.scans
+        }
@@ -0,0 +1,138 @@
+"""
+Índice de precios ordenado para rangos ("entre S/30 y S/80") y orden por precio.
+
+Para cada ámbito de listado (catálogo completo, cada categoría, subcategoría
+y estado de stock) guarda las posiciones ordenadas por precio junto con el arreglo
+paralelo de precios, así un rango se resuelve con dos bisect y una página es
+un slice: O(log n + k). Los cambios de producto se aplican con `patched()`,
+que copia solo las listas de los ámbitos afectados.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+PRICE_FIELD = 'Precio B'
+
+# Índices del snapshot con lista de precios por valor
+PRICE_SCOPES = ('all', 'by_categoria', 'by_sub_categoria', 'by_stock')
+
+
+class SortedPriceList:
+    """Posiciones ordenadas por (precio, posición) + precios paralelos"""
+
+    __slots__ = ('positions', 'prices')
+
+    def __init__(self, positions: Sequence[int], price_column: Sequence[float]):
+        ordered = sorted(positions, key=lambda pos: (price_column[pos], pos))
+        self.positions = array('I', ordered)
+        self.prices = array('d', (price_column[pos] for pos in ordered))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def copy(self) -> 'SortedPriceList':
+        price_list = SortedPriceList.__new__(SortedPriceList)
+        price_list.positions = array('I', self.positions)
+        price_list.prices = array('d', self.prices)
+        return price_list
+
+    def _locate(self, pos: int, price: float) -> int:
+        """Índice donde está (o iría) `pos` con ese precio; empates en orden de posición"""
+        start = bisect_left(self.prices, price)
+        end = bisect_right(self.prices, price, start)
+        return bisect_left(self.positions, pos, start, end)
+
+    def insert(self, pos: int, price: float):
+        index = self._locate(pos, price)
+        self.positions.insert(index, pos)
+        self.prices.insert(index, price)
+
+    def remove(self, pos: int, price: float):
+        index = self._locate(pos, price)
+        if index < len(self.positions) and self.positions[index] == pos:
+            del self.positions[index]
+            del self.prices[index]
+
+    def bounds(self, price_min: Optional[float] = None, price_max: Optional[float] = None) -> Tuple[int, int]:
+        """Índices [start, end) de los precios dentro de [price_min, price_max]"""
+        start = 0 if price_min is None else bisect_left(self.prices, price_min)
+        end = len(self.prices) if price_max is None else bisect_right(self.prices, price_max)
+        return start, max(start, end)
+
+    def page(self, price_min: Optional[float], price_max: Optional[float], descending: bool = False,
+             limit: Optional[int] = None, offset: int = 0) -> Tuple[List[int], int]:
+        """Página del rango en orden de precio y total del rango"""
+        start, end = self.bounds(price_min, price_max)
+        total = end - start
+        if descending:
+            stop = end - offset
+            first = start if not limit else max(start, stop - limit)
+            positions = self.positions[first:max(first, stop)][::-1]
+        else:
+            first = start + offset
+            stop = end if not limit else min(end, first + limit)
+            positions = self.positions[first:max(first, stop)]
+        return list(positions), total
+
+
+class PriceIndex:
+    """Listas de precios ordenadas por ámbito: índice -> valor -> SortedPriceList"""
+
+    def __init__(self, store, indexes: Dict[str, Dict], scopes: Sequence[str] = PRICE_SCOPES):
+        price_column = [float(price or 0) for price in store.column(PRICE_FIELD)]
+        self.price_column = array('d', price_column)
+        self.lists: Dict[str, Dict] = {
+            index_name: {
+                value: SortedPriceList(positions, price_column)
+                for value, positions in indexes[index_name].items()
+            }
+            for index_name in scopes
+        }
+
+    def get(self, index_name: str, value) -> Optional[SortedPriceList]:
+        return self.lists.get(index_name, {}).get(value)
+
+    def patched(self, changes: Sequence[Tuple[int, Optional[Dict], Optional[Dict]]],
+                scope_value: Callable[[str, Dict], object]) -> 'PriceIndex':
+        """Copia con los cambios (posición, producto anterior, producto nuevo) aplicados.
+
+        `scope_value(index_name, product)` da el valor de ámbito de un producto
+        (None para 'all'). Solo se copian las listas donde algo entra o sale.
+        """
+        index = PriceIndex.__new__(PriceIndex)
+        index.price_column = array('d', self.price_column)
+        index.lists = {index_name: dict(lists) for index_name, lists in self.lists.items()}
+        copied = set()
+
+        def writable(index_name: str, value) -> SortedPriceList:
+            lists = index.lists[index_name]
+            if (index_name, value) not in copied:
+                copied.add((index_name, value))
+                current = lists.get(value)
+                lists[value] = current.copy() if current is not None else SortedPriceList((), ())
+            return lists[value]
+
+        for pos, old, new in changes:
+            new_price = _price(new) if new is not None else 0.0
+            if pos < len(index.price_column):
+                index.price_column[pos] = new_price
+            else:
+                index.price_column.append(new_price)
+            for index_name in index.lists:
+                before = (scope_value(index_name, old), _price(old)) if old is not None else None
+                after = (scope_value(index_name, new), new_price) if new is not None else None
+                if before == after:
+                    continue
+                if before is not None:
+                    writable(index_name, before[0]).remove(pos, before[1])
+                    if not index.lists[index_name][before[0]]:
+                        del index.lists[index_name][before[0]]
+                        copied.discard((index_name, before[0]))
+                if after is not None:
+                    writable(index_name, after[0]).insert(pos, after[1])
+        return index
+
+
+def _price(product: Dict) -> float:
+    return float(product.get(PRICE_FIELD) or 0)
@@ -0,0 +1,269 @@
+"""
+Almacenamiento de productos para los snapshots de JSONDatabase.
+
+Dos implementaciones con la misma interfaz, direccionadas por posición de fila:
+
+- RowStore: lista de dicts (comportamiento original).
+- ColumnarStore: columnas tipadas (`array`) para ids/precios/cantidades y
+  columnas de texto codificadas por diccionario; los dicts solo se construyen
+  al responder.
+- MmapStore (utils/snapshot_file.py): las mismas columnas sobre un archivo
+  binario mapeado en memoria y compartido entre workers.
+
+Ambas son inmutables una vez publicadas: `patched()` devuelve un almacenamiento
+nuevo con filas reemplazadas o añadidas al final, y comparte con el original
+todo lo que no cambia.
+"""
+
+from array import array
+from typing import Any, Dict, Iterable, List, Sequence
+
+# Orden de campos de la tabla productos (mismo orden que el SELECT de MySQL)
+PRODUCT_FIELDS = (
+    'id', 'SKU', 'Nombre', 'Modelo', 'Tamaño',
+    'Precio B', 'Precio J', 'Categoria', 'Sub Categoria',
+    'Stock', 'Sub Categoria Nivel', 'Al Por Mayor',
+    'Top_S_Sku', 'Product_asig', 'Descripcion', 'Cantidad', 'Photo'
+)
+
+# Columnas numéricas -> typecode de array
+NUMERIC_COLUMNS = {
+    'id': 'q',
+    'Precio B': 'd',
+    'Precio J': 'd',
+    'Cantidad': 'q'
+}
+
+FIELD_DEFAULTS = {
+    'id': 0,
+    'Precio B': 0.0,
+    'Precio J': 0.0,
+    'Cantidad': 0,
+    'Stock': 'Sin Stock',
+    'Sub Categoria Nivel': '999'
+}
+
+# Una columna de texto se codifica por diccionario si tiene pocos valores distintos
+DICTIONARY_MAX_RATIO = 0.5
+
+
+class RowStore:
+    """Productos como lista de dicts"""
+
+    kind = 'rows'
+
+    def __init__(self, products: Iterable[Dict]):
+        self._rows = list(products)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, pos: int) -> Dict:
+        return self._rows[pos]
+
+    def rows(self, positions: Iterable[int]) -> List[Dict]:
+        rows = self._rows
+        return [rows[pos] for pos in positions]
+
+    def value(self, pos: int, field: str) -> Any:
+        return self._rows[pos].get(field, FIELD_DEFAULTS.get(field, ''))
+
+    def column(self, field: str) -> Sequence:
+        default = FIELD_DEFAULTS.get(field, '')
+        return [row.get(field, default) for row in self._rows]
+
+    def to_list(self) -> List[Dict]:
+        return self._rows
+
+    def patched(self, changes: Dict[int, Dict]) -> 'RowStore':
+        """Copia con las filas de `changes` (posición -> producto); posiciones >= len se añaden"""
+        store = RowStore.__new__(RowStore)
+        rows = store._rows = list(self._rows)
+        for pos in sorted(changes):
+            if pos < len(rows):
+                rows[pos] = changes[pos]
+            else:
+                rows.append(changes[pos])
+        return store
+
+
+class _DictionaryColumn:
+    """Columna de texto codificada: códigos enteros + tabla de valores"""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self, raw: Sequence):
+        self.values = []
+        lookup = {}
+        codes = []
+        for value in raw:
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(self.values)
+                self.values.append(value)
+            codes.append(code)
+        self.codes = array('H' if len(self.values) <= 0xFFFF else 'I', codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, pos: int) -> Any:
+        return self.values[self.codes[pos]]
+
+    def copy(self) -> '_DictionaryColumn':
+        column = _DictionaryColumn.__new__(_DictionaryColumn)
+        column.values = list(self.values)
+        column.codes = array(self.codes.typecode, self.codes)
+        return column
+
+    def code_for(self, value: Any) -> int:
+        """Código de un valor, añadiéndolo a la tabla si es nuevo (solo sobre una copia)"""
+        try:
+            return self.values.index(value)
+        except ValueError:
+            self.values.append(value)
+            if len(self.values) > 0xFFFF and self.codes.typecode == 'H':
+                self.codes = array('I', self.codes)
+            return len(self.values) - 1
+
+    def set(self, pos: int, value: Any):
+        code = self.code_for(value)
+        if pos < len(self.codes):
+            self.codes[pos] = code
+        else:
+            self.codes.append(code)
+
+
+class ColumnarStore:
+    """Productos en columnas tipadas y codificadas por diccionario"""
+
+    kind = 'columnar'
+
+    def __init__(self, products: Iterable[Dict]):
+        products = list(products)
+        self._size = len(products)
+        self._fields = list(PRODUCT_FIELDS)
+        # Campos fuera del esquema se guardan aparte (dispersos por posición)
+        self._extras = {}
+        for pos, product in enumerate(products):
+            extra = {k: v for k, v in product.items() if k not in PRODUCT_FIELDS}
+            if extra:
+                self._extras[pos] = extra
+
+        self._columns = {}
+        for field in self._fields:
+            default = FIELD_DEFAULTS.get(field, '')
+            raw = [product.get(field, default) for product in products]
+            self._columns[field] = self._encode(field, raw)
+
+    @staticmethod
+    def _encode(field: str, raw: List) -> Sequence:
+        typecode = NUMERIC_COLUMNS.get(field)
+        if typecode:
+            # Solo si todos los valores son del tipo esperado (ida y vuelta exacta)
+            expected = float if typecode == 'd' else int
+            if all(type(value) is expected for value in raw):
+                return array(typecode, raw)
+            return raw
+        if raw and len(set(raw)) <= len(raw) * DICTIONARY_MAX_RATIO:
+            return _DictionaryColumn(raw)
+        return raw
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, pos: int) -> Dict:
+        if pos < 0:
+            pos += self._size
+        product = {field: self._columns[field][pos] for field in self._fields}
+        extra = self._extras.get(pos)
+        if extra:
+            product.update(extra)
+        return product
+
+    def rows(self, positions: Iterable[int]) -> List[Dict]:
+        return [self[pos] for pos in positions]
+
+    def value(self, pos: int, field: str) -> Any:
+        column = self._columns.get(field)
+        if column is None:
+            return self._extras.get(pos, {}).get(field, FIELD_DEFAULTS.get(field, ''))
+        return column[pos]
+
+    def column(self, field: str) -> Sequence:
+        column = self._columns.get(field)
+        if column is None:
+            return [self.value(pos, field) for pos in range(self._size)]
+        if isinstance(column, _DictionaryColumn):
+            values = column.values
+            return [values[code] for code in column.codes]
+        return column
+
+    def to_list(self) -> List[Dict]:
+        return [self[pos] for pos in range(self._size)]
+
+    def patched(self, changes: Dict[int, Dict]) -> 'ColumnarStore':
+        """Copia con las filas de `changes` (posición -> producto); posiciones >= len se añaden.
+
+        Solo se copian las columnas con algún valor distinto (todas si hay altas).
+        """
+        store = ColumnarStore.__new__(ColumnarStore)
+        store._fields = self._fields
+        store._size = max([self._size] + [pos + 1 for pos in changes])
+        store._columns = dict(self._columns)
+        store._extras = self._extras
+
+        appended = store._size > self._size
+        for field in self._fields:
+            default = FIELD_DEFAULTS.get(field, '')
+            values = {pos: product.get(field, default) for pos, product in changes.items()}
+            if not appended and all(self.value(pos, field) == value for pos, value in values.items()):
+                continue
+            store._columns[field] = self._patch_column(field, self._columns[field], values)
+
+        extras = {pos: {k: v for k, v in product.items() if k not in PRODUCT_FIELDS}
+                  for pos, product in changes.items()}
+        if any(extras.values()) or any(pos in self._extras for pos in changes):
+            store._extras = dict(self._extras)
+            for pos, extra in extras.items():
+                if extra:
+                    store._extras[pos] = extra
+                else:
+                    store._extras.pop(pos, None)
+        return store
+
+    @staticmethod
+    def _patch_column(field: str, column: Sequence, values: Dict[int, Any]) -> Sequence:
+        if isinstance(column, _DictionaryColumn):
+            column = column.copy()
+            for pos in sorted(values):
+                column.set(pos, values[pos])
+            return column
+        if isinstance(column, array):
+            expected = float if column.typecode == 'd' else int
+            if all(type(value) is expected for value in values.values()):
+                column = array(column.typecode, column)
+            else:
+                # Un valor de otro tipo: la columna pasa a lista
+                column = list(column)
+        else:
+            column = list(column)
+        for pos in sorted(values):
+            if pos < len(column):
+                column[pos] = values[pos]
+            else:
+                column.append(values[pos])
+        return column
+
+
+STORE_TYPES = {
+    RowStore.kind: RowStore,
+    ColumnarStore.kind: ColumnarStore
+}
+
+
+def build_store(products: Iterable[Dict], kind: str = RowStore.kind):
+    """Crear el almacenamiento indicado ('rows', 'columnar' o 'mmap'); un almacenamiento ya construido se usa tal cual"""
+    if isinstance(products, tuple(STORE_TYPES.values())):
+        return products
+    return STORE_TYPES.get(kind, RowStore)(products)
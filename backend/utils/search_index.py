@@ -0,0 +1,454 @@
+"""
+Índices de búsqueda de texto construidos con cada snapshot del catálogo.
+
+TokenIndex es un índice invertido token -> posiciones (ordenadas) sobre los
+campos de texto del producto. Cada término de la consulta se compara como
+prefijo de los tokens indexados (para el typeahead) y los términos se combinan
+con AND intersectando las listas de posiciones. También guarda frecuencias
+ponderadas por campo para ordenar por relevancia (BM25) mezclada con la
+popularidad de ventas.
+
+TrigramIndex indexa trigramas de caracteres para la búsqueda tolerante a
+errores ("wisky", "jonnie walker"): solo puntúa los candidatos que comparten
+algún trigrama con la consulta, sin recorrer el catálogo.
+
+Ambos aceptan cambios de productos con `patched()`, que devuelve un índice
+nuevo copiando solo las listas de los tokens afectados, y se pueden guardar en
+el snapshot binario con `state()` / `from_state()` para no reconstruirlos al
+arrancar.
+"""
+
+import heapq
+import math
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from utils.text import fold, tokenize
+
+# Campos indexados (los mismos que recorría la búsqueda lineal)
+SEARCH_FIELDS = ('Nombre', 'Modelo', 'Tamaño', 'Categoria', 'Sub Categoria', 'Descripcion')
+
+# Peso de cada campo en la frecuencia de término (BM25F simplificado)
+FIELD_WEIGHTS = {
+    'Nombre': 3.0,
+    'Modelo': 2.0,
+    'Tamaño': 0.5,
+    'Categoria': 1.0,
+    'Sub Categoria': 1.0,
+    'Descripcion': 1.0
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Pesos por defecto de la mezcla relevancia de texto / popularidad de ventas
+DEFAULT_TEXT_WEIGHT = 1.0
+DEFAULT_SALES_WEIGHT = 0.3
+
+# Campos del índice de trigramas y similitud mínima por defecto
+TRIGRAM_FIELDS = ('Nombre', 'Modelo', 'Categoria')
+FUZZY_MIN_SIMILARITY = 0.5
+
+# Versión del estado guardado en el snapshot binario: subirla si cambia la
+# tokenización o la forma de los índices (los guardados se reconstruyen)
+STATE_VERSION = 1
+
+
+def _remove_posting(positions: array, pos: int) -> Optional[int]:
+    """Quitar `pos` de una lista ordenada; devuelve el índice que ocupaba"""
+    index = bisect_left(positions, pos)
+    if index < len(positions) and positions[index] == pos:
+        del positions[index]
+        return index
+    return None
+
+
+def _pack_lists(keys: Sequence[str], lists: Dict[str, array], typecode: str) -> array:
+    """Listas de varias claves concatenadas en un solo arreglo"""
+    packed = array(typecode)
+    for key in keys:
+        packed.extend(lists[key])
+    return packed
+
+
+def _unpack_lists(keys: Sequence[str], lengths: Sequence[int], packed: array) -> Dict[str, array]:
+    lists = {}
+    start = 0
+    for key, length in zip(keys, lengths):
+        lists[key] = packed[start:start + length]
+        start += length
+    return lists
+
+
+class TokenIndex:
+    """Índice invertido token -> posiciones de producto"""
+
+    def __init__(self, store, fields: Sequence[str] = SEARCH_FIELDS, positions: Optional[Iterable[int]] = None):
+        postings: Dict[str, array] = {}
+        # Frecuencia ponderada de cada token, paralela a postings[token]
+        frequencies: Dict[str, array] = {}
+        doc_lengths = array('f')
+        columns = [(store.column(field), FIELD_WEIGHTS.get(field, 1.0)) for field in fields]
+        # Solo las posiciones vivas (las bajas siguen en el almacenamiento parcheado)
+        live = range(len(store)) if positions is None else set(positions)
+        for pos in range(len(store)):
+            if pos not in live:
+                doc_lengths.append(0.0)
+                continue
+            counts, length = self._term_counts((column[pos], weight) for column, weight in columns)
+            doc_lengths.append(length)
+            for token, tf in counts.items():
+                token_postings = postings.get(token)
+                if token_postings is None:
+                    token_postings = postings[token] = array('I')
+                    frequencies[token] = array('f')
+                token_postings.append(pos)
+                frequencies[token].append(tf)
+
+        self.fields = tuple(fields)
+        self.postings = postings
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        # Productos indexados (sin contar posiciones dadas de baja) y suma de longitudes
+        self.doc_count = len(live)
+        self.total_length = sum(doc_lengths)
+        self.avg_length = (self.total_length / self.doc_count) if self.doc_count else 1.0
+        # Vocabulario ordenado para expandir prefijos con bisect
+        self.vocabulary = sorted(postings)
+
+    @staticmethod
+    def _term_counts(texts) -> Tuple[Dict[str, float], float]:
+        """Frecuencia ponderada por token y longitud ponderada de un producto"""
+        counts: Dict[str, float] = {}
+        length = 0.0
+        for text, weight in texts:
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0.0) + weight
+                length += weight
+        return counts, length
+
+    def _product_counts(self, product: Optional[Dict]) -> Tuple[Dict[str, float], float]:
+        if product is None:
+            return {}, 0.0
+        return self._term_counts((product.get(field, ''), FIELD_WEIGHTS.get(field, 1.0))
+                                 for field in self.fields)
+
+    def state(self) -> Tuple[Dict, Dict[str, array]]:
+        """Metadatos (JSON) y arreglos para guardar el índice en el snapshot binario"""
+        tokens = list(self.postings)
+        meta = {
+            'version': STATE_VERSION,
+            'fields': list(self.fields),
+            'weights': [FIELD_WEIGHTS.get(field, 1.0) for field in self.fields],
+            'tokens': tokens,
+            'doc_count': self.doc_count,
+            'total_length': self.total_length
+        }
+        arrays = {
+            'lengths': array('I', (len(self.postings[token]) for token in tokens)),
+            'postings': _pack_lists(tokens, self.postings, 'I'),
+            'frequencies': _pack_lists(tokens, self.frequencies, 'f'),
+            'doc_lengths': self.doc_lengths
+        }
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta: Dict, arrays: Dict[str, array],
+                   fields: Sequence[str] = SEARCH_FIELDS) -> Optional['TokenIndex']:
+        """Índice guardado con state(), o None si se generó con otra configuración"""
+        if (meta.get('version') != STATE_VERSION or meta.get('fields') != list(fields)
+                or meta.get('weights') != [FIELD_WEIGHTS.get(field, 1.0) for field in fields]):
+            return None
+        index = cls.__new__(cls)
+        tokens = meta['tokens']
+        index.fields = tuple(fields)
+        index.postings = _unpack_lists(tokens, arrays['lengths'], arrays['postings'])
+        index.frequencies = _unpack_lists(tokens, arrays['lengths'], arrays['frequencies'])
+        index.doc_lengths = arrays['doc_lengths']
+        index.doc_count = meta['doc_count']
+        index.total_length = meta['total_length']
+        index.avg_length = (index.total_length / index.doc_count) if index.doc_count else 1.0
+        index.vocabulary = sorted(tokens)
+        return index
+
+    def patched(self, changes: Sequence[Tuple[int, Optional[Dict], Optional[Dict]]]) -> 'TokenIndex':
+        """Copia con los cambios (posición, producto anterior, producto nuevo) aplicados"""
+        index = TokenIndex.__new__(TokenIndex)
+        index.fields = self.fields
+        index.postings = dict(self.postings)
+        index.frequencies = dict(self.frequencies)
+        index.doc_lengths = array('f', self.doc_lengths)
+        index.doc_count = self.doc_count
+        index.total_length = self.total_length
+        vocabulary = None
+        copied = set()
+
+        for pos, old, new in changes:
+            old_counts, old_length = self._product_counts(old)
+            new_counts, new_length = self._product_counts(new)
+            index.doc_count += (new is not None) - (old is not None)
+            index.total_length += new_length - old_length
+            if pos < len(index.doc_lengths):
+                index.doc_lengths[pos] = new_length
+            else:
+                index.doc_lengths.append(new_length)
+
+            for token in set(old_counts) | set(new_counts):
+                if old_counts.get(token) == new_counts.get(token):
+                    continue
+                if token not in copied:
+                    copied.add(token)
+                    index.postings[token] = array('I', index.postings.get(token, ()))
+                    index.frequencies[token] = array('f', index.frequencies.get(token, ()))
+                positions = index.postings[token]
+                frequencies = index.frequencies[token]
+                if token in old_counts:
+                    removed = _remove_posting(positions, pos)
+                    if removed is not None:
+                        del frequencies[removed]
+                if token in new_counts:
+                    at = bisect_left(positions, pos)
+                    positions.insert(at, pos)
+                    frequencies.insert(at, new_counts[token])
+
+        for token in copied:
+            exists = bool(index.postings[token])
+            if exists != (token in self.postings):
+                if vocabulary is None:
+                    vocabulary = list(self.vocabulary)
+                if exists:
+                    insort(vocabulary, token)
+                else:
+                    del vocabulary[bisect_left(vocabulary, token)]
+            if not exists:
+                del index.postings[token]
+                del index.frequencies[token]
+
+        index.vocabulary = self.vocabulary if vocabulary is None else vocabulary
+        index.avg_length = (index.total_length / index.doc_count) if index.doc_count else 1.0
+        return index
+
+    def expand(self, term: str) -> List[str]:
+        """Tokens del vocabulario que empiezan por `term`"""
+        vocabulary = self.vocabulary
+        start = bisect_left(vocabulary, term)
+        end = start
+        while end < len(vocabulary) and vocabulary[end].startswith(term):
+            end += 1
+        return vocabulary[start:end]
+
+    def _matches(self, term: str) -> Set[int]:
+        matches: Set[int] = set()
+        for token in self.expand(term):
+            matches.update(self.postings[token])
+        return matches
+
+    def search(self, query: str) -> List[int]:
+        """Posiciones (en orden de id) que contienen todos los términos de la consulta"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        # Intersectar empezando por el término más selectivo
+        candidates = sorted((self._matches(term) for term in terms), key=len)
+        result = candidates[0]
+        for matches in candidates[1:]:
+            if not result:
+                break
+            result = result & matches
+        return sorted(result)
+
+    def _term_scores(self, term: str) -> Dict[int, float]:
+        """Puntuación BM25 de un término para cada producto que lo contiene.
+
+        Si el prefijo se expande a varios tokens, cuenta el mejor de ellos.
+        """
+        total_docs = self.doc_count
+        doc_lengths = self.doc_lengths
+        norm = BM25_K1 * BM25_B / (self.avg_length or 1.0)
+        base = BM25_K1 * (1 - BM25_B)
+        scores: Dict[int, float] = {}
+        for token in self.expand(term):
+            positions = self.postings[token]
+            df = len(positions)
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            # Un token más largo que el término (coincidencia por prefijo) pesa menos
+            if len(token) > len(term):
+                idf *= len(term) / len(token)
+            for pos, tf in zip(positions, self.frequencies[token]):
+                score = idf * tf * (BM25_K1 + 1) / (tf + base + norm * doc_lengths[pos])
+                if score > scores.get(pos, 0.0):
+                    scores[pos] = score
+        return scores
+
+    def rank(self, query: str, popularity: Sequence[float], limit: int, offset: int = 0,
+             text_weight: float = DEFAULT_TEXT_WEIGHT,
+             sales_weight: float = DEFAULT_SALES_WEIGHT) -> Tuple[List[int], int]:
+        """Coincidencias ordenadas por relevancia y total exacto.
+
+        puntuación = text_weight * BM25 normalizado (0..1) + sales_weight * popularidad (0..1).
+        Los mejores offset + limit se eligen con un heap, sin ordenar todo.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return [], 0
+
+        per_term = sorted((self._term_scores(term) for term in terms), key=len)
+        matched = set(per_term[0])
+        for scores in per_term[1:]:
+            if not matched:
+                break
+            matched.intersection_update(scores)
+        if not matched:
+            return [], 0
+
+        text_scores = {pos: sum(scores[pos] for scores in per_term) for pos in matched}
+        max_score = max(text_scores.values()) or 1.0
+        text_factor = text_weight / max_score
+
+        def blended(pos: int) -> float:
+            return text_factor * text_scores[pos] + sales_weight * popularity[pos]
+
+        # A igualdad de puntuación, orden de catálogo
+        best = heapq.nsmallest(offset + limit, matched, key=lambda pos: (-blended(pos), pos))
+        return best[offset:], len(matched)
+
+
+def scan_search(store, positions: Sequence[int], query: str,
+                fields: Sequence[str] = SEARCH_FIELDS) -> List[int]:
+    """Lo mismo que TokenIndex.search recorriendo los productos, sin índice.
+
+    Para las consultas que llegan antes de que el índice esté construido.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+
+    columns = [store.column(field) for field in fields]
+    result = []
+    for pos in positions:
+        # Un solo plegado por producto; se tokeniza solo si contiene todos los términos
+        text = fold(' '.join(str(column[pos]) for column in columns if column[pos]))
+        if not all(term in text for term in terms):
+            continue
+        tokens = tokenize(text)
+        if all(any(token.startswith(term) for token in tokens) for term in terms):
+            result.append(pos)
+    return result
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigramas de cada palabra, con relleno como en pg_trgm ("  w", " wh", ...)"""
+    grams = set()
+    for token in tokenize(text):
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Índice invertido trigrama -> posiciones para búsqueda aproximada"""
+
+    def __init__(self, store, fields: Sequence[str] = TRIGRAM_FIELDS, positions: Optional[Iterable[int]] = None):
+        postings: Dict[str, array] = {}
+        # Nº de trigramas por producto (desempate: el texto más corto es más exacto)
+        self.gram_counts = array('H')
+        self.fields = tuple(fields)
+        columns = [store.column(field) for field in fields]
+        live = range(len(store)) if positions is None else set(positions)
+        for pos in range(len(store)):
+            if pos not in live:
+                self.gram_counts.append(0)
+                continue
+            grams = trigrams(' '.join(column[pos] for column in columns))
+            self.gram_counts.append(min(len(grams), 0xFFFF))
+            for gram in grams:
+                gram_postings = postings.get(gram)
+                if gram_postings is None:
+                    gram_postings = postings[gram] = array('I')
+                gram_postings.append(pos)
+
+        self.postings = postings
+
+    def _product_grams(self, product: Optional[Dict]) -> Set[str]:
+        if product is None:
+            return set()
+        return trigrams(' '.join(product.get(field, '') for field in self.fields))
+
+    def state(self) -> Tuple[Dict, Dict[str, array]]:
+        """Metadatos (JSON) y arreglos para guardar el índice en el snapshot binario"""
+        grams = list(self.postings)
+        meta = {'version': STATE_VERSION, 'fields': list(self.fields), 'grams': grams}
+        arrays = {
+            'lengths': array('I', (len(self.postings[gram]) for gram in grams)),
+            'postings': _pack_lists(grams, self.postings, 'I'),
+            'gram_counts': self.gram_counts
+        }
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta: Dict, arrays: Dict[str, array],
+                   fields: Sequence[str] = TRIGRAM_FIELDS) -> Optional['TrigramIndex']:
+        """Índice guardado con state(), o None si se generó con otra configuración"""
+        if meta.get('version') != STATE_VERSION or meta.get('fields') != list(fields):
+            return None
+        index = cls.__new__(cls)
+        index.fields = tuple(fields)
+        index.postings = _unpack_lists(meta['grams'], arrays['lengths'], arrays['postings'])
+        index.gram_counts = arrays['gram_counts']
+        return index
+
+    def patched(self, changes: Sequence[Tuple[int, Optional[Dict], Optional[Dict]]]) -> 'TrigramIndex':
+        """Copia con los cambios (posición, producto anterior, producto nuevo) aplicados"""
+        index = TrigramIndex.__new__(TrigramIndex)
+        index.fields = self.fields
+        index.postings = dict(self.postings)
+        index.gram_counts = array('H', self.gram_counts)
+        copied = set()
+
+        for pos, old, new in changes:
+            old_grams = self._product_grams(old)
+            new_grams = self._product_grams(new)
+            count = min(len(new_grams), 0xFFFF)
+            if pos < len(index.gram_counts):
+                index.gram_counts[pos] = count
+            else:
+                index.gram_counts.append(count)
+            for gram in old_grams ^ new_grams:
+                if gram not in copied:
+                    copied.add(gram)
+                    index.postings[gram] = array('I', index.postings.get(gram, ()))
+                if gram in old_grams:
+                    _remove_posting(index.postings[gram], pos)
+                else:
+                    insort(index.postings[gram], pos)
+
+        for gram in copied:
+            if not index.postings[gram]:
+                del index.postings[gram]
+        return index
+
+    def search(self, query: str, limit: int, offset: int = 0,
+               min_similarity: float = FUZZY_MIN_SIMILARITY) -> Tuple[List[int], int]:
+        """Posiciones más parecidas a la consulta y total sobre el umbral.
+
+        La similitud es la fracción de trigramas de la consulta presentes en el
+        producto; se cuentan con las listas del índice y se eligen los mejores
+        con un heap acotado a offset + limit.
+        """
+        all_grams = trigrams(query)
+        query_grams = [gram for gram in all_grams if gram in self.postings]
+        if not query_grams:
+            return [], 0
+
+        hits = Counter(chain.from_iterable(self.postings[gram] for gram in query_grams))
+        min_hits = min_similarity * len(all_grams)
+        candidates = [(count, pos) for pos, count in hits.items() if count >= min_hits]
+
+        # Más trigramas en común primero; a igualdad, el texto más corto
+        gram_counts = self.gram_counts
+        best = heapq.nsmallest(offset + limit, candidates,
+                               key=lambda item: (-item[0], gram_counts[item[1]], item[1]))
+        return [pos for _, pos in best[offset:]], len(candidates)
@@ -0,0 +1,404 @@
+"""
+Snapshot binario del catálogo, de solo lectura y apto para `mmap`.
+
+Con varios workers de gunicorn cada proceso tenía su copia de los productos.
+Este formato guarda el catálogo en columnas dentro de un único archivo que cada
+worker mapea en memoria: las páginas las comparte el page cache del sistema,
+así que en un mismo host hay una sola copia física, y los productos se
+decodifican campo a campo solo cuando se piden.
+
+Estructura (little endian, secciones alineadas a 8 bytes):
+
+    cabecera  '<8sHHIII': MAGIC, versión de formato, flags, productos, largo de
+              meta, CRC32 de todo lo que sigue a la cabecera
+    meta      JSON utf-8: last_update, columnas, índices y secciones
+              {nombre: [offset, largo]} relativas al cuerpo
+    cuerpo    datos de cada sección; comprimido con zlib si FLAG_COMPRESSED
+
+Un archivo con otra versión, truncado o con CRC distinto se rechaza con
+SnapshotFormatError (quien carga recurre al JSON y luego a MySQL). Comprimido
+ocupa menos pero se descomprime en memoria del proceso: ya no se comparte.
+
+Codificación de columnas:
+
+- 'num':  arreglo tipado (`q`/`d`) leído sin copiar con memoryview.cast.
+- 'dict': códigos (`H`/`I`) + tabla de valores en meta, para pocos valores distintos.
+- 'str':  offsets (`I`) + texto utf-8 concatenado.
+- 'json': como 'str' pero cada valor en JSON (tipos mixtos o None).
+
+Los campos fuera del esquema van en la columna '__extras__' (JSON por fila).
+Opcionalmente se guardan índices ya construidos (p. ej. los de texto) como
+metadatos + arreglos tipados (`state()` de cada índice), para no
+reconstruirlos al arrancar.
+
+El archivo nunca se reescribe en sitio (ver `atomic_write`): un worker que lo
+tiene mapeado sigue leyendo el inodo anterior hasta que recarga.
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.product_store import (
+    DICTIONARY_MAX_RATIO, FIELD_DEFAULTS, NUMERIC_COLUMNS, PRODUCT_FIELDS, STORE_TYPES
+)
+
+MAGIC = b'ATSSNAP\x00'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<8sHHIII')
+ALIGNMENT = 8
+EXTRAS_COLUMN = '__extras__'
+
+FLAG_COMPRESSED = 1
+
+
+class SnapshotFormatError(ValueError):
+    """Archivo que no es un snapshot válido (o de otra versión de formato)"""
+
+
+def _json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class _StringColumn:
+    """Textos utf-8 concatenados + offsets; decodifica al acceder"""
+
+    __slots__ = ('offsets', 'blob', 'as_json')
+
+    def __init__(self, offsets: Sequence[int], blob: memoryview, as_json: bool = False):
+        self.offsets = offsets
+        self.blob = blob
+        self.as_json = as_json
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, pos: int) -> Any:
+        text = str(self.blob[self.offsets[pos]:self.offsets[pos + 1]], 'utf-8')
+        if self.as_json:
+            return json.loads(text) if text else None
+        return text
+
+    def __iter__(self) -> Iterator:
+        # Recorrido completo (construcción de índices, to_list): la columna se decodifica
+        # de una vez; si es ASCII los offsets en bytes valen como índices del texto
+        blob = bytes(self.blob)
+        offsets = self.offsets.tolist()
+        text = blob.decode('utf-8')
+        if len(text) == len(blob):
+            texts = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        else:
+            texts = [blob[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+        if self.as_json:
+            # Un solo json.loads para toda la columna
+            return iter(json.loads('[' + ','.join(text or 'null' for text in texts) + ']'))
+        return iter(texts)
+
+
+class _CodedColumn:
+    """Códigos de diccionario sobre el buffer + tabla de valores"""
+
+    __slots__ = ('codes', 'values')
+
+    def __init__(self, codes: Sequence[int], values: List):
+        self.codes = codes
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, pos: int) -> Any:
+        return self.values[self.codes[pos]]
+
+    def __iter__(self) -> Iterator:
+        return map(self.values.__getitem__, self.codes)
+
+
+def _encode_column(field: str, raw: List) -> Tuple[Dict[str, Any], List[Tuple[str, bytes]]]:
+    """(descriptor de la columna, [(sección, bytes)])"""
+    typecode = NUMERIC_COLUMNS.get(field)
+    if typecode:
+        expected = float if typecode == 'd' else int
+        if all(type(value) is expected for value in raw):
+            return {'encoding': 'num', 'typecode': typecode}, [(field, array(typecode, raw).tobytes())]
+    if all(type(value) is str for value in raw):
+        distinct = set(raw)
+        if raw and len(distinct) <= len(raw) * DICTIONARY_MAX_RATIO:
+            values = sorted(distinct)
+            lookup = {value: code for code, value in enumerate(values)}
+            code_type = 'H' if len(values) <= 0xFFFF else 'I'
+            codes = array(code_type, (lookup[value] for value in raw))
+            return ({'encoding': 'dict', 'typecode': code_type, 'values': values},
+                    [(field, codes.tobytes())])
+        texts, encoding = raw, 'str'
+    else:
+        texts, encoding = [_json(value) for value in raw], 'json'
+    offsets = array('I', [0])
+    chunks = []
+    for text in texts:
+        chunk = text.encode('utf-8')
+        chunks.append(chunk)
+        offsets.append(offsets[-1] + len(chunk))
+    return ({'encoding': encoding},
+            [(field + ':offsets', offsets.tobytes()), (field, b''.join(chunks))])
+
+
+def encode_snapshot(products: Sequence[Dict], last_update: Optional[datetime] = None,
+                    indexes: Optional[Dict[str, Tuple[Dict, Dict[str, array]]]] = None,
+                    compress: bool = False) -> bytes:
+    """Serializar productos (y opcionalmente estados de índices) al formato binario"""
+    columns: Dict[str, Dict[str, Any]] = {}
+    sections: List[Tuple[str, bytes]] = []
+    for field in PRODUCT_FIELDS:
+        default = FIELD_DEFAULTS.get(field, '')
+        descriptor, data = _encode_column(field, [product.get(field, default) for product in products])
+        columns[field] = descriptor
+        sections.extend(data)
+
+    extras = [{k: v for k, v in product.items() if k not in PRODUCT_FIELDS} for product in products]
+    if any(extras):
+        texts = [_json(extra) if extra else '' for extra in extras]
+        offsets = array('I', [0])
+        for text in texts:
+            offsets.append(offsets[-1] + len(text.encode('utf-8')))
+        columns[EXTRAS_COLUMN] = {'encoding': 'json'}
+        sections.append((EXTRAS_COLUMN + ':offsets', offsets.tobytes()))
+        sections.append((EXTRAS_COLUMN, ''.join(texts).encode('utf-8')))
+
+    # Índices: metadatos en meta, cada arreglo en su sección
+    index_meta = {}
+    for name, (meta, arrays) in (indexes or {}).items():
+        index_meta[name] = {'meta': meta, 'arrays': {key: values.typecode for key, values in arrays.items()}}
+        for key, values in arrays.items():
+            sections.append((f"index:{name}:{key}", values.tobytes()))
+
+    # Offsets relativos al inicio del cuerpo
+    layout = {}
+    body_parts = []
+    position = 0
+    for name, data in sections:
+        layout[name] = [position, len(data)]
+        padding = -len(data) % ALIGNMENT
+        body_parts.append(data)
+        body_parts.append(b'\x00' * padding)
+        position += len(data) + padding
+    body = b''.join(body_parts)
+    flags = 0
+    if compress:
+        body = zlib.compress(body)
+        flags |= FLAG_COMPRESSED
+
+    meta = _json({
+        'last_update': last_update.isoformat() if last_update else None,
+        'columns': columns,
+        'indexes': index_meta,
+        'sections': layout
+    }).encode('utf-8')
+    meta += b' ' * (-(HEADER.size + len(meta)) % ALIGNMENT)
+
+    checksum = zlib.crc32(body, zlib.crc32(meta))
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, flags, len(products), len(meta), checksum)
+    return b''.join((header, meta, body))
+
+
+def atomic_write(path: Path, data: bytes) -> int:
+    """Escribir en un temporal del mismo directorio, fsync y reemplazar; devuelve los bytes escritos.
+
+    Un corte a mitad de escritura deja el archivo anterior intacto, y el
+    reemplazo (os.replace) no toca las páginas que otros procesos tienen
+    mapeadas; sobrescribir en sitio les cambiaría los datos debajo.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return len(data)
+
+
+def write_snapshot(path: Path, products: Sequence[Dict], last_update: Optional[datetime] = None,
+                   indexes: Optional[Dict[str, Tuple[Dict, Dict[str, array]]]] = None,
+                   compress: bool = False) -> int:
+    """Escribir el snapshot de forma atómica; devuelve los bytes escritos"""
+    return atomic_write(path, encode_snapshot(products, last_update, indexes, compress))
+
+
+def read_last_update(path: Path) -> Optional[datetime]:
+    """last_update de un snapshot leyendo solo cabecera y meta (sin verificar el cuerpo)"""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise SnapshotFormatError("Snapshot truncado")
+        magic, version, _, _, meta_length, _ = HEADER.unpack(header)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SnapshotFormatError("No es un snapshot del catálogo en esta versión de formato")
+        meta = json.loads(f.read(meta_length).decode('utf-8'))
+    return datetime.fromisoformat(meta['last_update']) if meta['last_update'] else None
+
+
+class SnapshotFile:
+    """Snapshot binario abierto y verificado: productos (MmapStore) e índices guardados"""
+
+    def __init__(self, buffer: memoryview):
+        if len(buffer) < HEADER.size:
+            raise SnapshotFormatError("Snapshot truncado")
+        magic, version, flags, count, meta_length, checksum = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise SnapshotFormatError("No es un snapshot del catálogo")
+        if version != FORMAT_VERSION:
+            raise SnapshotFormatError(f"Versión de formato no soportada: {version}")
+        if zlib.crc32(buffer[HEADER.size:]) != checksum:
+            raise SnapshotFormatError("Checksum del snapshot incorrecto (archivo corrupto)")
+        base = HEADER.size + meta_length
+        meta = json.loads(str(buffer[HEADER.size:base], 'utf-8'))
+        body = buffer[base:]
+        if flags & FLAG_COMPRESSED:
+            body = memoryview(zlib.decompress(body))
+        if sum(length + (-length % ALIGNMENT) for _, length in meta['sections'].values()) > len(body):
+            raise SnapshotFormatError("Snapshot truncado")
+
+        self.nbytes = len(buffer)
+        self.compressed = bool(flags & FLAG_COMPRESSED)
+        self.count = count
+        self.last_update = datetime.fromisoformat(meta['last_update']) if meta['last_update'] else None
+        self.columns: Dict[str, Dict[str, Any]] = meta['columns']
+        self.indexes: Dict[str, Dict[str, Any]] = meta['indexes']
+        self._layout: Dict[str, List[int]] = meta['sections']
+        self._body = body
+
+    @classmethod
+    def open(cls, path: Path) -> 'SnapshotFile':
+        """Mapear un archivo de snapshot (solo lectura, compartido entre procesos)"""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(memoryview(mapped))
+
+    def section(self, name: str) -> memoryview:
+        offset, length = self._layout[name]
+        return self._body[offset:offset + length]
+
+    def store(self) -> 'MmapStore':
+        """Productos del snapshot, decodificados al acceder"""
+        store = MmapStore.__new__(MmapStore)
+        store._attach(self)
+        return store
+
+    def index_state(self, name: str) -> Optional[Tuple[Dict, Dict[str, array]]]:
+        """(metadatos, arreglos) de un índice guardado, o None si el archivo no lo trae"""
+        descriptor = self.indexes.get(name)
+        if descriptor is None:
+            return None
+        arrays = {}
+        for key, typecode in descriptor['arrays'].items():
+            values = array(typecode)
+            values.frombytes(self.section(f"index:{name}:{key}"))
+            arrays[key] = values
+        return descriptor['meta'], arrays
+
+
+class MmapStore:
+    """Productos leídos de un snapshot binario (mmap o bytes), decodificados al acceder.
+
+    Inmutable como los demás almacenamientos: `patched()` devuelve una vista con
+    las filas cambiadas en memoria sobre el mismo buffer compartido.
+    """
+
+    kind = 'mmap'
+
+    def __init__(self, products: Iterable[Dict]):
+        # Desde una lista (p. ej. recarga desde MySQL): buffer en memoria del proceso
+        self._attach(SnapshotFile(memoryview(encode_snapshot(list(products)))))
+
+    @classmethod
+    def open(cls, path: Path) -> 'MmapStore':
+        """Productos de un archivo de snapshot mapeado en memoria"""
+        return SnapshotFile.open(path).store()
+
+    def _attach(self, snapshot: SnapshotFile):
+        self.nbytes = snapshot.nbytes
+        self.last_update = snapshot.last_update
+        self._base_size = self._size = snapshot.count
+        self._overrides: Dict[int, Dict] = {}
+        self._fields = [field for field in snapshot.columns if field != EXTRAS_COLUMN]
+        self._columns: Dict[str, Sequence] = {}
+        for field, descriptor in snapshot.columns.items():
+            encoding = descriptor['encoding']
+            if encoding == 'num':
+                self._columns[field] = snapshot.section(field).cast(descriptor['typecode'])
+            elif encoding == 'dict':
+                self._columns[field] = _CodedColumn(snapshot.section(field).cast(descriptor['typecode']),
+                                                    descriptor['values'])
+            else:
+                self._columns[field] = _StringColumn(snapshot.section(field + ':offsets').cast('I'),
+                                                     snapshot.section(field), as_json=encoding == 'json')
+        self._extras = self._columns.pop(EXTRAS_COLUMN, None)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, pos: int) -> Dict:
+        if pos < 0:
+            pos += self._size
+        override = self._overrides.get(pos)
+        if override is not None:
+            return dict(override)
+        product = {field: self._columns[field][pos] for field in self._fields}
+        if self._extras is not None:
+            extra = self._extras[pos]
+            if extra:
+                product.update(extra)
+        return product
+
+    def rows(self, positions: Iterable[int]) -> List[Dict]:
+        return [self[pos] for pos in positions]
+
+    def value(self, pos: int, field: str) -> Any:
+        override = self._overrides.get(pos)
+        if override is not None:
+            return override.get(field, FIELD_DEFAULTS.get(field, ''))
+        column = self._columns.get(field)
+        if column is None:
+            extra = self._extras[pos] if self._extras is not None else None
+            return (extra or {}).get(field, FIELD_DEFAULTS.get(field, ''))
+        return column[pos]
+
+    def column(self, field: str) -> Sequence:
+        column = self._columns.get(field)
+        if column is None or self._overrides:
+            return [self.value(pos, field) for pos in range(self._size)]
+        return column
+
+    def to_list(self) -> List[Dict]:
+        if self._overrides:
+            return [self[pos] for pos in range(self._size)]
+        # Columna por columna: mucho más rápido que decodificar producto por producto
+        fields = self._fields
+        products = [dict(zip(fields, values)) for values in zip(*(self._columns[field] for field in fields))]
+        if self._extras is not None:
+            for product, extra in zip(products, self._extras):
+                if extra:
+                    product.update(extra)
+        return products
+
+    def patched(self, changes: Dict[int, Dict]) -> 'MmapStore':
+        """Copia con las filas de `changes` (posición -> producto); posiciones >= len se añaden"""
+        store = MmapStore.__new__(MmapStore)
+        store.__dict__.update(self.__dict__)
+        store._overrides = {**self._overrides, **changes}
+        store._size = max([self._size] + [pos + 1 for pos in changes])
+        return store
+
+
+STORE_TYPES[MmapStore.kind] = MmapStore
@@ -0,0 +1,34 @@
+"""
+Normalización de texto para los índices de búsqueda.
+
+Pliega mayúsculas, tildes y la ñ ("Añejo" -> "anejo") y separa en tokens
+alfanuméricos, separando letras de números ("750ml" -> "750", "ml").
+"""
+
+import re
+import unicodedata
+from typing import List
+
+_TOKEN_RE = re.compile(r'[a-z]+|[0-9]+(?:[.,][0-9]+)?')
+
+
+def fold(text: str) -> str:
+    """Minúsculas sin tildes ni diacríticos (ñ -> n, ü -> u)"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(text).casefold())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def collation_key(text: str) -> str:
+    """Clave de orden alfabético en español: sin tildes, pero la ñ va después de la n"""
+    if not text:
+        return ''
+    # '~' ordena después de cualquier letra: "nz" < "ñ" < "o"
+    composed = unicodedata.normalize('NFC', str(text).casefold())
+    return fold(composed.replace('ñ', '\x00')).replace('\x00', 'n~')
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados de un texto"""
+    return _TOKEN_RE.findall(fold(text))
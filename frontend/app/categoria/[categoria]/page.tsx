@@ -48,6 +48,7 @@ interface ApiResponse {
     limit: number;
     offset: number;
     has_more: boolean;
+    next_cursor?: string | null;
   };
   performance: {
     total_time: number;
@@ -98,7 +99,7 @@ export default function CategoriaPage() {
   } = filters;
   
   // Función de fetch para el hook de paginación
-  const fetchProducts = useCallback(async (offset: number, limit: number) => {
+  const fetchProducts = useCallback(async (offset: number, limit: number, cursor?: string | null) => {
     try {
       // Verificar que la categoría existe
       if (!categoria || categoria.trim() === '') {
@@ -107,8 +108,8 @@ export default function CategoriaPage() {
 
       console.log(`🔍 Cargando productos para categoría: ${categoria}`);
       
-      const response = await fetch(
-        getApiUrl(`/api/v1/productos/subcategoria/${encodeURIComponent(categoria)}?limit=${limit}&offset=${offset}`),
+      const request = (query: string) => fetch(
+        getApiUrl(`/api/v1/productos/subcategoria/${encodeURIComponent(categoria)}?${query}`),
         {
           method: 'GET',
           headers: {
@@ -119,6 +120,17 @@ export default function CategoriaPage() {
         }
       );
 
+      // Con cursor las páginas siguientes salen de la misma versión del catálogo (sin saltos ni repetidos)
+      let response = await request(
+        cursor ? `limit=${limit}&cursor=${encodeURIComponent(cursor)}` : `limit=${limit}&offset=${offset}`
+      );
+
+      // 410: el snapshot del cursor ya no existe; se sigue por offset desde donde iba
+      if (response.status === 410 && cursor) {
+        console.warn('⚠️ Cursor expirado, se continúa por offset');
+        response = await request(`limit=${limit}&offset=${offset}`);
+      }
+
       if (!response.ok) {
         const errorText = await response.text();
         console.error(`❌ API Error ${response.status}:`, errorText);
@@ -139,6 +151,7 @@ export default function CategoriaPage() {
         data: data.data || [],
         total: data.meta?.total || 0,
         hasMore: data.meta?.has_more || false,
+        nextCursor: data.meta?.next_cursor ?? null,
         success: true
       };
     } catch (error) {
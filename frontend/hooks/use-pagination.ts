@@ -35,11 +35,13 @@ export interface UsePaginationResult<T> extends PaginationState<T>, PaginationAc
 }
 
 export function usePagination<T = any>(
-  fetchFunction: (offset: number, limit: number) => Promise<{
+  fetchFunction: (offset: number, limit: number, cursor?: string | null) => Promise<{
     data: T[];
     total: number;
     hasMore: boolean;
     success: boolean;
+    // Cursor de la página siguiente (meta.next_cursor): mantiene la paginación en la misma versión del catálogo
+    nextCursor?: string | null;
   }>,
   config: PaginationConfig = {}
 ): UsePaginationResult<T> {
@@ -64,6 +66,7 @@ export function usePagination<T = any>(
   // Referencias
   const isLoadingRef = useRef(false);
   const abortControllerRef = useRef<AbortController | null>(null);
+  const cursorRef = useRef<string | null>(null);
 
   // Cálculos derivados
   const page = Math.floor(offset / limit) + 1;
@@ -110,7 +113,11 @@ export function usePagination<T = any>(
       }
 
       const startTime = performance.now();
-      const response = await fetchFunctionRef.current(currentOffset, limitRef.current);
+      const response = await fetchFunctionRef.current(
+        currentOffset,
+        limitRef.current,
+        isReset ? null : cursorRef.current
+      );
       const endTime = performance.now();
 
       if (!response.success) {
@@ -119,6 +126,8 @@ export function usePagination<T = any>(
 
       console.log(`📊 Paginación cargada en: ${(endTime - startTime).toFixed(2)}ms`);
 
+      cursorRef.current = response.nextCursor ?? null;
+
       if (isReset) {
         setItems(response.data);
         setOffset(limitRef.current);
@@ -169,6 +178,7 @@ export function usePagination<T = any>(
     setItems([]);
     setOffset(0);
     setError(null);
+    cursorRef.current = null;
     await loadData(true);
   }, [loadData]);
 